@@ -0,0 +1,121 @@
+"""Cold-start import profile of each page, from ``python -X importtime``.
+
+Every page's module-level imports run in a fresh interpreter, as after a
+container restart, and the report lists the total import time, the slowest
+top-level imports and which heavy optional modules got loaded. Streamlit itself
+is profiled on its own as the baseline every page pays.
+
+    python -m benchmarks.importtime --out importtime.json
+    python -m benchmarks.importtime --only krakenops,boxcount --top 5
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+from benchmarks.pages import ROOT, _git_commit
+
+# Modules that should load only with the feature that needs them (see utils/lazy.py)
+HEAVY_MODULES = ["pyspark", "openai", "plotly", "streamlit_echarts", "databricks.sql"]
+
+
+def page_imports(path):
+    """Source of the module-level import statements of a page, without running the page."""
+    with open(path) as f:
+        source = f.read()
+    tree = ast.parse(source, filename=path)
+    return "\n".join(
+        ast.get_source_segment(source, node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    )
+
+
+def _parse(stderr):
+    # "import time: self [us] | cumulative | imported package", nested imports indented by two spaces
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us), "depth": depth})
+    return rows
+
+
+def profile(code, env):
+    # -X importtime also logs imports that fail (e.g. optional ones probed by streamlit), so which
+    # heavy modules really loaded is read back from sys.modules.
+    probe = f"\nimport sys\nprint('heavy:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code + probe],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    rows = _parse(result.stderr)
+    heavy = [line[len("heavy:"):] for line in result.stdout.splitlines() if line.startswith("heavy:")]
+    error = None
+    if result.returncode:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit {result.returncode}"
+    return rows, [m for m in heavy[-1].split(",") if m] if heavy else [], error
+
+
+def summarize(runs, top):
+    # The median run by total time stands for the page.
+    totals = [sum(r["self_us"] for r in rows) for rows, _, _ in runs]
+    rows, heavy, error = runs[totals.index(sorted(totals)[len(totals) // 2])]
+    outermost = sorted((r for r in rows if r["depth"] == 0), key=lambda r: -r["cumulative_us"])
+    return {
+        "import_ms": round(statistics.median(totals) / 1000, 1),
+        "min_import_ms": round(min(totals) / 1000, 1),
+        "modules": len(rows),
+        "heavy_loaded": heavy,
+        "slowest": [{"module": r["module"], "cumulative_ms": round(r["cumulative_us"] / 1000, 1)} for r in outermost[:top]],
+        "error": error,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the cold-start imports of every page")
+    parser.add_argument("--only", default="", help="comma-separated page names, e.g. krakenops,boxcount")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per page; the median is reported")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list per page")
+    parser.add_argument("--out", default="-", help="JSON output path, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, PORTAL_DB_BACKEND=os.environ.get("PORTAL_DB_BACKEND", "duckdb"), PYTHONPATH=ROOT)
+    # Loaded by every page; its share is the floor no page-level change can cut.
+    targets = {"(streamlit)": "import streamlit"}
+    for path in sorted(glob.glob(os.path.join(ROOT, "pages", "*.py"))) + [os.path.join(ROOT, "home.py")]:
+        name = os.path.splitext(os.path.basename(path))[0]
+        if not args.only or name in args.only.split(","):
+            targets[name] = page_imports(path)
+
+    results = {}
+    for name, code in targets.items():
+        results[name] = summarize([profile(code, env) for _ in range(max(args.repeat, 1))], args.top)
+        summary = results[name]
+        heavy = ",".join(summary["heavy_loaded"]) or "-"
+        print(f"{name:<28} {summary['import_ms']:>8.1f} ms  {summary['modules']:>5} modules  heavy: {heavy}"
+              + (f"  ERROR {summary['error']}" if summary["error"] else ""), file=sys.stderr)
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "pages": results,
+    }
+    if args.out == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Login throughput micro-benchmark for the bcrypt password pool (utils/passwords.py).
+
+Simulates bursts of concurrent logins, each a bcrypt check, either inline on
+every session's own thread (the old behaviour) or through a bounded pool, and
+reports logins/second, login latency and how late a bystander thread that
+stands in for other sessions' reruns gets to run.
+
+    python -m benchmarks.logins --levels 1,5,20 --workers 2,4 --rounds 12
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.pages import _git_commit
+from utils.passwords import BCRYPT_ROUNDS, _checkpw, _hashpw
+
+# How often the bystander thread wants to run (seconds)
+TICK_SECONDS = 0.01
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Bystander:
+    """Wakes every TICK_SECONDS and records how late each wake-up was."""
+
+    def __init__(self):
+        self.lags = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            due = time.perf_counter() + TICK_SECONDS
+            time.sleep(TICK_SECONDS)
+            # A little Python work, like a rerun would do
+            sum(range(1000))
+            self.lags.append(max(time.perf_counter() - due, 0.0))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_level(concurrency, logins, password_hash, workers=None):
+    """``concurrency`` sessions each logging in ``logins`` times; inline when ``workers`` is None."""
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt") if workers else None
+    latencies = []
+    lock = threading.Lock()
+    start = threading.Barrier(concurrency + 1)
+
+    def session():
+        start.wait()
+        for _ in range(logins):
+            started = time.perf_counter()
+            ok = pool.submit(_checkpw, "secret", password_hash).result() if pool else _checkpw("secret", password_hash)
+            assert ok
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=session) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    with Bystander() as bystander:
+        started = time.perf_counter()
+        start.wait()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+    if pool:
+        pool.shutdown()
+    return {
+        "mode": f"pool({workers})" if workers else "inline",
+        "concurrency": concurrency,
+        "logins": len(latencies),
+        "wall_seconds": round(wall, 3),
+        "logins_per_second": round(len(latencies) / wall, 2),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "latency_p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "bystander_lag_p95_ms": round((_percentile(bystander.lags, 0.95) or 0.0) * 1000, 1),
+        "bystander_lag_max_ms": round(max(bystander.lags, default=0.0) * 1000, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark login (bcrypt check) throughput at different concurrency levels")
+    parser.add_argument("--levels", default="1,2,5,10,20", help="comma-separated numbers of concurrent sessions")
+    parser.add_argument("--workers", default="2,4", help="comma-separated pool sizes to compare with inline checks")
+    parser.add_argument("--rounds", type=int, default=BCRYPT_ROUNDS, help="bcrypt cost of the test hash")
+    parser.add_argument("--logins", type=int, default=2, help="logins per session")
+    parser.add_argument("--out", default="-", help="JSON output path, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    password_hash = _hashpw("secret", args.rounds)
+    modes = [None] + [int(w) for w in args.workers.split(",") if w]
+    results = []
+    for concurrency in [int(level) for level in args.levels.split(",")]:
+        for workers in modes:
+            result = run_level(concurrency, args.logins, password_hash, workers)
+            results.append(result)
+            print(
+                f"{result['mode']:<9} x{concurrency:<3} {result['logins_per_second']:>7.2f} logins/s"
+                f"  p95 {result['latency_p95_ms']:>8.1f} ms  bystander lag p95 {result['bystander_lag_p95_ms']:>6.1f} ms",
+                file=sys.stderr,
+            )
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "rounds": args.rounds,
+        "logins_per_session": args.logins,
+        "results": results,
+    }
+    if args.out == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
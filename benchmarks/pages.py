@@ -0,0 +1,324 @@
+"""End-to-end page benchmarks driven headlessly through Streamlit's AppTest.
+
+Runs each page against the local DuckDB backend (see utils/localbackend.py)
+and records, per rerun, wall time split into query / Styler / transform time
+plus peak memory. Results are written as JSON so runs can be diffed between
+commits and as data grows.
+
+    python -m utils.syntheticdata --scale 10 --weeks 2025-W27:2025-W28 --out snapshots
+    python -m benchmarks.pages --snapshots snapshots --week 2025-W27 --out bench.json
+"""
+import argparse
+import functools
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from pandas.io.formats.style import Styler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Latency budget per rerun (seconds); the report flags the first page to exceed it.
+DEFAULT_BUDGET_SECONDS = 3.0
+
+# Stand-in secrets for anything that reads utils.config; nothing is contacted with them.
+LOCAL_SECRETS = {
+    "databricks": {"host": "localhost", "http_path": "/local", "token": "local"},
+    "openai": {"OPENAI_API_KEY": "local"},
+}
+
+
+# --- Timers ---
+_timers = {"styler": 0.0}
+_timer_state = threading.local()
+
+
+def _timed(bucket, func):
+    # Styler._translate calls back into _compute; only the outermost call counts.
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_timer_state, bucket, False):
+            return func(*args, **kwargs)
+        setattr(_timer_state, bucket, True)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _timers[bucket] += time.perf_counter() - started
+            setattr(_timer_state, bucket, False)
+
+    return wrapper
+
+
+def _install_timers():
+    for name in ("_compute", "_translate"):
+        original = getattr(Styler, name)
+        if not getattr(original, "_benchmark_timed", False):
+            timed = _timed("styler", original)
+            timed._benchmark_timed = True
+            setattr(Styler, name, timed)
+
+
+def _telemetry():
+    # utils.* is first imported inside the first AppTest run.
+    return sys.modules.get("utils.telemetry")
+
+
+def _executions_after(seq):
+    telemetry = _telemetry()
+    return telemetry.records("query", after=seq) if telemetry else []
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _clear_caches():
+    cache = sys.modules.get("utils.cache")
+    if cache:
+        cache.get_result_cache().invalidate()
+    incremental = sys.modules.get("utils.incremental")
+    if incremental:
+        # Without its meta file a trend series is rebuilt from the warehouse, as on a fresh host.
+        for meta_path in glob.glob(os.path.join(incremental.SERIES_DIR, "*.json")):
+            os.remove(meta_path)
+    import streamlit as st
+    st.cache_data.clear()
+
+
+# --- Widget steps ---
+def _find(at, kind, label, sidebar):
+    root = at.sidebar if sidebar else at
+    for widget in getattr(root, kind):
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No {kind} labelled {label!r}")
+
+
+def choose(kind, label, value=None, index=None, sidebar=True):
+    """Step that sets a widget by label (``value``) or to its ``index``-th option."""
+    def step(at):
+        widget = _find(at, kind, label, sidebar)
+        widget.set_value(widget.options[index] if index is not None else value)
+    step.label = f"{label}={value if index is None else f'#{index}'}"
+    return step
+
+
+def open_tab(key, label):
+    """Step that switches a keyed ``st.tabs`` (see utils/tabs.py) to the tab called ``label``."""
+    def step(at):
+        at.session_state[key] = label
+    step.label = f"{key}={label}"
+    return step
+
+
+class Scenario:
+    def __init__(self, name, page, steps=()):
+        self.name = name
+        self.page = page
+        self.steps = list(steps)
+
+
+def scenarios(week, entity="AU", version="v3"):
+    kraken_tabs = [
+        ("executive_summary", "Executive Summary", [choose("selectbox", "HelloFresh Week", week), choose("selectbox", "Version", version)]),
+        ("reconciliation", "Reconciliation", [choose("selectbox", "Select Week", week), choose("selectbox", "Country", entity)]),
+        ("null_price_error", "Null Price Error", [choose("selectbox", "HelloFresh Week", week), choose("selectbox", "Version", version)]),
+        ("cpk", "CPK", [
+            choose("selectbox", "HelloFresh Week", week),
+            choose("selectbox", "Country", entity),
+            # Sub-tabs render only when open; these drive the slot / primary tag detail queries.
+            choose("selectbox", "🔎 View Slot Details", index=1, sidebar=False),
+            open_tab("cpk_tab", "🏷️ By Primary Tag"),
+            choose("selectbox", "🔎 View Primary Tag Details", index=1, sidebar=False),
+            open_tab("cpk_tab", "📂 By Product Type"),
+        ]),
+    ]
+    result = [
+        Scenario(f"krakenops/{name}", "pages/krakenops.py", [choose("radio", "", tab)] + steps)
+        for name, tab, steps in kraken_tabs
+    ]
+    result += [
+        Scenario("boxcount/box_count", "pages/boxcount.py", [
+            choose("radio", "Select Data Type", "Box Count"),
+            choose("selectbox", "Hello Fresh Week", week),
+        ]),
+        Scenario("boxcount/kit_count", "pages/boxcount.py", [
+            choose("radio", "Select Data Type", "Kit Count"),
+            choose("selectbox", "Hello Fresh Week", week),
+        ]),
+        Scenario("orderrecipemargin", "pages/orderrecipemargin.py", [
+            choose("selectbox", "Hello Fresh Week", week),
+            choose("selectbox", "Entity", entity),
+        ]),
+        Scenario("budgetrecipecomposition/weekly_by_item", "pages/budgetrecipecomposition.py", [
+            choose("selectbox", "Entity", entity),
+            choose("selectbox", "Summary Level", "By Item"),
+        ]),
+        Scenario("budgetrecipecomposition/monthly_primary_tag", "pages/budgetrecipecomposition.py", [
+            choose("selectbox", "View", "Monthly"),
+            choose("selectbox", "Summary Level", "Primary Tag"),
+        ]),
+    ]
+    for report in ["By Slot", "By Primary Tag", "By Type"]:
+        steps = [
+            choose("selectbox", "Version", version),
+            choose("selectbox", "Hello Fresh Week", week),
+            choose("selectbox", "Entity", entity),
+            choose("radio", "Select Report Category", report),
+        ]
+        if report == "By Slot":
+            steps.append(choose("selectbox", "🔍 Filter by Recipe Slot", index=1, sidebar=False))
+        result.append(Scenario(f"menuplanning/{report.lower().replace(' ', '_')}", "pages/menuplanning.py", steps))
+    return result
+
+
+# --- Runner ---
+def _run_once(at, label, timeout, trace_memory):
+    # Records are matched by sequence number: the buffer is bounded, so older ones may be gone by now.
+    telemetry = _telemetry()
+    cursor = telemetry.last_seq() if telemetry else 0
+    styler_before = _timers["styler"]
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    error = None
+    try:
+        at.run(timeout=timeout)
+        if at.exception:
+            error = "; ".join(e.message for e in at.exception)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - started
+    peak_traced = None
+    if trace_memory:
+        peak_traced = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    new = _executions_after(cursor)
+    query_seconds = sum(e["total_seconds"] for e in new)
+    styler_seconds = _timers["styler"] - styler_before
+    return {
+        "step": label,
+        "wall_seconds": round(wall, 4),
+        "query_seconds": round(query_seconds, 4),
+        "queries": [
+            {k: e.get(k) for k in ("query", "total_seconds", "queue_seconds", "execute_seconds", "fetch_seconds", "rows", "bytes")}
+            for e in new
+        ],
+        "styler_seconds": round(styler_seconds, 4),
+        # pandas transforms plus Streamlit element marshalling
+        "transform_seconds": round(max(wall - query_seconds - styler_seconds, 0.0), 4),
+        "peak_traced_mb": round(peak_traced / (1024 * 1024), 1) if peak_traced is not None else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "error": error,
+    }
+
+
+def run_scenario(scenario, repeat=2, timeout=600, trace_memory=False):
+    from streamlit.testing.v1 import AppTest
+
+    runs = []
+    for attempt in range(repeat):
+        # First pass starts from empty result caches; later passes measure warm reruns.
+        if attempt == 0:
+            _clear_caches()
+        at = AppTest.from_file(os.path.join(ROOT, scenario.page), default_timeout=timeout)
+        at.secrets.update(LOCAL_SECRETS)
+        reruns = [_run_once(at, "initial", timeout, trace_memory)]
+        for step in scenario.steps:
+            if reruns[-1]["error"]:
+                break
+            try:
+                step(at)
+            except LookupError as e:
+                reruns.append({"step": step.label, "error": str(e)})
+                break
+            reruns.append(_run_once(at, step.label, timeout, trace_memory))
+        runs.append({
+            "cache": "cold" if attempt == 0 else "warm",
+            "wall_seconds": round(sum(r.get("wall_seconds", 0) for r in reruns), 4),
+            "max_rerun_seconds": max(r.get("wall_seconds", 0) for r in reruns),
+            "reruns": reruns,
+        })
+    return {"scenario": scenario.name, "page": scenario.page, "runs": runs}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the portal pages against local snapshots")
+    parser.add_argument("--snapshots", default="snapshots", help="snapshot directory for PORTAL_DB_BACKEND=duckdb")
+    parser.add_argument("--week", default="2025-W27")
+    parser.add_argument("--entity", default="AU")
+    parser.add_argument("--version", default="v3")
+    parser.add_argument("--only", default="", help="comma-separated scenario name prefixes, e.g. krakenops/cpk,boxcount")
+    parser.add_argument("--repeat", type=int, default=2, help="runs per scenario; the first is cold")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS, help="per-rerun latency budget (s)")
+    parser.add_argument("--trace-memory", action="store_true", help="also record tracemalloc peaks (slows pages down)")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--out", default="-", help="JSON output path, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    # Must be set before the pages import utils.db / utils.cache.
+    os.environ["PORTAL_DB_BACKEND"] = "duckdb"
+    os.environ["PORTAL_SNAPSHOT_DIR"] = os.path.abspath(args.snapshots)
+    # Every on-disk store goes to a fresh directory, so runs never read state left by another run or snapshot set.
+    scratch = tempfile.mkdtemp(prefix="portal-bench-")
+    os.environ.setdefault("PORTAL_CACHE_DIR", os.path.join(scratch, "cache"))
+    os.environ.setdefault("PORTAL_SERIES_DIR", os.path.join(scratch, "series"))
+    os.environ.setdefault("PORTAL_USER_DB_PATH", os.path.join(scratch, "users.sqlite3"))
+    os.environ.setdefault("PORTAL_RATE_LIMIT_DB_PATH", os.path.join(scratch, "ratelimit.sqlite3"))
+    _install_timers()
+
+    selected = [
+        s for s in scenarios(args.week, args.entity, args.version)
+        if not args.only or any(s.name.startswith(prefix) for prefix in args.only.split(","))
+    ]
+    results = []
+    for scenario in selected:
+        result = run_scenario(scenario, repeat=args.repeat, timeout=args.timeout, trace_memory=args.trace_memory)
+        results.append(result)
+        cold = result["runs"][0]
+        print(f"{scenario.name:<45} cold {cold['wall_seconds']:>8.2f}s  max rerun {cold['max_rerun_seconds']:>7.2f}s", file=sys.stderr)
+
+    over_budget = [
+        r["scenario"] for r in results
+        if any(run["max_rerun_seconds"] > args.budget for run in r["runs"])
+    ]
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "snapshots": args.snapshots,
+        "week": args.week,
+        "entity": args.entity,
+        "version": args.version,
+        "budget_seconds": args.budget,
+        "over_budget": over_budget,
+        "scenarios": results,
+    }
+    if args.out == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,8 @@
 import streamlit as st
-from streamlit_cookies_manager import EncryptedCookieManager
-import os
 import time
-import json
 import streamlit as st
 from streamlit_tile import streamlit_tile
-from utils.db import validate_login
+from utils.auth import current_user, end_session, session_cookies
 from streamlit_js_eval import streamlit_js_eval
 import time
 
@@ -45,17 +42,12 @@ inject_styles()
 
 # --- COOKIE MANAGER SETUP ---
 # Must be initialized with the same parameters on every page.
-cookies = EncryptedCookieManager(
-    prefix="hellofresh/finance/bi-portal",
-    password=os.environ.get("COOKIES_PASSWORD", "a_default_password_for_testing"),
-)
-
-if not cookies.ready():
-    st.stop()
+cookies = session_cookies()
 
 # --- AUTHENTICATION CHECK ---
-# If the user_email cookie is not set, redirect to the login page.
-if cookies.get("user_email") in [None, "{}", "null", ""]:
+# Checked against the signed session token alone; navigation never queries the user store.
+user_email = current_user(cookies)
+if user_email is None:
     st.warning("🔒 You are not logged in. Redirecting to login page...")
     time.sleep(1)
     st.switch_page("pages/_login.py")
@@ -83,16 +75,14 @@ with col1:
     st.markdown(f"""
         <div style='text-align: left;'>
             <div style='font-size: 16px; color: grey; margin-bottom: 20px;'>
-                User : <code>{cookies.get('user_name', 'Unknown User')}</code> &nbsp;
+                User : <code>{user_email}</code> &nbsp;
             </div>
         </div>
     """, unsafe_allow_html=True)
 with col2:
     if st.button("🔓 Log out"):
         # ❗ Clear cookies explicitly
-        cookies["user_email"] = json.dumps({})
-        cookies["user_name"] = json.dumps({})
-        cookies.save()
+        end_session(cookies)
         # Small delay to ensure cookie propagation
         time.sleep(0.5)
         # Force rerun (redirect to login page via auth check)
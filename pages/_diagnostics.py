@@ -0,0 +1,122 @@
+import time
+
+import streamlit as st
+import pandas as pd
+from utils import telemetry
+from utils.auth import current_user, session_cookies
+from utils.cache import get_result_cache
+from utils.db import pool_stats
+from utils.prefetch import get_prefetcher
+
+# --- Page Config ---
+st.set_page_config(
+    page_title="Diagnostics",
+    page_icon=":bulb:",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# --- Style ---
+st.markdown("""
+    <style>
+        [data-testid="stSidebarNav"] { display: none !important; }
+    </style>
+""", unsafe_allow_html=True)
+
+
+# --- Authentication check ---
+# Query timings, cache keys and pool state are for signed-in users only.
+cookies = session_cookies()
+if current_user(cookies) is None:
+    st.warning("🔒 You are not logged in. Redirecting to login page...")
+    time.sleep(1)
+    st.switch_page("pages/_login.py")
+    st.stop()
+
+# --- Sidebar ---
+if st.sidebar.button("🏠"):
+    st.switch_page("home.py")
+
+st.sidebar.markdown("<div style='border-top: 2px solid #e74c3c; margin-top: 10px; margin-bottom: 18px;'></div>", unsafe_allow_html=True)
+
+all_queries = telemetry.records("query")
+pages = sorted({r["page"] for r in all_queries if r.get("page")})
+page_option = st.sidebar.selectbox("Page", options=["ALL"] + pages)
+slowest_n = st.sidebar.slider("Slowest calls", min_value=10, max_value=200, value=25, step=5)
+
+if st.sidebar.button("Clear buffer"):
+    telemetry.BUFFER.clear()
+    st.rerun()
+
+queries = [r for r in all_queries if page_option == "ALL" or r.get("page") == page_option]
+cache_lookups = [r for r in telemetry.records("cache") if page_option == "ALL" or r.get("page") == page_option]
+
+st.header("Query Diagnostics")
+st.caption(
+    f"Last {len(telemetry.BUFFER):,} records in this app process "
+    f"(buffer size {telemetry.TELEMETRY_BUFFER_SIZE:,}, sink: {telemetry.TELEMETRY_SINK or 'none'})"
+)
+
+# --- Summary Cards ---
+total_seconds = sum(r["total_seconds"] or 0 for r in queries)
+hits = sum(1 for r in cache_lookups if r["cache"] != "miss")
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Queries", f"{len(queries):,}")
+col2.metric("Query time", f"{total_seconds:,.1f}s")
+col3.metric("Cache hit ratio", f"{hits / len(cache_lookups):.0%}" if cache_lookups else "-")
+col4.metric("Errors", f"{sum(1 for r in queries if r.get('error')):,}")
+
+
+# --- Per Query ---
+st.subheader("Latency by Query")
+summary_df = telemetry.query_summary(queries)
+if summary_df.empty:
+    st.info("No queries recorded yet. Open a report page and come back.")
+else:
+    st.dataframe(
+        summary_df.style.format({
+            "p50_seconds": "{:.3f}", "p95_seconds": "{:.3f}", "max_seconds": "{:.3f}", "total_seconds": "{:,.2f}",
+            "avg_queue_seconds": "{:.3f}", "avg_execute_seconds": "{:.3f}", "avg_fetch_seconds": "{:.3f}",
+            "avg_rows": "{:,.0f}", "avg_bytes": "{:,.0f}",
+        }),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+
+# --- Slowest Calls ---
+st.subheader("Slowest Recent Calls")
+if queries:
+    slowest_df = pd.DataFrame(queries).sort_values("total_seconds", ascending=False).head(slowest_n)
+    slowest_df["finished_at"] = pd.to_datetime(slowest_df["finished_at"], unit="s")
+    slowest_df["params"] = slowest_df["params"].map(lambda p: ", ".join(f"{k}={v}" for k, v in p.items()) if isinstance(p, dict) else "")
+    columns = [
+        "finished_at", "page", "query", "params", "total_seconds", "queue_seconds", "execute_seconds",
+        "fetch_seconds", "rows", "bytes", "namespace", "prefetch", "error",
+    ]
+    st.dataframe(slowest_df.reindex(columns=columns), use_container_width=True, hide_index=True)
+
+
+# --- Cache ---
+st.subheader("Result Cache Hit Ratio by Loader")
+cache_df = telemetry.cache_summary(cache_lookups)
+if cache_df.empty:
+    st.info("No cached loader calls recorded yet.")
+else:
+    st.dataframe(
+        cache_df.style.format({"hit_ratio": "{:.0%}", "avg_seconds": "{:.3f}"}),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.subheader("Result Cache")
+    cache = get_result_cache()
+    st.json({**cache.stats, **cache.memory_usage()})
+with col2:
+    st.subheader("Connection Pool")
+    st.json(pool_stats())
+with col3:
+    st.subheader("Prefetch")
+    st.json(get_prefetcher().status())
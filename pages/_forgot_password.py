@@ -1,7 +1,9 @@
 import streamlit as st
 import secrets
 import datetime
-from utils.db import email_exists, create_reset_token
+from utils.config import get_config
+from utils.auth import email_exists
+from utils.db import create_reset_token
 import smtplib
 from email.message import EmailMessage
 import uuid
@@ -9,8 +11,8 @@ import time
 
 def send_reset_email(recipient_email: str, reset_link: str):
     # Gmail credentials (use Streamlit secrets or environment vars)
-    GMAIL_USER = st.secrets["gmail"]["user"]
-    GMAIL_PASS = st.secrets["gmail"]["password"]
+    GMAIL_USER = get_config().gmail_user
+    GMAIL_PASS = get_config().gmail_password
 
     # Email content
     msg = EmailMessage()
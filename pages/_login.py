@@ -1,7 +1,6 @@
 import streamlit as st
-from streamlit_cookies_manager import EncryptedCookieManager
-from utils.db import validate_login # Assuming this function exists and works
-import os
+from utils.auth import attempt_login, current_user, session_cookies, start_session
+from utils.ratelimit import client_id, format_wait
 import time
 # --- Page Config ---
 st.set_page_config(
@@ -55,18 +54,11 @@ form_disabled = st.session_state.login_loading
 # --- COOKIE MANAGER SETUP ---
 # This should be on top of your script.
 # The password should be set as a secret environment variable.
-cookies = EncryptedCookieManager(
-    prefix="hellofresh/finance/bi-portal",
-    password=os.environ.get("COOKIES_PASSWORD", "a_default_password_for_testing"),
-)
-
-if not cookies.ready():
-    # Wait for the component to load and send us current cookies.
-    st.stop()
+cookies = session_cookies()
 
 # --- REDIRECT IF ALREADY LOGGED IN ---
-# Check if the user's email is already in the cookies.
-if not cookies.get("user_email") in [None, "{}", "null", ""]:
+# A valid signed session in the cookie is enough; no user lookup is needed.
+if current_user(cookies):
     st.switch_page("home.py")
 
 
@@ -107,15 +99,25 @@ with col1:
 
         if st.session_state.login_loading:
             with st.spinner("Verifying credentials..."):
-                if validate_login(email, password):
-                    # If login is successful, set the cookies.
-                    cookies['user_email'] = email
-                    # We'll use the email as the user's name for display purposes.
-                    cookies['user_name'] = email 
-                    cookies.save() # Save the cookies immediately
+                ok, retry_after, checked = attempt_login(email, password, client_id())
+                if ok:
+                    # If login is successful, put a signed session in the cookies.
+                    start_session(cookies, email)
                     st.success("✅ Login successful! Redirecting...")
                     time.sleep(1)
                     st.switch_page("home.py")
+                elif retry_after and checked:
+                    # Wrong password, and this failure locked the email.
+                    st.session_state.login_loading = False
+                    st.session_state.login_error_msg = (
+                        f"❌ Invalid credentials. ⏳ Too many failed attempts; try again in {format_wait(retry_after)}."
+                    )
+                    st.rerun()
+                elif retry_after:
+                    # Refused by the rate limiter; no credentials were checked.
+                    st.session_state.login_loading = False
+                    st.session_state.login_error_msg = f"⏳ Too many login attempts. Try again in {format_wait(retry_after)}."
+                    st.rerun()
                 else:
                     st.session_state.login_failed = True
                     st.session_state.login_loading = False
@@ -1,5 +1,6 @@
 import streamlit as st
-from utils.db import verify_reset_token, reset_user_password
+from utils.auth import reset_user_password
+from utils.db import verify_reset_token
 import urllib.parse
 import time
 
@@ -1,6 +1,5 @@
-import bcrypt
 import streamlit as st
-from utils.db import (
+from utils.auth import (
     register_user,
     email_exists
 )
@@ -2,11 +2,11 @@ import streamlit as st
 from utils.db import (
      load_tables,
      fetch_inventory_items,
-     runtestnotebook,
-     check_job_status
+     runtestnotebook
 )
+from utils.config import get_config
+from utils.jobs import JOBS_REFRESH_SECONDS, sync_jobs
 from datetime import datetime,timedelta
-from streamlit_autorefresh import st_autorefresh
 
 st.set_page_config(page_title="📊 Dashboard", layout="wide",
     initial_sidebar_state="expanded")
@@ -39,7 +39,7 @@ selected_date = st.sidebar.date_input(
 )
 
 if st.sidebar.button("Run Noteboock"):
-    runtestnotebook('/Squad-AU-Finops/pipeline/streamlit_test',st.secrets["databricks"]["anz_data_cluster_id"])
+    runtestnotebook('/Squad-AU-Finops/pipeline/streamlit_test',get_config().cluster_id)
 
 # today = datetime.today()
 # one_year_ago = today - timedelta(days=700)
@@ -79,29 +79,28 @@ if st.sidebar.button("Run Noteboock"):
 
 
 
-# Check status of all jobs (polling can be improved for production)
-for run_id in list(st.session_state.jobs.keys()):
-    # Only check if job is not finished
-    if st.session_state.jobs[run_id]["status"] not in ["TERMINATED", "SKIPPED", "INTERNAL_ERROR"]:
-        check_job_status(run_id)
-
-# Show notifications for completed jobs
-for run_id, job in st.session_state.jobs.items():
-    if job["status"] == "TERMINATED" and not job["notified"]:
-        if job["result"] == "SUCCESS":
-            st.success(f"🎉 Job {run_id} is done! The task completed successfully.")
-        elif job["result"] == "FAILED":
-            st.error(f"❌ Job {run_id} failed. Please check the Databricks job logs.")
-        else:
-            st.info(f"Job {run_id} finished with status: {job['result']}")
-        # Mark as notified so message persists only once
-        job["notified"] = True
-
-
-
-jobs_running = any(
-    job["status"] not in ["TERMINATED", "SKIPPED", "INTERNAL_ERROR"]
-    for job in st.session_state.jobs.values()
-)
-if jobs_running:
-    st_autorefresh(interval=5000, key="jobrefresh")
\ No newline at end of file
+# Run states come from the process-wide job monitor (utils/jobs.py); re-reading them costs no API calls.
+@st.fragment(run_every=JOBS_REFRESH_SECONDS)
+def job_notifications():
+    sync_jobs(st.session_state.jobs)
+
+    # Finished jobs stay listed until dismissed; each new result also pops a toast once.
+    for run_id, job in st.session_state.jobs.items():
+        if job["status"] == "TERMINATED" and not job["dismissed"]:
+            if job["result"] == "SUCCESS":
+                message, notify, icon = f"Job {run_id} is done! The task completed successfully.", st.success, "🎉"
+            elif job["result"] == "FAILED":
+                message, notify, icon = f"Job {run_id} failed. Please check the Databricks job logs.", st.error, "❌"
+            else:
+                message, notify, icon = f"Job {run_id} finished with status: {job['result']}", st.info, "ℹ️"
+            if not job["notified"]:
+                st.toast(message, icon=icon)
+                job["notified"] = True
+            text, dismiss = st.columns([10, 1])
+            with text:
+                notify(message, icon=icon)
+            with dismiss:
+                st.button("Dismiss", key=f"dismiss_job_{run_id}", on_click=job.update, kwargs={"dismissed": True})
+
+
+job_notifications()
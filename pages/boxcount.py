@@ -1,15 +1,16 @@
 import streamlit as st
 import pandas as pd
-from pyspark.sql import functions as F
-from openai import OpenAI
 import numpy as np
 from pandas.api.types import CategoricalDtype
-from streamlit_echarts import st_echarts
 from datetime import datetime, timedelta
 
+from utils import batch
+from utils.cache import cached
+from utils.grid import QuerySource, paged_dataframe
+from utils.lazy import lazy_import
 from utils.boxcountquery import (
-    run_box_count_raw,
-    run_kit_count_raw
+    run_box_count_by_country,
+    run_box_count_trend
 )
 
 from utils.commonquery import (
@@ -18,6 +19,9 @@ from utils.commonquery import (
     format_number_auto
 )
 
+# Imported when the first chart is drawn
+echarts = lazy_import("streamlit_echarts")
+
 # --- Page Config ---
 st.set_page_config(
     page_title="HelloFresh Finance Portal",
@@ -79,13 +83,14 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Cached Data Loaders ---
-@st.cache_data(show_spinner="Loading Box Count data...", persist=True)
-def load_box_count_raw_data():
-    return run_box_count_raw()
+# Filtering and summing happen in the warehouse; only per-country totals and the trend series come back.
+@cached("box_count_by_country", show_spinner="Loading Box Count data...")
+def load_box_count_by_country(week):
+    return run_box_count_by_country(week)
 
-@st.cache_data(show_spinner="Loading Kit Count data...", persist=True)
-def load_kit_count_raw_data():
-    return run_kit_count_raw()
+@cached("box_count_trend", show_spinner="Loading Box Count Trending data...")
+def load_box_count_trend():
+    return run_box_count_trend()
 
 @st.cache_data(show_spinner=False)
 def get_hellofresh_weeks():
@@ -115,8 +120,10 @@ hellofresh_week_option = st.sidebar.selectbox("Hello Fresh Week", options=hellof
 if view_option == "Box Count":
     st.header(f"{hellofresh_week_option} Box Count")
 
-    df_raw_all = load_box_count_raw_data()
-    df_raw = df_raw_all[df_raw_all["hellofresh_week"] == hellofresh_week_option]
+    df_raw, df_trend = batch.load([
+        (load_box_count_by_country, (hellofresh_week_option,)),
+        (load_box_count_trend, ()),
+    ])
 
     pivot_df = df_raw.pivot_table(
         index='country',
@@ -151,10 +158,7 @@ if view_option == "Box Count":
 
     # --- Weekly Trends ---
     weekly_df = (
-        df_raw_all.groupby(["hellofresh_week", "country", "source"])["box_count"]
-        .sum()
-        .reset_index()
-        .pivot_table(index="hellofresh_week", columns=["country", "source"], values="box_count", fill_value=0)
+        df_trend.pivot_table(index="hellofresh_week", columns=["country", "source"], values="box_count", fill_value=0)
         .sort_index()
     )
 
@@ -207,7 +211,7 @@ if view_option == "Box Count":
         }
 
         with cols[idx % 3]:
-            st_echarts(options=chart_options, height="400px")
+            echarts.st_echarts(options=chart_options, height="400px")
 
     formatted_df = weekly_df.copy()
     for col in formatted_df.columns:
@@ -220,6 +224,4 @@ if view_option == "Box Count":
 # --- Kit Count View ---
 else:
     st.header(f"{hellofresh_week_option} Kit Count")
-    df_kit = load_kit_count_raw_data()
-    df_filtered = df_kit[df_kit["hellofresh_week"] == hellofresh_week_option]
-    st.dataframe(df_filtered, use_container_width=True, height=650, hide_index=True)
\ No newline at end of file
+    paged_dataframe(QuerySource("kit_count_raw", week=hellofresh_week_option), key="kit_count_raw", height=650)
\ No newline at end of file
@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
-from pyspark.sql import functions as F
-from openai import OpenAI
 
+from utils.cache import cached
+from utils.config import get_config
 from utils.budgetrecipecompositionquery import (
     run_recipe_composition_raw
 )
@@ -22,13 +22,16 @@ st.set_page_config(
     layout="wide"
 )
 
-@st.cache_data(show_spinner="Loading Recipe Composition data...", persist=True)
+@cached("recipe_composition", show_spinner="Loading Recipe Composition data...")
 def load_raw_data(version):
     return run_recipe_composition_raw(version)
 
 
-# Load key from secrets
-client = OpenAI(api_key=st.secrets["openai"]["OPENAI_API_KEY"])
+@st.cache_resource(show_spinner=False)
+def get_openai_client():
+    # openai is imported the first time the assistant is asked something, not with the page.
+    from openai import OpenAI
+    return OpenAI(api_key=get_config().openai_api_key)
 
 
 st.markdown("""
@@ -60,7 +63,8 @@ st.sidebar.markdown(
 
 # Fetch once and reuse across reruns
 if st.sidebar.button("🔄 Refresh Data"):
-    st.cache_data.clear()
+    # Only drop recipe composition results, not every page's cache
+    load_raw_data.invalidate()
     st.rerun()
 
 with st.sidebar:
@@ -214,7 +218,7 @@ with st.spinner("⏳ Preparing data..."):
 
     # if st.button("Ask AI") and user_question:
     #     with st.spinner("Thinking..."):
-    #         response = client.chat.completions.create(
+    #         response = get_openai_client().chat.completions.create(
     #             model="gpt-4.1-nano",
     #             messages=[
     #                 {
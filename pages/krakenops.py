@@ -1,32 +1,38 @@
 import streamlit as st
 import pandas as pd
-from pyspark.sql import functions as F
-from openai import OpenAI
 import numpy as np
 from pandas.api.types import CategoricalDtype
-from streamlit_echarts import st_echarts
+from utils import batch, prefetch
+from utils.cache import cached, invalidate_kraken_run
 from utils.query import (
-    run_kraken_raw_data,
-    run_kraken_trend_total_cost,
-    run_kraken_trend_supplier_split_error,
+    refresh_kraken_trend_total_cost,
+    refresh_kraken_trend_supplier_split_error,
     run_kit_count_to_production_data,
-    run_kraken_null_price_error,
     run_kraken_null_price_error_trends,
-    run_kraken_cpk,
-    run_kraken_slot_details,
-    run_kraken_cpk_primary_tag,
-    run_kraken_cpk_product_type,
-    run_kraken_slot_details_primary_tag
+    run_kraken_null_price_error_summary,
+    run_kraken_cpk_all,
+    process_kraken_cpk,
+    run_kraken_cube,
+    kraken_slot_details,
+    kraken_primary_tag_details,
+    kraken_tag_map
 )
 from utils.commonquery import (
     fetch_hellofresh_weeks,
     blank_repeats,
     format_number_auto
 )
+from utils.grid import FrameSource, QuerySource, paged_dataframe
+from utils.comparison import ComparisonSpec, compare, filter_index, fingerprint, version_table
+from utils.tabs import lazy_tabs
+from utils.lazy import lazy_import
 
 from datetime import datetime,timedelta
 ##from streamlit_autorefresh import st_autorefresh
 
+# Imported when the first chart is drawn
+echarts = lazy_import("streamlit_echarts")
+
 # --- Page Config ---
 st.set_page_config(
     page_title="HelloFresh Finance Portal",
@@ -45,57 +51,70 @@ st.markdown("""
 
 
 
-@st.cache_data(show_spinner="Loading Kraken Ops data...", persist=False)
-def load_raw_data(week, entity, version):
-    return run_kraken_raw_data(week, entity, version)
-
-
-
-@st.cache_data(show_spinner="Loading Kraken Ops Trending data...", persist=True)
+@cached("kraken_trend_total_cost", show_spinner="Loading Kraken Ops Trending data...")
 def load_trend_data():
-    return run_kraken_trend_total_cost()
+    return refresh_kraken_trend_total_cost()
 
 
-@st.cache_data(show_spinner="Loading Supplier Split Trending data...", persist=True)
+@cached("kraken_supplier_split_errors", show_spinner="Loading Supplier Split Trending data...")
 def load_supplier_error_data():
-    return run_kraken_trend_supplier_split_error()
+    return refresh_kraken_trend_supplier_split_error()
 
-@st.cache_data(show_spinner="Loading Kit Count data...", persist=False)
+@cached("kit_count_to_production", show_spinner="Loading Kit Count data...")
 def load_kit_count_to_production_data(week, entity):
     return run_kit_count_to_production_data(week,entity)
 
 
-@st.cache_data(show_spinner="Loading Null Price Error data...", persist=False)
-def load_null_price_data(version, week):
-    return run_kraken_null_price_error(version, week)
-
-
-@st.cache_data(show_spinner="Loading Null Price Error Trends data...", persist=False)
+@cached("kraken_null_price_error_trends", show_spinner="Loading Null Price Error Trends data...")
 def load_null_price_data_trend(version):
     return run_kraken_null_price_error_trends(version)
 
 
-@st.cache_data(show_spinner="Loading CPK data...", persist=False)
+@cached("kraken_null_price_error_summary", show_spinner="Loading Null Price Error data...")
+def load_null_price_summary(version, week):
+    return run_kraken_null_price_error_summary(version, week)
+
+
+# All three CPK views come from one warehouse round-trip; the per-view loaders slice it locally.
+@cached("kraken_cpk", show_spinner="Loading CPK data...")
+def load_cpk_all(week, entity):
+    return run_kraken_cpk_all(week, entity)
+
+@cached("kraken_cpk_slot", persist=False)
 def load_cpk_by_slot(week, entity):
-    return run_kraken_cpk(week, entity)
+    return process_kraken_cpk(load_cpk_all(week, entity))[0]
+
+@cached("kraken_cpk_slot_totals", persist=False)
+def load_cpk_slot_totals(week, entity):
+    # The by-slot rows without recipe titles, which the By Slot table sums; titles are joined per filter.
+    return process_kraken_cpk(load_cpk_all(week, entity))[0].drop(columns="recipe_title").drop_duplicates()
 
-@st.cache_data(show_spinner="Loading CPK By Primary Tag data...", persist=False)
+@cached("kraken_cpk_primary_tag", persist=False)
 def load_cpk_by_primary_tag(week, entity):
-    return run_kraken_cpk_primary_tag(week, entity)
+    df = process_kraken_cpk(load_cpk_all(week, entity))[1]
+    df["version"] = df["version"].str.lower()
+    return df
 
-@st.cache_data(show_spinner="Loading Slot data...", persist=False)
+# Week x entity rollup of every version by slot / sku / dc / size / supplier; the drill-downs slice it locally.
+@cached("kraken_cube", show_spinner="Loading Kraken Ops data...")
+def load_kraken_cube(week, entity):
+    return run_kraken_cube(week, entity)
+
+@cached("kraken_slot_details", persist=False)
 def load_slot_details(week, entity, slot):
-    return run_kraken_slot_details(week, entity, slot)
+    return kraken_slot_details(load_kraken_cube(week, entity), slot)
 
 
-@st.cache_data(show_spinner="Loading Recipe For Primary Tag data...", persist=False)
+@cached("kraken_primary_tag_details", persist=False)
 def load_primary_tag_details(week, entity, tag):
-    return run_kraken_slot_details_primary_tag(week, entity, tag)
+    return kraken_primary_tag_details(load_kraken_cube(week, entity), kraken_tag_map(load_cpk_all(week, entity)), tag)
 
 
-@st.cache_data(show_spinner="Loading CPK By Product Type data...", persist=False)
+@cached("kraken_cpk_product_type", persist=False)
 def load_cpk_by_product_type(week, entity):
-    return run_kraken_cpk_product_type(week, entity)
+    df = process_kraken_cpk(load_cpk_all(week, entity))[2]
+    df["version"] = df["version"].str.lower()
+    return df
 
 @st.cache_data(show_spinner=False)
 def get_hellofresh_weeks():
@@ -103,6 +122,16 @@ def get_hellofresh_weeks():
     return df['hellofresh_week'].tolist()
 
 
+def slot_titles(df):
+    # Group multiple recipe titles per slot into one string
+    titles = df[["slot", "recipe_title"]].drop_duplicates().sort_values("recipe_title")
+    shared = titles["slot"].duplicated(keep=False)
+    return pd.concat([
+        titles[~shared],
+        titles[shared].groupby("slot", as_index=False)["recipe_title"].agg(" | ".join),
+    ])
+
+
 def compute_mix(df, version):
     df_ver = df[df['version'] == version].copy()
     df_ver['total_kitcount'] = df_ver.groupby('slot')['kitcount'].transform('sum')
@@ -110,9 +139,53 @@ def compute_mix(df, version):
     return df_ver[['slot', 'recipe_size', f'mix_{version}']]
 
 
+# --- v2 vs v3 comparison layouts (see utils/comparison.py) ---
+CPK_FILTER_COLUMNS = ["slot", "primary_tag", "product_type", "recipe_size"]
+CPK_METRICS = [("CPK", "cpk"), ("Kitcount", "kitcount")]
+
+def cpk_comparison(index_cols):
+    return ComparisonSpec(
+        index_cols, CPK_METRICS, versions=["v2", "v3"], variance=["CPK", "Kitcount"], mix=("Mix", "kitcount")
+    )
+
+# The slot's recipe titles depend on the filters, so they are joined onto this table afterwards.
+CPK_BY_SLOT = cpk_comparison(["slot", "product_type", "primary_tag"])
+CPK_BY_PRIMARY_TAG = cpk_comparison(["primary_tag", "product_type"])
+CPK_BY_PRODUCT_TYPE = cpk_comparison(["product_type"])
+
+DETAIL_METRICS = [("Qty", "forecast_sku_quantity"), ("Cost", "sku_unit_cost"), ("Total Cost", "forecast_total_cost")]
+
+# Filters and drill-down pickers per CPK sub-tab, kept while another sub-tab is open
+CPK_WIDGET_KEYS = [
+    "filter_slots", "filter_slot_primary_tag", "filter_slot_product_type",
+    "slot_detail", "filter_recipe_size", "toggle_slot",
+    "filter_primary_tag", "filter_product_type",
+    "primary_tag_detail", "filter_recipe_size_primary_tag", "toggle_primary_tag",
+]
+
+
+def style_cpk_comparison(df_all):
+    return df_all.style.format({
+        col: "${:,.2f}" for col in df_all.columns if col[0] == "CPK" and col[2] in ("v2", "v3")
+    } | {
+        col: "{:,.0f}" for col in df_all.columns if col[0] == "Kitcount" and col[2] in ("v2", "v3")
+    } | {
+        col: "{:+.2%}" for col in df_all.columns if col[2] == "variance"
+    } | {
+        col: "{:.1%}" for col in df_all.columns if col[0] == "Mix"
+    })
+
+
+def sort_by_v3_kitcount(df_all):
+    # Sort by total v3 kitcount across all recipe sizes
+    v3_kit_cols = [col for col in df_all.columns if col[0] == "Kitcount" and col[2] == "v3"]
+    order = df_all[v3_kit_cols].sum(axis=1).sort_values(ascending=False, kind="stable").index
+    return df_all.loc[order]
+
+
 @st.fragment
 def render_summary():
-    df_cpk = load_cpk_by_slot(hellofresh_week_option, entity_option)
+    df_cpk = load_cpk_slot_totals(hellofresh_week_option, entity_option)
     st.header(f"[{entity_option}] {hellofresh_week_option} CPK By Slots")
 
     st.markdown(
@@ -126,22 +199,25 @@ def render_summary():
         st.warning("No CPK data available for the selected filters.")
         return df_cpk
     
-    # 1️⃣ Get filter options
-    slot_list = sorted(df_cpk["slot"].unique())
-    primary_tag_list = sorted(tag for tag in df_cpk["primary_tag"].unique() if pd.notnull(tag))
-    product_type_list = sorted(pt for pt in df_cpk["product_type"].unique() if pd.notnull(pt))
+    # 1️⃣ Get filter options. The bitmap index is built once per loaded week, so
+    # changing a multiselect below only masks it instead of re-filtering the frame.
+    data_key = fingerprint(df_cpk)
+    index = filter_index(df_cpk, CPK_FILTER_COLUMNS, data_key)
+    slot_list = index.values("slot")
+    primary_tag_list = index.values("primary_tag")
+    product_type_list = index.values("product_type")
 
     # 2️⃣ UI - 3 Column Layout
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        selected_slots = st.multiselect("🎯 Filter Slots", options=slot_list, default=[])
+        selected_slots = st.multiselect("🎯 Filter Slots", options=slot_list, key="filter_slots")
 
     with col2:
-        selected_tags = st.multiselect("🏷️ Filter Primary Tags", options=primary_tag_list, default=[])
+        selected_tags = st.multiselect("🏷️ Filter Primary Tags", options=primary_tag_list, key="filter_slot_primary_tag")
 
     with col3:
-        selected_product_types = st.multiselect("📂 Filter Product Types", options=product_type_list, default=[])
+        selected_product_types = st.multiselect("📂 Filter Product Types", options=product_type_list, key="filter_slot_product_type")
 
     # 3️⃣ Default to ALL if none selected
     if not selected_slots:
@@ -150,108 +226,20 @@ def render_summary():
         selected_tags = primary_tag_list
     if not selected_product_types:
         selected_product_types = product_type_list
-        
-    # 4️⃣ Filter df_cpk before pivoting
-    df_cpk = df_cpk[
-        df_cpk["slot"].isin(selected_slots) &
-        df_cpk["primary_tag"].isin(selected_tags) &
-        df_cpk["product_type"].isin(selected_product_types)
-    ]
-
-    # Group multiple recipe titles per slot into one string
-    title_map = df_cpk.groupby("slot")["recipe_title"].apply(lambda x: " | ".join(sorted(set(x)))).reset_index()
-    df_cpk = df_cpk.drop(columns="recipe_title").drop_duplicates()
-    df_cpk = df_cpk.merge(title_map, on="slot", how="left")
-
-    # --- 1. Add product mix: recipe kitcount / total kitcount of that version ---
-    total_kitcount_v2 = df_cpk[df_cpk['version'] == 'v2']['kitcount'].sum()
-    total_kitcount_v3 = df_cpk[df_cpk['version'] == 'v3']['kitcount'].sum()
-
-    df_cpk['mix_v2'] = np.where(
-        df_cpk['version'] == 'v2',
-        df_cpk['kitcount'] / total_kitcount_v2,
-        np.nan
-    )
-
-    df_cpk['mix_v3'] = np.where(
-        df_cpk['version'] == 'v3',
-        df_cpk['kitcount'] / total_kitcount_v3,
-        np.nan
-    )
-
-    # --- 2. Group recipe titles per slot ---
-    title_map = df_cpk.groupby("slot")["recipe_title"].apply(lambda x: " | ".join(sorted(set(x)))).reset_index()
-    df_cpk = df_cpk.drop(columns="recipe_title").drop_duplicates()
-    df_cpk = df_cpk.merge(title_map, on="slot", how="left")
-
-    # --- 3. Set index and column structure ---
-    index_cols = ["slot","product_type", "recipe_title", "primary_tag"]
-    column_levels = ["Metric", "Recipe Size", "Version"]
-
-    # --- 4. Pivot each metric ---
-    pivot_cpk = df_cpk.pivot_table(index=index_cols, columns=["recipe_size", "version"], values="cpk", aggfunc="sum", fill_value=0)
-    pivot_kit = df_cpk.pivot_table(index=index_cols, columns=["recipe_size", "version"], values="kitcount", aggfunc="sum", fill_value=0)
 
-    # For mix, filter valid rows only
-    # Prepare mix_v2 pivot
-    mix_v2_df = df_cpk[df_cpk["version"] == "v2"].copy()
-    mix_v2_df = mix_v2_df.pivot_table(
-        index=index_cols,
-        columns="recipe_size",
-        values="mix_v2",
-        aggfunc="sum",
-        fill_value=0
-    )
-    mix_v2_df.columns = pd.MultiIndex.from_tuples([("Mix", size, "v2") for size in mix_v2_df.columns], names=column_levels)
-
-    # Prepare mix_v3 pivot
-    mix_v3_df = df_cpk[df_cpk["version"] == "v3"].copy()
-    mix_v3_df = mix_v3_df.pivot_table(
-        index=index_cols,
-        columns="recipe_size",
-        values="mix_v3",
-        aggfunc="sum",
-        fill_value=0
-    )
-    mix_v3_df.columns = pd.MultiIndex.from_tuples([("Mix", size, "v3") for size in mix_v3_df.columns], names=column_levels)
-
-    # Combine mix safely
-    pivot_mix = pd.concat([mix_v2_df, mix_v3_df], axis=1)
-
-    # --- 5. Add variance only to cpk and kitcount ---
-    for size in sorted(df_cpk["recipe_size"].unique()):
-        for metric, pivot_df in [("CPK", pivot_cpk), ("Kitcount", pivot_kit)]:
-            try:
-                v2 = pivot_df[(size, "v2")]
-                v3 = pivot_df[(size, "v3")]
-                pivot_df[(size, "variance")] = (v3 - v2) / v2.replace(0, np.nan)
-            except KeyError:
-                continue
-
-    # --- 6. Rename all to 3-level columns ---
-    pivot_cpk.columns = pd.MultiIndex.from_tuples([("CPK",) + col for col in pivot_cpk.columns], names=column_levels)
-    pivot_kit.columns = pd.MultiIndex.from_tuples([("Kitcount",) + col for col in pivot_kit.columns], names=column_levels)
-
-    # --- 7. Combine ---
-    df_all = pd.concat([pivot_cpk, pivot_kit, pivot_mix], axis=1)
-    df_all = df_all.sort_index(axis=1)
-    df_all = df_all.reset_index()
-
-    # 스타일 적용
-    styled_df = df_all.style.format({
-        col: "${:,.2f}" for col in df_all.columns if col[0] == "CPK" and col[2] in ("v2", "v3")
-    } | {
-        col: "{:,.0f}" for col in df_all.columns if col[0] == "Kitcount" and col[2] in ("v2", "v3")
-    } | {
-        col: "{:+.2%}" for col in df_all.columns if col[2] == "variance"
-    } | {
-        col: "{:.1%}" for col in df_all.columns if col[0] == "Mix"
-    })
+    filters = {"slot": selected_slots, "primary_tag": selected_tags, "product_type": selected_product_types}
+    df_all = compare(df_cpk, CPK_BY_SLOT, filters, data_key)
 
-    # --- 9. Show ---
-    st.dataframe(styled_df, use_container_width=True, height=600, hide_index=True)
+    # Titles of the recipes the filters kept, so a slot lists only those
+    df_recipes = load_cpk_by_slot(hellofresh_week_option, entity_option)
+    recipe_index = filter_index(df_recipes, CPK_FILTER_COLUMNS[:3])
+    title_map = slot_titles(df_recipes[recipe_index.mask(filters)])
+    titles = df_all[("slot", "", "")].map(title_map.set_index("slot")["recipe_title"])
+    df_all.insert(2, ("recipe_title", "", ""), titles.to_numpy())
 
+    st.dataframe(style_cpk_comparison(df_all), use_container_width=True, height=600, hide_index=True)
 
+    df_cpk = df_cpk[index.mask(filters)].merge(title_map, on="slot", how="left")
     return df_cpk
 
 
@@ -264,11 +252,11 @@ def render_slot_details(df_cpk):
 
     col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
-        selected_slot = st.selectbox("🔎 View Slot Details", options=slot_list, index=0)
+        selected_slot = st.selectbox("🔎 View Slot Details", options=slot_list, index=0, key="slot_detail")
     with col2:
         selected_size =  st.selectbox("🔎 Recipe Size", options=recipe_size_options, index=0, key="filter_recipe_size")
     with col3:
-        by_sku_group = st.toggle("show details...", value=False)
+        by_sku_group = st.toggle("show details...", value=False, key="toggle_slot")
 
     if selected_slot:
         df_slot_detail = load_slot_details(hellofresh_week_option, entity_option, selected_slot)
@@ -285,60 +273,16 @@ def render_slot_details(df_cpk):
                 index = ["sku_code", "sku_name"]
                 df["sku_unit_cost"] = df["forecast_total_cost"] / df["forecast_sku_quantity"]
             else:
-                df["sku_group"] = df["sku_code"].str[:3]
-                df_grouped = df.groupby("sku_group", as_index=False).agg({
-                    "forecast_sku_quantity": lambda x: x[df["version"] == "v2"].sum(),
-                    "forecast_total_cost": lambda x: x[df["version"] == "v2"].sum(),
-                })
-                # Recompute sku_unit_cost
                 df["sku_group"] = df["sku_code"].str[:3]
                 df = df.groupby(["sku_group", "version"], as_index=False).agg({
                     "forecast_sku_quantity": "sum",
                     "forecast_total_cost": "sum"
                 })
+                # Recompute sku_unit_cost
                 df["sku_unit_cost"] = df["forecast_total_cost"] / df["forecast_sku_quantity"]
                 index = "sku_group"
 
-            pivoted = df.pivot_table(
-                index=index,
-                columns="version",
-                values=["forecast_sku_quantity", "sku_unit_cost", "forecast_total_cost"],
-                aggfunc="sum",
-                fill_value=0
-            ).reset_index()
-
-            pivoted[("forecast_sku_quantity", "variance %")] = (
-                (pivoted[("forecast_sku_quantity", "v3")] - pivoted[("forecast_sku_quantity", "v2")]) /
-                pivoted[("forecast_sku_quantity", "v2")].replace(0, np.nan)
-            )
-            pivoted[("sku_unit_cost", "variance %")] = (
-                (pivoted[("sku_unit_cost", "v3")] - pivoted[("sku_unit_cost", "v2")]) /
-                pivoted[("sku_unit_cost", "v2")].replace(0, np.nan)
-            )
-            pivoted[("forecast_total_cost", "variance %")] = (
-                (pivoted[("forecast_total_cost", "v3")] - pivoted[("forecast_total_cost", "v2")]) /
-                pivoted[("forecast_total_cost", "v2")].replace(0, np.nan)
-            )
-
-            pivoted.columns = [
-                ("", "sku_group") if col == ("sku_group", "") else
-                ("", "sku_code") if col == ("sku_code", "") else
-                ("", "sku_name") if col == ("sku_name", "") else
-                ("Qty", col[1]) if col[0] == "forecast_sku_quantity" else
-                ("Cost", col[1]) if col[0] == "sku_unit_cost" else
-                ("Total Cost", col[1]) if col[0] == "forecast_total_cost" else
-                col
-                for col in pivoted.columns
-            ]
-
-            cols = pivoted.columns.tolist()
-            qty_order = [('Qty', 'v2'), ('Qty', 'v3'), ('Qty', 'variance %')] + [c for c in cols if c[0] == 'Qty' and c[1] not in ['v2', 'v3', 'variance %']]
-            cost_cols = [c for c in cols if c[0] == 'Cost']
-            total_cost_cols = [c for c in cols if c[0] == 'Total Cost']
-            identity_cols = [c for c in cols if c[0] == '']
-            new_order = identity_cols + qty_order + cost_cols + total_cost_cols
-            pivoted = pivoted[new_order]
-            pivoted.columns = pd.MultiIndex.from_tuples(pivoted.columns)
+            pivoted = version_table(df, index, DETAIL_METRICS)
 
             def dollarwithdecimal(x): return f"${x:,.2f}"
             def dollar(x): return f"${x:,.0f}"
@@ -425,102 +369,30 @@ def render_summary_cpk_primary_tag():
         st.warning("No data available for the selected filters.")
         return df_cpk
 
-    primary_tag_list = sorted(tag for tag in df_cpk["primary_tag"].unique() if pd.notnull(tag))
-    product_type_list = sorted(pt for pt in df_cpk["product_type"].unique() if pd.notnull(pt))
+    data_key = fingerprint(df_cpk)
+    index = filter_index(df_cpk, CPK_FILTER_COLUMNS[1:], data_key)
+    primary_tag_list = index.values("primary_tag")
+    product_type_list = index.values("product_type")
 
     # 2️⃣ UI - 3 Column Layout
     col1, col2, col3 = st.columns(3)
     with col1:
-        selected_tags = st.multiselect("🏷️ Filter Primary Tags", options=primary_tag_list, default=[], key="filter_primary_tag")
+        selected_tags = st.multiselect("🏷️ Filter Primary Tags", options=primary_tag_list, key="filter_primary_tag")
 
     with col2:
-        selected_product_types = st.multiselect("📂 Filter Product Types", options=product_type_list, default=[], key="filter_product_type")
+        selected_product_types = st.multiselect("📂 Filter Product Types", options=product_type_list, key="filter_product_type")
         
     if not selected_tags:
         selected_tags = primary_tag_list
     if not selected_product_types:
         selected_product_types = product_type_list
         
-    # 4️⃣ Filter df_cpk before pivoting
-    df_cpk = df_cpk[
-        df_cpk["primary_tag"].isin(selected_tags) &
-        df_cpk["product_type"].isin(selected_product_types)
-    ]
-
-    # Normalize version casing
-    df_cpk["version"] = df_cpk["version"].str.lower()
-
-    # --- 1. Add product mix: recipe kitcount / total kitcount of that version ---
-    total_kitcount_v2 = df_cpk[df_cpk['version'] == 'v2']['kitcount'].sum()
-    total_kitcount_v3 = df_cpk[df_cpk['version'] == 'v3']['kitcount'].sum()
-
-    df_cpk['mix_v2'] = np.where(
-        df_cpk['version'] == 'v2',
-        df_cpk['kitcount'] / total_kitcount_v2,
-        np.nan
-    )
-
-    df_cpk['mix_v3'] = np.where(
-        df_cpk['version'] == 'v3',
-        df_cpk['kitcount'] / total_kitcount_v3,
-        np.nan
-    )
-
-    index_cols = ["primary_tag", "product_type"]
-    column_levels = ["Metric", "Recipe Size", "Version"]
-
-    # --- 2. Pivot main metrics ---
-    pivot_cpk = df_cpk.pivot_table(index=index_cols, columns=["recipe_size", "version"], values="cpk", aggfunc="sum", fill_value=0)
-    pivot_kit = df_cpk.pivot_table(index=index_cols, columns=["recipe_size", "version"], values="kitcount", aggfunc="sum", fill_value=0)
-
-    # --- 3. Pivot mix ---
-    mix_v2_df = df_cpk[df_cpk["version"] == "v2"].pivot_table(
-        index=index_cols, columns="recipe_size", values="mix_v2", aggfunc="sum", fill_value=0
-    )
-    mix_v2_df.columns = pd.MultiIndex.from_tuples([("Mix", size, "v2") for size in mix_v2_df.columns], names=column_levels)
-
-    mix_v3_df = df_cpk[df_cpk["version"] == "v3"].pivot_table(
-        index=index_cols, columns="recipe_size", values="mix_v3", aggfunc="sum", fill_value=0
-    )
-    mix_v3_df.columns = pd.MultiIndex.from_tuples([("Mix", size, "v3") for size in mix_v3_df.columns], names=column_levels)
-
-    pivot_mix = pd.concat([mix_v2_df, mix_v3_df], axis=1)
-
-    # --- 4. Add variance columns ---
-    for size in sorted(df_cpk["recipe_size"].unique()):
-        for metric, pivot_df in [("CPK", pivot_cpk), ("Kitcount", pivot_kit)]:
-            try:
-                v2 = pivot_df[(size, "v2")]
-                v3 = pivot_df[(size, "v3")]
-                pivot_df[(size, "variance")] = (v3 - v2) / v2.replace(0, np.nan)
-            except KeyError:
-                continue
-
-    # --- 5. Rename levels ---
-    pivot_cpk.columns = pd.MultiIndex.from_tuples([("CPK",) + col for col in pivot_cpk.columns], names=column_levels)
-    pivot_kit.columns = pd.MultiIndex.from_tuples([("Kitcount",) + col for col in pivot_kit.columns], names=column_levels)
-
-    # --- 6. Combine ---
-    df_all = pd.concat([pivot_cpk, pivot_kit, pivot_mix], axis=1)
-    df_all = df_all.sort_index(axis=1).reset_index()
-
-    # Sort by total v3 kitcount across all recipe sizes
-    v3_kit_cols = [col for col in df_all.columns if col[0] == "Kitcount" and col[2] == "v3"]
-    df_all["__sort_total_v3_kitcount"] = df_all[v3_kit_cols].sum(axis=1)
-    df_all = df_all.sort_values("__sort_total_v3_kitcount", ascending=False).drop(columns="__sort_total_v3_kitcount")
+    filters = {"primary_tag": selected_tags, "product_type": selected_product_types}
+    df_all = sort_by_v3_kitcount(compare(df_cpk, CPK_BY_PRIMARY_TAG, filters, data_key))
 
-    # --- 7. Format style ---
-    styled_df = df_all.style.format({
-        col: "${:,.2f}" for col in df_all.columns if col[0] == "CPK" and col[2] in ("v2", "v3")
-    } | {
-        col: "{:,.0f}" for col in df_all.columns if col[0] == "Kitcount" and col[2] in ("v2", "v3")
-    } | {
-        col: "{:+.2%}" for col in df_all.columns if col[2] == "variance"
-    } | {
-        col: "{:.1%}" for col in df_all.columns if col[0] == "Mix"
-    })
+    st.dataframe(style_cpk_comparison(df_all), use_container_width=True, height=600, hide_index=True)
 
-    st.dataframe(styled_df, use_container_width=True, height=600,hide_index= True)
+    df_cpk = df_cpk[index.mask(filters)]
 
     return df_cpk
 
@@ -533,7 +405,7 @@ def render_primary_tag_details(df_cpk):
 
     col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
-        selected_primary_tag = st.selectbox("🔎 View Primary Tag Details", options=primary_tag_list, index=0)
+        selected_primary_tag = st.selectbox("🔎 View Primary Tag Details", options=primary_tag_list, index=0, key="primary_tag_detail")
     with col2:
         selected_size =  st.selectbox("🔎 Recipe Size", options=recipe_size_options, index=0, key="filter_recipe_size_primary_tag")
     with col3:
@@ -560,49 +432,7 @@ def render_primary_tag_details(df_cpk):
                 df["sku_unit_cost"] = df["forecast_total_cost"] / df["forecast_sku_quantity"]
                 index = "sku_group"
 
-            pivoted = df.pivot_table(
-                index=index,
-                columns="version",
-                values=["forecast_sku_quantity", "sku_unit_cost", "forecast_total_cost"],
-                aggfunc="sum",
-                fill_value=0
-            ).reset_index()
-
-            # Add variance %
-            pivoted[("forecast_sku_quantity", "variance %")] = (
-                (pivoted[("forecast_sku_quantity", "v3")] - pivoted[("forecast_sku_quantity", "v2")]) /
-                pivoted[("forecast_sku_quantity", "v2")].replace(0, np.nan)
-            )
-            pivoted[("sku_unit_cost", "variance %")] = (
-                (pivoted[("sku_unit_cost", "v3")] - pivoted[("sku_unit_cost", "v2")]) /
-                pivoted[("sku_unit_cost", "v2")].replace(0, np.nan)
-            )
-            pivoted[("forecast_total_cost", "variance %")] = (
-                (pivoted[("forecast_total_cost", "v3")] - pivoted[("forecast_total_cost", "v2")]) /
-                pivoted[("forecast_total_cost", "v2")].replace(0, np.nan)
-            )
-
-            # Rename top-level headers
-            pivoted.columns = [
-                ("", "sku_group") if col == ("sku_group", "") else
-                ("", "sku_code") if col == ("sku_code", "") else
-                ("", "sku_name") if col == ("sku_name", "") else
-                ("Qty", col[1]) if col[0] == "forecast_sku_quantity" else
-                ("Cost", col[1]) if col[0] == "sku_unit_cost" else
-                ("Total Cost", col[1]) if col[0] == "forecast_total_cost" else
-                col
-                for col in pivoted.columns
-            ]
-
-            # Reorder columns
-            cols = pivoted.columns.tolist()
-            qty_order = [('Qty', 'v2'), ('Qty', 'v3'), ('Qty', 'variance %')] + [c for c in cols if c[0] == 'Qty' and c[1] not in ['v2', 'v3', 'variance %']]
-            cost_cols = [c for c in cols if c[0] == 'Cost']
-            total_cost_cols = [c for c in cols if c[0] == 'Total Cost']
-            identity_cols = [c for c in cols if c[0] == '']
-            new_order = identity_cols + qty_order + cost_cols + total_cost_cols
-            pivoted = pivoted[new_order]
-            pivoted.columns = pd.MultiIndex.from_tuples(pivoted.columns)
+            pivoted = version_table(df, index, DETAIL_METRICS)
 
             # Summary cards
             sum_qty_v2 = pivoted[("Qty", "v2")].sum()
@@ -679,80 +509,9 @@ def render_summary_cpk_product_type():
         st.warning("No data available for the selected filters.")
         return df_cpk
 
-    # Normalize version casing
-    df_cpk["version"] = df_cpk["version"].str.lower()
-
-    # --- 1. Add product mix: recipe kitcount / total kitcount of that version ---
-    total_kitcount_v2 = df_cpk[df_cpk['version'] == 'v2']['kitcount'].sum()
-    total_kitcount_v3 = df_cpk[df_cpk['version'] == 'v3']['kitcount'].sum()
-
-    df_cpk['mix_v2'] = np.where(
-        df_cpk['version'] == 'v2',
-        df_cpk['kitcount'] / total_kitcount_v2,
-        np.nan
-    )
-
-    df_cpk['mix_v3'] = np.where(
-        df_cpk['version'] == 'v3',
-        df_cpk['kitcount'] / total_kitcount_v3,
-        np.nan
-    )
-
-    index_cols = ["product_type"]
-    column_levels = ["Metric", "Recipe Size", "Version"]
-
-    # --- 2. Pivot main metrics ---
-    pivot_cpk = df_cpk.pivot_table(index=index_cols, columns=["recipe_size", "version"], values="cpk", aggfunc="sum", fill_value=0)
-    pivot_kit = df_cpk.pivot_table(index=index_cols, columns=["recipe_size", "version"], values="kitcount", aggfunc="sum", fill_value=0)
-
-    # --- 3. Pivot mix ---
-    mix_v2_df = df_cpk[df_cpk["version"] == "v2"].pivot_table(
-        index=index_cols, columns="recipe_size", values="mix_v2", aggfunc="sum", fill_value=0
-    )
-    mix_v2_df.columns = pd.MultiIndex.from_tuples([("Mix", size, "v2") for size in mix_v2_df.columns], names=column_levels)
-
-    mix_v3_df = df_cpk[df_cpk["version"] == "v3"].pivot_table(
-        index=index_cols, columns="recipe_size", values="mix_v3", aggfunc="sum", fill_value=0
-    )
-    mix_v3_df.columns = pd.MultiIndex.from_tuples([("Mix", size, "v3") for size in mix_v3_df.columns], names=column_levels)
-
-    pivot_mix = pd.concat([mix_v2_df, mix_v3_df], axis=1)
-
-    # --- 4. Add variance columns ---
-    for size in sorted(df_cpk["recipe_size"].unique()):
-        for metric, pivot_df in [("CPK", pivot_cpk), ("Kitcount", pivot_kit)]:
-            try:
-                v2 = pivot_df[(size, "v2")]
-                v3 = pivot_df[(size, "v3")]
-                pivot_df[(size, "variance")] = (v3 - v2) / v2.replace(0, np.nan)
-            except KeyError:
-                continue
-
-    # --- 5. Rename levels ---
-    pivot_cpk.columns = pd.MultiIndex.from_tuples([("CPK",) + col for col in pivot_cpk.columns], names=column_levels)
-    pivot_kit.columns = pd.MultiIndex.from_tuples([("Kitcount",) + col for col in pivot_kit.columns], names=column_levels)
-
-    # --- 6. Combine ---
-    df_all = pd.concat([pivot_cpk, pivot_kit, pivot_mix], axis=1)
-    df_all = df_all.sort_index(axis=1).reset_index()
-
-    # Sort by total v3 kitcount across all recipe sizes
-    v3_kit_cols = [col for col in df_all.columns if col[0] == "Kitcount" and col[2] == "v3"]
-    df_all["__sort_total_v3_kitcount"] = df_all[v3_kit_cols].sum(axis=1)
-    df_all = df_all.sort_values("__sort_total_v3_kitcount", ascending=False).drop(columns="__sort_total_v3_kitcount")
-
-    # --- 7. Format style ---
-    styled_df = df_all.style.format({
-        col: "${:,.2f}" for col in df_all.columns if col[0] == "CPK" and col[2] in ("v2", "v3")
-    } | {
-        col: "{:,.0f}" for col in df_all.columns if col[0] == "Kitcount" and col[2] in ("v2", "v3")
-    } | {
-        col: "{:+.2%}" for col in df_all.columns if col[2] == "variance"
-    } | {
-        col: "{:.1%}" for col in df_all.columns if col[0] == "Mix"
-    })
+    df_all = sort_by_v3_kitcount(compare(df_cpk, CPK_BY_PRODUCT_TYPE))
 
-    st.dataframe(styled_df, use_container_width=True, height=250,hide_index= True)
+    st.dataframe(style_cpk_comparison(df_all), use_container_width=True, height=250, hide_index=True)
 
     return df_cpk
 
@@ -772,7 +531,6 @@ st.markdown("""
 
 
 # --- UI ---
-st.cache_data.clear()
 
 
 # Sidebar top
@@ -835,13 +593,21 @@ with st.sidebar:
             "Country",
             options=["AU","AO","NZ"]
         )
+        version_option = None  # CPK shows every version
+
+    # After a Kraken re-run: drops this week's results and makes the trend series refetch from it
+    if st.button("🔄 Refresh Data"):
+        invalidate_kraken_run(hellofresh_week_option, version_option)
+        st.rerun()
 
 if selected_tab == "Executive Summary":
     
     # Load raw data (cached per version)
     # df_raw_all = load_raw_data(hellofresh_week_option, version_option)
-    df_trends = load_trend_data()
-    df_supplier_errors = load_supplier_error_data()
+    df_trends, df_supplier_errors = batch.load([
+        (load_trend_data, ()),
+        (load_supplier_error_data, ()),
+    ])
 
     df_trend_version= df_trends[df_trends["version"] == version_option]
     df_supplier_errors_version= df_supplier_errors[df_supplier_errors["version"] == version_option]
@@ -985,7 +751,7 @@ if selected_tab == "Executive Summary":
 
         # Display in each column
         with cols[idx]:
-            st_echarts(options=options, height="400px")
+            echarts.st_echarts(options=options, height="400px")
 
 
 
@@ -1051,14 +817,18 @@ if selected_tab == "Executive Summary":
             }
 
             with cols[idx % 3]:  # To handle fewer than 3 entities
-                st_echarts(options=options, height="400px")
+                echarts.st_echarts(options=options, height="400px")
 
 
 elif selected_tab == "Reconciliation":
-    df_raw_all = load_raw_data(hellofresh_week_option, entity_option, version_option)
-    df_kit_count = load_kit_count_to_production_data(hellofresh_week_option,entity_option)
+    # Raw lines are paged in the warehouse; only the visible page reaches the browser.
+    raw_source = QuerySource("kraken_raw", week=hellofresh_week_option, entity=entity_option, version=version_option)
+    df_kit_count, *_ = batch.load([
+        (load_kit_count_to_production_data, (hellofresh_week_option, entity_option)),
+        *raw_source.first_page_tasks(),
+    ])
     st.header(f"[{version_option.upper()}] {hellofresh_week_option} Kraken Ops Reconciliation")
-    st.dataframe(df_raw_all, use_container_width=True, height=700)
+    paged_dataframe(raw_source, key="reconciliation_raw", height=700)
     st.header(f"[{version_option.upper()}] {hellofresh_week_option} Kit Count Transformed To Production")
     # Pivot to make `recipe_size` columns
     df_pivoted = df_kit_count.pivot_table(
@@ -1077,12 +847,17 @@ elif selected_tab == "Reconciliation":
         3: "3P",
         4: "4P"
     })
-    st.dataframe(df_pivoted, use_container_width=True, height=700)
+    paged_dataframe(FrameSource(df_pivoted), key="reconciliation_kit_count", height=700)
 
 
 
 elif selected_tab == "Null Price Error":
-    df_raw_price_error = load_null_price_data(version_option, hellofresh_week_option)
+    raw_price_error_source = QuerySource("null_price_errors", version=version_option, week=hellofresh_week_option)
+    df_trend_price_error, df_price_error_summary, *_ = batch.load([
+        (load_null_price_data_trend, (version_option,)),
+        (load_null_price_summary, (version_option, hellofresh_week_option)),
+        *raw_price_error_source.first_page_tasks(),
+    ])
     
     st.header(f"[{version_option.upper()}] {hellofresh_week_option}  Null Price Error")
 
@@ -1093,14 +868,17 @@ elif selected_tab == "Null Price Error":
         unsafe_allow_html=True
     )
 
-    if not df_raw_price_error.empty:
+    if not df_price_error_summary.empty:
         # Set order of countries
         country_order = CategoricalDtype(["AU", "AO", "NZ"], ordered=True)
-        df_raw_price_error["bob_entity_code"] = df_raw_price_error["bob_entity_code"].astype(country_order)
+        # assign() copies, so the cached frame shared with other sessions is left as it is
+        df_price_error_summary = df_price_error_summary.assign(
+            bob_entity_code=df_price_error_summary["bob_entity_code"].astype(country_order)
+        )
 
-        # Group and format total_costs
+        # One row per country, already summed in the warehouse; the groupby fills in missing countries
         summary_df = (
-            df_raw_price_error.groupby("bob_entity_code")["total_costs"]
+            df_price_error_summary.groupby("bob_entity_code")["total_costs"]
             .sum()
             .reset_index()
         )
@@ -1134,7 +912,6 @@ elif selected_tab == "Null Price Error":
         """,
         unsafe_allow_html=True
     )
-    df_trend_price_error = load_null_price_data_trend(version_option)
 
 
     if not df_trend_price_error.empty:
@@ -1152,7 +929,7 @@ elif selected_tab == "Null Price Error":
 
                 with cols[i]:
                     st.markdown(f"**{entity} Weekly Total Costs**")
-                    st_echarts({
+                    echarts.st_echarts({
                         "xAxis": {"type": "category", "data": x_data},
                         "yAxis": {"type": "value"},
                         "series": [{
@@ -1193,22 +970,82 @@ elif selected_tab == "Null Price Error":
         unsafe_allow_html=True
     )
     # --- Detailed Data ---
-    st.dataframe(df_raw_price_error, use_container_width=True, height=700)
+    paged_dataframe(raw_price_error_source, key="null_price_error_raw", height=700)
     
 
 
 elif selected_tab == "CPK":
-    sub_tabs = st.tabs(["📦 By Slot", "🏷️ By Primary Tag", "📂 By Product Type"])
+    # Only the open sub-tab loads and renders; the others run when first opened.
+    sub_tabs = lazy_tabs(["📦 By Slot", "🏷️ By Primary Tag", "📂 By Product Type"], key="cpk_tab", keep=CPK_WIDGET_KEYS)
+    cpk_args = (hellofresh_week_option, entity_option)
+    df_cpk = None
 
     with sub_tabs[0]:  # By Slot
-        df_cpk = render_summary()
-        render_slot_details(df_cpk)
+        if sub_tabs[0].open:
+            # The summary and its drill-down read different queries; load both at once.
+            batch.load(
+                [(load_cpk_slot_totals, cpk_args), (load_cpk_by_slot, cpk_args), (load_kraken_cube, cpk_args)],
+                spinner="Loading CPK data...",
+            )
+            df_cpk = render_summary()
+            render_slot_details(df_cpk)
 
     with sub_tabs[1]:  # By Primary Tag
-        df_cpk_primary_tag = render_summary_cpk_primary_tag()
-        render_primary_tag_details(df_cpk_primary_tag)
+        if sub_tabs[1].open:
+            batch.load([(load_cpk_by_primary_tag, cpk_args), (load_kraken_cube, cpk_args)], spinner="Loading CPK data...")
+            df_cpk_primary_tag = render_summary_cpk_primary_tag()
+            render_primary_tag_details(df_cpk_primary_tag)
             
     with sub_tabs[2]:  # By Product Type
-        df_cpk_product_type = render_summary_cpk_product_type()
+        if sub_tabs[2].open:
+            df_cpk_product_type = render_summary_cpk_product_type()
+
+
+# --- Background prefetch: the neighbouring weeks and the likely next drill-downs ---
+if selected_tab == "Reconciliation":
+    prefetch.schedule(
+        ("krakenops", selected_tab, hellofresh_week_option, entity_option),
+        [
+            task
+            for week in prefetch.adjacent(hellofresh_weeks, hellofresh_week_option)
+            for task in QuerySource("kraken_raw", week=week, entity=entity_option, version=version_option).first_page_tasks()
+        ]
+        + [(load_kit_count_to_production_data, (week, entity_option)) for week in prefetch.adjacent(hellofresh_weeks, hellofresh_week_option)],
+    )
+elif selected_tab == "Null Price Error":
+    prefetch.schedule(
+        ("krakenops", selected_tab, hellofresh_week_option, version_option),
+        [
+            task
+            for week in prefetch.adjacent(hellofresh_weeks, hellofresh_week_option)
+            for task in QuerySource("null_price_errors", version=version_option, week=week).first_page_tasks()
+        ]
+        + [(load_null_price_summary, (version_option, week)) for week in prefetch.adjacent(hellofresh_weeks, hellofresh_week_option)],
+    )
+elif selected_tab == "CPK":
+    # Slots with the most v3 kits under the current filters are the ones opened first
+    top_slots = []
+    if df_cpk is not None and not df_cpk.empty:
+        kitcount_by_slot = df_cpk[df_cpk["version"] == "v3"].groupby("slot")["kitcount"].sum()
+        top_slots = kitcount_by_slot.nlargest(prefetch.PREFETCH_TOP_SLOTS).index.tolist()
+    # The hidden sub-tabs only slice the already loaded CPK data, so they are cheap to have ready.
+    hidden_views = [
+        (loader, cpk_args)
+        for tab, loaders in zip(sub_tabs, [[load_cpk_slot_totals, load_cpk_by_slot], [load_cpk_by_primary_tag], [load_cpk_by_product_type]])
+        if not tab.open
+        for loader in loaders
+    ]
+    prefetch.schedule(
+        ("krakenops", selected_tab, hellofresh_week_option, entity_option, st.session_state.get("cpk_tab"), tuple(top_slots)),
+        [(load_slot_details, (hellofresh_week_option, entity_option, slot)) for slot in top_slots]
+        + hidden_views
+        + [
+            (loader, (week, entity_option))
+            for week in prefetch.adjacent(hellofresh_weeks, hellofresh_week_option)
+            for loader in (load_cpk_slot_totals, load_cpk_by_slot)
+        ],
+    )
+else:
+    prefetch.cancel()
 
             
\ No newline at end of file
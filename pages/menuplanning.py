@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+from utils.cache import cached
 from utils.menuplanningquery import (
     run_sales_cogs_by_slot_raw,
     process_sales_cogs_data,
@@ -24,11 +25,11 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-@st.cache_data(show_spinner="Loading sales data...", persist=True)
+@cached("sales_cogs_by_slot", show_spinner="Loading sales data...")
 def get_sales_cogs_by_slot_data(version, week):
     return run_sales_cogs_by_slot_raw(version,week)
 
-@st.cache_data(show_spinner="Loading sales data...", persist=True)
+@cached("recipes_raw", show_spinner="Loading sales data...")
 def get_recipe_raw_data(version, week):
     return run_recipes_raw_data(version,week)
 
@@ -227,7 +228,7 @@ if report_option == "By Slot":
 
             }, inplace=True)
 
-            filtered_raw = blank_repeats(filtered_raw, ['DC', 'Recipe Size'])
+            filtered_raw = blank_repeats(filtered_raw, ['DC', 'Recipe Size'], hierarchical=True)
             # --- Calculate total row ---
             numeric_cols = filtered_raw.select_dtypes(include='number').columns
             total_row = filtered_raw[numeric_cols].sum().to_frame().T
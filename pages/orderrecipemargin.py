@@ -1,9 +1,8 @@
 import streamlit as st
 import pandas as pd
-from pyspark.sql import functions as F
-from openai import OpenAI
 import numpy as np
 
+from utils.cache import cached
 from utils.orderrecipemarginquery import (
     run_order_recipe_margin_raw,
     run_incremental_revenue_raw
@@ -52,12 +51,12 @@ st.markdown("""
 
 
 
-@st.cache_data(show_spinner="Loading Box Order Recipe data...", persist=False)
-def load_order_recipe_margin_raw_data(hellofresh_week_option,entity_option):
-    return run_order_recipe_margin_raw(hellofresh_week_option,entity_option)
+@cached("order_recipe_margin", show_spinner="Loading Box Order Recipe data...")
+def load_order_recipe_margin_raw_data(week, entity):
+    return run_order_recipe_margin_raw(week, entity)
 
 
-@st.cache_data(show_spinner="Loading Incremental revenue data...", persist=False)
+@cached("incremental_revenue", show_spinner="Loading Incremental revenue data...")
 def load_incremental_revenue_raw_data():
     return run_incremental_revenue_raw()
 
@@ -82,7 +81,6 @@ st.markdown("""
 
 
 # --- UI ---
-st.cache_data.clear()
 
 # 사이드바 상단에 Home 버튼 추가
 if st.sidebar.button(f"🏠︎"):
@@ -0,0 +1,343 @@
+"""Identity for the portal: user stores, a short-lived user cache and signed sessions.
+
+A login reads the user's record through ``UserCache`` (at most one store query
+per email per ``USER_CACHE_TTL_SECONDS``) and, on success, puts a signed session
+token in the portal cookie. Every later page checks that token locally with
+``current_user``, so navigation never goes back to the user store.
+"""
+import argparse
+import base64
+import binascii
+import getpass
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import streamlit as st
+
+from utils.config import get_config
+from utils.passwords import check_password, hash_password
+from utils.ratelimit import email_key, get_login_limiter, login_keys
+
+# --- Defaults (override via environment on the app container) ---
+# "warehouse" reads anz_finance_app.users; "sqlite" keeps users in a local file (the default with PORTAL_DB_BACKEND=duckdb)
+USER_STORE = os.environ.get(
+    "PORTAL_USER_STORE", "sqlite" if os.environ.get("PORTAL_DB_BACKEND") == "duckdb" else "warehouse"
+)
+USER_DB_PATH = os.environ.get("PORTAL_USER_DB_PATH", os.path.join(".cache", "users.sqlite3"))
+# How long a looked-up user record (or its absence) is trusted before the store is asked again
+USER_CACHE_TTL_SECONDS = float(os.environ.get("PORTAL_USER_CACHE_TTL_SECONDS", 300))
+# Lifetime of a session token; users log in again after this
+SESSION_TTL_SECONDS = int(os.environ.get("PORTAL_SESSION_TTL_SECONDS", 12 * 60 * 60))
+
+COOKIE_PREFIX = "hellofresh/finance/bi-portal"
+SESSION_COOKIE = "session"
+SESSION_TOKEN_VERSION = "v1"
+
+USER_FIELDS = ("email", "password_hash", "department", "default_bob_entity_code")
+
+
+# --- User stores ---
+class WarehouseUserStore:
+    """Users in ``anz_finance_app.users`` on the warehouse."""
+
+    def get(self, email):
+        from utils.db import connection
+
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT email, password_hash, department, default_bob_entity_code
+                FROM hive_metastore.anz_finance_app.users
+                WHERE email = ? AND line_del = false
+                LIMIT 1
+            """, (email,))
+            row = cursor.fetchone()
+        return dict(zip(USER_FIELDS, row)) if row else None
+
+    def add(self, email, password_hash, department, entity_code):
+        from utils.db import connection
+
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO hive_metastore.anz_finance_app.users
+                (email, password_hash, department, default_bob_entity_code, line_del)
+                VALUES (?, ?, ?, ?, false)
+                """,
+                (email, password_hash, department, entity_code)
+            )
+            conn.commit()
+
+    def set_password_hash(self, email, password_hash):
+        from utils.db import connection
+
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE hive_metastore.anz_finance_app.users
+                SET password_hash = ?
+                WHERE email = ? AND line_del = false
+            """, (password_hash, email))
+            conn.commit()
+
+
+class SqliteUserStore:
+    """The same user table in a local SQLite file, for the DuckDB backend and local runs."""
+
+    def __init__(self, path=USER_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    email TEXT NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    department TEXT,
+                    default_bob_entity_code TEXT,
+                    line_del INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS users_email ON users (email)")
+
+    def _connect(self):
+        # One short-lived connection per call; SQLite serializes writers across threads and processes.
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, email):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT email, password_hash, department, default_bob_entity_code FROM users"
+                " WHERE email = ? AND line_del = 0 LIMIT 1",
+                (email,),
+            ).fetchone()
+        return dict(zip(USER_FIELDS, row)) if row else None
+
+    def add(self, email, password_hash, department, entity_code):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO users (email, password_hash, department, default_bob_entity_code, line_del)"
+                " VALUES (?, ?, ?, ?, 0)",
+                (email, password_hash, department, entity_code),
+            )
+
+    def set_password_hash(self, email, password_hash):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE users SET password_hash = ? WHERE email = ? AND line_del = 0", (password_hash, email))
+
+
+USER_STORES = {"warehouse": WarehouseUserStore, "sqlite": SqliteUserStore}
+
+
+@st.cache_resource(show_spinner=False)
+def get_user_store():
+    # One store per process, shared by every Streamlit session.
+    if USER_STORE not in USER_STORES:
+        raise ValueError(f"PORTAL_USER_STORE must be one of {sorted(USER_STORES)}, not {USER_STORE!r}")
+    return USER_STORES[USER_STORE]()
+
+
+# --- User cache ---
+class UserCache:
+    """User records by email, each trusted for ``ttl`` seconds.
+
+    Unknown emails are cached too, so repeated failed logins or signup checks
+    for the same address don't reach the store. Writes made through this module
+    invalidate the entry at once; changes made elsewhere show up within ``ttl``.
+    """
+
+    def __init__(self, store, ttl=USER_CACHE_TTL_SECONDS):
+        self.store = store
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, email):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None and entry[0] > now:
+                self.stats["hits"] += 1
+                return entry[1]
+            self.stats["misses"] += 1
+        user = self.store.get(email)
+        with self._lock:
+            self._entries[email] = (time.monotonic() + self.ttl, user)
+        return user
+
+    def invalidate(self, email=None):
+        with self._lock:
+            if email is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(email, None)
+
+
+@st.cache_resource(show_spinner=False)
+def get_user_cache():
+    return UserCache(get_user_store())
+
+
+# --- Users ---
+def email_exists(email: str) -> bool:
+    return get_user_cache().get(email) is not None
+
+
+def validate_login(email, password):
+    user = get_user_cache().get(email)
+    if user:
+        return check_password(password, user["password_hash"])
+    return False
+
+
+def attempt_login(email, password, client=None):
+    """``validate_login`` behind the login rate limiter; returns ``(ok, retry_after_seconds, checked)``.
+
+    A refused attempt is answered from the limiter alone, without a user lookup
+    or bcrypt, and comes back with ``checked`` False. A checked wrong password
+    comes back with the lockout it triggered, if any. Failures count towards a
+    lockout of the email only, so one user's typos never lock out everyone
+    behind the same proxy.
+    """
+    limiter = get_login_limiter()
+    wait = limiter.acquire(login_keys(email, client))
+    if wait:
+        return False, wait, False
+    if validate_login(email, password):
+        limiter.record_success([email_key(email)])
+        return True, 0.0, True
+    return False, limiter.record_failure([email_key(email)]), True
+
+
+def register_user(email: str, password: str, department: str, entity_code: str):
+    get_user_store().add(email, hash_password(password), department, entity_code)
+    get_user_cache().invalidate(email)
+
+
+def reset_user_password(email: str, new_password: str, token: str):
+    from utils.db import mark_token_as_used
+
+    get_user_store().set_password_hash(email, hash_password(new_password))
+    get_user_cache().invalidate(email)
+    mark_token_as_used(token)
+
+
+# --- Session tokens ---
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(message):
+    key = get_config().session_secret.encode("utf-8")
+    return hmac.new(key, message.encode("ascii"), hashlib.sha256).digest()
+
+
+def issue_session_token(email, ttl=SESSION_TTL_SECONDS):
+    """A token naming ``email`` until ``ttl`` seconds from now, signed with the session secret."""
+    now = int(time.time())
+    payload = _b64encode(json.dumps({"sub": email, "iat": now, "exp": now + ttl}, separators=(",", ":")).encode("utf-8"))
+    message = f"{SESSION_TOKEN_VERSION}.{payload}"
+    return f"{message}.{_b64encode(_signature(message))}"
+
+
+def _claims(token):
+    try:
+        version, payload, signature = token.split(".")
+    except (AttributeError, ValueError):
+        return None
+    if version != SESSION_TOKEN_VERSION:
+        return None
+    try:
+        if not hmac.compare_digest(_b64decode(signature), _signature(f"{version}.{payload}")):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if not isinstance(claims, dict) or not claims.get("sub") or claims.get("exp", 0) <= time.time():
+        return None
+    return claims
+
+
+def verify_session_token(token):
+    """The email a token was issued for, or None if it is malformed, forged or expired."""
+    claims = _claims(token)
+    return claims["sub"] if claims else None
+
+
+# --- Cookies ---
+def session_cookies():
+    """The portal's encrypted cookie jar; stops the script until the browser has sent it.
+
+    Must be created the same way on every page that reads or writes the session.
+    """
+    from streamlit_cookies_manager import EncryptedCookieManager
+
+    cookies = EncryptedCookieManager(prefix=COOKIE_PREFIX, password=get_config().cookies_password)
+    if not cookies.ready():
+        # Wait for the component to load and send us current cookies.
+        st.stop()
+    return cookies
+
+
+def current_user(cookies):
+    """Email of the signed-in user, checked from the session cookie alone, or None."""
+    token = cookies.get(SESSION_COOKIE)
+    if not token:
+        return None
+    # Verified once per token per session; reruns only compare strings.
+    verified = st.session_state.get("_auth_session")
+    if verified and verified[0] == token and verified[2] > time.time():
+        return verified[1]
+    claims = _claims(token)
+    if claims is None:
+        return None
+    st.session_state["_auth_session"] = (token, claims["sub"], claims["exp"])
+    return claims["sub"]
+
+
+def start_session(cookies, email):
+    token = issue_session_token(email)
+    cookies[SESSION_COOKIE] = token
+    cookies["user_email"] = email
+    # We'll use the email as the user's name for display purposes.
+    cookies["user_name"] = email
+    cookies.save()
+    return token
+
+
+def end_session(cookies):
+    cookies[SESSION_COOKIE] = ""
+    cookies["user_email"] = json.dumps({})
+    cookies["user_name"] = json.dumps({})
+    cookies.save()
+    st.session_state.pop("_auth_session", None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add a user to the local SQLite user store (PORTAL_USER_STORE=sqlite)")
+    parser.add_argument("email")
+    parser.add_argument("--department", default="Finance")
+    parser.add_argument("--entity", default="AU")
+    parser.add_argument("--db", default=USER_DB_PATH)
+    args = parser.parse_args(argv)
+
+    store = SqliteUserStore(args.db)
+    if store.get(args.email):
+        parser.error(f"{args.email} already exists in {args.db}")
+    store.add(args.email, hash_password(getpass.getpass("Password: ")), args.department, args.entity)
+    print(f"Added {args.email} to {args.db}")
+
+
+if __name__ == "__main__":
+    main()
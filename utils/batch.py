@@ -0,0 +1,53 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from utils import telemetry
+
+# --- Defaults (override via environment on the app container) ---
+# Loader calls running at once across all sessions; 1 loads every batch serially on the script thread.
+BATCH_WORKERS = int(os.environ.get("PORTAL_BATCH_WORKERS", 8))
+
+
+@st.cache_resource(show_spinner=False)
+def get_executor():
+    return ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+
+
+def _call(page, loader, args, kwargs):
+    # Worker threads have no page frames on their stack, so carry the page over explicitly.
+    with telemetry.query_context(page=page):
+        return loader(*args, **kwargs)
+
+
+def load(tasks, spinner="Loading data..."):
+    """Run independent ``(cached loader, args[, kwargs])`` tasks concurrently and return their results in order.
+
+    Each result lands in the shared ResultCache as if the loader had been called
+    directly, so a rerun reads them back without queries. One spinner covers the
+    batch while anything in it is cold (a single cold loader keeps its own text).
+    If a task fails, the others still finish and the first error is raised.
+    """
+    tasks = [task if len(task) == 3 else (*task, {}) for task in tasks]
+    if BATCH_WORKERS <= 1 or len(tasks) <= 1:
+        return [loader(*args, **kwargs) for loader, args, kwargs in tasks]
+
+    cold = [loader for loader, args, kwargs in tasks if not loader.is_cached(*args, **kwargs)]
+    if not cold:
+        return [loader(*args, **kwargs) for loader, args, kwargs in tasks]
+
+    page = telemetry.current_page()
+    executor = get_executor()
+    texts = {getattr(loader, "show_spinner", None) for loader in cold} - {None}
+    with st.spinner(texts.pop() if len(texts) == 1 else spinner):
+        futures = [
+            executor.submit(contextvars.copy_context().run, _call, page, loader, args, kwargs)
+            for loader, args, kwargs in tasks
+        ]
+        errors = [future.exception() for future in futures]
+    for error in errors:
+        if error is not None:
+            raise error
+    return [future.result() for future in futures]
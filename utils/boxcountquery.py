@@ -1,39 +1,48 @@
 import streamlit as st
-from databricks import sql
 import pandas as pd
-import requests
-import os
-import time
-from utils.db import (
-    get_connection
+from utils.queryregistry import (
+    register_query,
+    run_query
 )
 
-DATABRICKS_HOST = st.secrets['databricks']['host']
-HTTP_PATH = st.secrets['databricks']['http_path']
-ACCESS_TOKEN = st.secrets['databricks']['token']
 
-os.environ["DATABRICKS_HOST"] = f"https://{st.secrets['databricks']['host']}"
-os.environ["DATABRICKS_TOKEN"] = st.secrets['databricks']['token']
+register_query(
+    "box_count_by_country",
+    """
+          SELECT 
+          country, source, SUM(box_count) AS box_count
+          FROM anz_finance_app.anz_orders_box_count
+          WHERE hellofresh_week = :week
+          GROUP BY 1, 2
+    """,
+    dtypes={"box_count": "int32"},
+)
 
 
+def run_box_count_by_country(week):
+    return run_query("box_count_by_country", week=week)
 
-# API endpoint
-apiurl = f"{os.environ['DATABRICKS_HOST']}/api/2.1/jobs/runs/submit"
 
-def run_box_count_raw():
-    query = f"""
+# One row per week x country x source, so the trend stays small however much history the table holds.
+register_query(
+    "box_count_trend",
+    """
           SELECT 
-          source, hellofresh_week, country, recipe_family, box_plan, number_of_recipes, box_size, dc, kit_count, box_count
+          hellofresh_week, country, source, SUM(box_count) AS box_count
           FROM anz_finance_app.anz_orders_box_count
+          GROUP BY 1, 2, 3
+    """,
+    dtypes={"box_count": "int32"},
+)
+
+
+def run_box_count_trend():
+    return run_query("box_count_trend")
+
+
+register_query(
+    "kit_count_raw",
     """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
-
-def run_kit_count_raw():
-    query = f"""
         SELECT 
         hellofresh_week,
         country,
@@ -45,10 +54,7 @@ def run_kit_count_raw():
         dc,
         kit_count
         FROM anz_finance_app.anz_orders_slot_details
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
-
+        WHERE hellofresh_week = :week
+    """,
+    dtypes={"dc": "category", "number_of_recipes": "int32", "box_size": "int32", "kit_count": "int32"},
+)
@@ -1,26 +1,14 @@
 import streamlit as st
-from databricks import sql
 import pandas as pd
-import requests
-import os
-import time
-from utils.db import (
-    get_connection
+from utils.queryregistry import (
+    register_query,
+    run_query
 )
 
-DATABRICKS_HOST = st.secrets['databricks']['host']
-HTTP_PATH = st.secrets['databricks']['http_path']
-ACCESS_TOKEN = st.secrets['databricks']['token']
 
-os.environ["DATABRICKS_HOST"] = f"https://{st.secrets['databricks']['host']}"
-os.environ["DATABRICKS_TOKEN"] = st.secrets['databricks']['token']
-
-
-# API endpoint
-apiurl = f"{os.environ['DATABRICKS_HOST']}/api/2.1/jobs/runs/submit"
-
-def run_recipe_composition_raw(version):
-    query = f"""
+register_query(
+    "recipe_composition",
+    """
           SELECT 
             t.hellofresh_week,
             CONCAT(CAST(hellofresh_year AS STRING), '-M', LPAD(CAST(hellofresh_month AS STRING), 2, '0'))  as hellofresh_month,
@@ -50,14 +38,14 @@ def run_recipe_composition_raw(version):
                 GROUP BY delivery_week_name, recipe_size, recipe_type, country, city
             ) k ON t.hellofresh_week = k.hellofresh_week AND t.country = k.country AND t.box_size = k.box_size AND t.primary_tag = k.recipe_type AND t.dc = CASE WHEN k.dc = 'NZ' THEN 'Auckland' ELSE k.dc end
             LEFT JOIN dimensions.date_dimension d ON t.hellofresh_week = d.hellofresh_week
-            WHERE t.version ='H2 2025'
+            WHERE t.version = :version
             AND coalesce(t.sku_uptake,0) > 0
             GROUP BY
             1,2,3,4,5,6,7,8
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+    """,
+)
+
+
+def run_recipe_composition_raw(version):
+    return run_query("recipe_composition", version=version)
 
@@ -0,0 +1,358 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils import incremental, telemetry
+
+# --- Defaults (override via environment on the app container) ---
+CACHE_DIR = os.environ.get("PORTAL_CACHE_DIR", os.path.join(".cache", "results"))
+CACHE_MEMORY_BUDGET_MB = int(os.environ.get("PORTAL_CACHE_MEMORY_MB", 512))
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+
+
+def _size_of(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    return sys.getsizeof(value)
+
+
+def _copy(value):
+    # Pages mutate loader results in place, so never hand out the cached object itself.
+    return value.copy() if isinstance(value, pd.DataFrame) else value
+
+
+def _matches(fields, tags):
+    # A loader without e.g. a ``version`` argument returns every version, so it matches too.
+    return all(name not in fields or str(fields[name]) == str(value) for name, value in tags.items())
+
+
+class _Entry:
+    __slots__ = ("namespace", "fields", "value", "size", "expires_at")
+
+    def __init__(self, namespace, fields, value, size, expires_at):
+        self.namespace = namespace
+        self.fields = fields
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class ResultCache:
+    """Two-tier result cache: an in-process LRU bounded by a memory budget, backed
+    by Parquet files on disk that survive restarts. Every entry carries its own TTL
+    and is keyed by ``namespace`` plus named fields (week, entity, version, ...), so
+    invalidation can target e.g. only Kraken ``v3`` data for one week.
+    """
+
+    def __init__(self, directory=CACHE_DIR, memory_budget_bytes=CACHE_MEMORY_BUDGET_MB * 1024 * 1024):
+        self.directory = directory
+        self.memory_budget_bytes = memory_budget_bytes
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    # --- keys ---
+    @staticmethod
+    def make_key(namespace, fields):
+        payload = json.dumps([namespace, sorted(fields.items())], default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _paths(self, namespace, key):
+        base = os.path.join(self.directory, namespace, key)
+        return base + ".parquet", base + ".json"
+
+    # --- memory tier ---
+    def _memory_get(self, key, now):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._memory_drop(key)
+            return None
+        self._memory.move_to_end(key)
+        return entry
+
+    def _memory_put(self, key, entry):
+        if entry.size > self.memory_budget_bytes:
+            return
+        if key in self._memory:
+            self._memory_drop(key)
+        self._memory[key] = entry
+        self._memory_bytes += entry.size
+        while self._memory_bytes > self.memory_budget_bytes and self._memory:
+            oldest = next(iter(self._memory))
+            self._memory_drop(oldest)
+            self.stats["evictions"] += 1
+
+    def _memory_drop(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry.size
+
+    # --- disk tier ---
+    def _disk_get(self, namespace, key, now):
+        data_path, meta_path = self._paths(namespace, key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta["expires_at"] <= now:
+            self._disk_drop(namespace, key)
+            return None
+        try:
+            value = pd.read_parquet(data_path)
+        except Exception:
+            self._disk_drop(namespace, key)
+            return None
+        return _Entry(namespace, meta["fields"], value, _size_of(value), meta["expires_at"])
+
+    def _disk_put(self, key, entry):
+        if not isinstance(entry.value, pd.DataFrame):
+            return
+        data_path, meta_path = self._paths(entry.namespace, key)
+        tmp_path = f"{data_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(data_path), exist_ok=True)
+            entry.value.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, data_path)
+            with open(meta_path, "w") as f:
+                json.dump({"fields": entry.fields, "expires_at": entry.expires_at}, f, default=str)
+        except Exception:
+            # Unserializable frames (e.g. MultiIndex columns) just stay memory-only.
+            for path in (tmp_path, data_path, meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _disk_drop(self, namespace, key):
+        for path in self._paths(namespace, key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _disk_entries(self, namespace=None):
+        """Yield (namespace, key, fields) for every persisted entry."""
+        if not os.path.isdir(self.directory):
+            return
+        namespaces = [namespace] if namespace else os.listdir(self.directory)
+        for ns in namespaces:
+            ns_dir = os.path.join(self.directory, ns)
+            if not os.path.isdir(ns_dir):
+                continue
+            for name in os.listdir(ns_dir):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(ns_dir, name)) as f:
+                        fields = json.load(f)["fields"]
+                except (OSError, ValueError, KeyError):
+                    continue
+                yield ns, name[: -len(".json")], fields
+
+    # --- public API ---
+    def lookup(self, namespace, fields):
+        """Return ``(tier, value)`` where tier is "memory", "disk" or None on a miss."""
+        key = self.make_key(namespace, fields)
+        now = time.time()
+        with self._lock:
+            entry = self._memory_get(key, now)
+            if entry is not None:
+                self.stats["memory_hits"] += 1
+                return "memory", _copy(entry.value)
+        # Parquet reads happen outside the lock so one cold load doesn't block every session.
+        entry = self._disk_get(namespace, key, now)
+        with self._lock:
+            if entry is not None:
+                self.stats["disk_hits"] += 1
+                self._memory_put(key, entry)
+                return "disk", _copy(entry.value)
+            self.stats["misses"] += 1
+        return None, None
+
+    def contains(self, namespace, fields):
+        """True if a live entry exists in either tier, without loading or counting it."""
+        key = self.make_key(namespace, fields)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry.expires_at > now:
+                return True
+        _, meta_path = self._paths(namespace, key)
+        try:
+            with open(meta_path) as f:
+                return json.load(f)["expires_at"] > now
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def get(self, namespace, fields):
+        tier, value = self.lookup(namespace, fields)
+        return tier is not None, value
+
+    def put(self, namespace, fields, value, ttl=DEFAULT_TTL_SECONDS, persist=True):
+        key = self.make_key(namespace, fields)
+        entry = _Entry(namespace, dict(fields), value, _size_of(value), time.time() + ttl)
+        with self._lock:
+            self._memory_put(key, entry)
+        if persist:
+            self._disk_put(key, entry)
+
+    def invalidate(self, namespace=None, **tags):
+        """Drop entries in ``namespace`` (a name, a list of names, or None for all) whose fields match every tag.
+
+        ``invalidate("query_pages", version="v3", week="2025-W20")`` leaves other
+        versions, weeks and loaders untouched.
+        """
+        namespaces = [namespace] if isinstance(namespace, str) else namespace
+        dropped = set()
+        with self._lock:
+            for key, entry in list(self._memory.items()):
+                if (namespaces is None or entry.namespace in namespaces) and _matches(entry.fields, tags):
+                    self._memory_drop(key)
+                    dropped.add(key)
+            for ns in namespaces or [None]:
+                for entry_ns, key, fields in list(self._disk_entries(ns)):
+                    if _matches(fields, tags):
+                        self._disk_drop(entry_ns, key)
+                        dropped.add(key)
+            self.stats["invalidations"] += len(dropped)
+        return len(dropped)
+
+    def memory_usage(self):
+        with self._lock:
+            return {"entries": len(self._memory), "bytes": self._memory_bytes, "budget": self.memory_budget_bytes}
+
+
+@st.cache_resource(show_spinner=False)
+def get_result_cache():
+    return ResultCache()
+
+
+# Per-key locks for loads in flight, so concurrent misses on one key run the loader once
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+@contextmanager
+def _single_flight(key):
+    with _inflight_lock:
+        lock, waiters = _inflight.get(key, (None, 0))
+        lock = lock or threading.Lock()
+        _inflight[key] = (lock, waiters + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _inflight_lock:
+            lock, waiters = _inflight[key]
+            if waiters == 1:
+                del _inflight[key]
+            else:
+                _inflight[key] = (lock, waiters - 1)
+
+
+def cached(namespace, ttl=DEFAULT_TTL_SECONDS, show_spinner=None, persist=True):
+    """Drop-in replacement for ``st.cache_data`` on page loaders, backed by the shared ResultCache.
+
+    The loader's bound arguments (by parameter name) become the key fields, so
+    name them ``week`` / ``entity`` / ``version`` to make them targetable by
+    ``invalidate``.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def fields_of(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            fields = dict(bound.arguments)
+            # **params are key fields in their own right, so they stay targetable too.
+            for name, parameter in signature.parameters.items():
+                if parameter.kind is inspect.Parameter.VAR_KEYWORD:
+                    fields.update(fields.pop(name, {}))
+            return fields
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            fields = fields_of(args, kwargs)
+            cache = get_result_cache()
+            started = time.perf_counter()
+            tier, value = cache.lookup(namespace, fields)
+            if tier is None:
+                # A batch load or prefetch may already be loading this key; wait for it instead of querying twice.
+                with _single_flight(cache.make_key(namespace, fields)):
+                    tier, value = cache.lookup(namespace, fields)
+                    if tier is None:
+                        # Queries run by the loader are tagged with the namespace that missed.
+                        with telemetry.query_context(namespace=namespace, cache="miss"):
+                            # No spinner off the script thread (e.g. background prefetch, batch loads)
+                            if show_spinner and get_script_run_ctx(suppress_warning=True) is not None:
+                                with st.spinner(show_spinner):
+                                    value = func(*args, **kwargs)
+                            else:
+                                value = func(*args, **kwargs)
+                        cache.put(namespace, fields, value, ttl=ttl, persist=persist)
+                        telemetry.record("cache", namespace=namespace, cache="miss", params=fields, total_seconds=time.perf_counter() - started)
+                        return _copy(value)
+            telemetry.record("cache", namespace=namespace, cache=tier, params=fields, total_seconds=time.perf_counter() - started)
+            return value
+
+        wrapper.namespace = namespace
+        wrapper.show_spinner = show_spinner
+        wrapper.is_cached = lambda *args, **kwargs: get_result_cache().contains(namespace, fields_of(args, kwargs))
+        wrapper.invalidate = lambda **tags: get_result_cache().invalidate(namespace, **tags)
+        return wrapper
+
+    return decorator
+
+
+def invalidate(namespace=None, **tags):
+    return get_result_cache().invalidate(namespace, **tags)
+
+
+# Loaders in pages/krakenops.py that read anz_kraken_operations_historical*
+KRAKEN_NAMESPACES = [
+    "kraken_trend_total_cost",
+    "kraken_supplier_split_errors",
+    "kraken_null_price_error_trends",
+    "kraken_null_price_error_summary",
+    "kraken_cpk",
+    "kraken_cpk_slot",
+    "kraken_cpk_slot_totals",
+    "kraken_cpk_primary_tag",
+    "kraken_cpk_product_type",
+    "kraken_cube",
+    "kraken_slot_details",
+    "kraken_primary_tag_details",
+    # Grid pages of every query (kraken_raw, null_price_errors, ...); cheap to refetch
+    "query_pages",
+    "query_counts",
+]
+
+
+# Incremental trend series (utils/incremental.py) built from the same tables
+KRAKEN_SERIES = ["kraken_trend_total_cost", "kraken_supplier_split_errors"]
+
+
+def invalidate_kraken_run(week, version=None):
+    """Call when a new Kraken run lands: drops only that week/version (every version when None),
+    plus the all-history trends.
+
+    The trend series on disk are marked to refetch from ``week``, which may be
+    older than their usual re-check window.
+    """
+    for name in KRAKEN_SERIES:
+        incremental.invalidate(name, week=week)
+    tags = {"week": week} if version is None else {"week": week, "version": version}
+    return invalidate(KRAKEN_NAMESPACES, **tags)
@@ -1,34 +1,56 @@
 import streamlit as st
-from databricks import sql
 import pandas as pd
-import requests
-import os
-import time
-from utils.db import (
-    get_connection
+import numpy as np
+from utils.queryregistry import (
+    register_query,
+    run_query
 )
 
-def fetch_hellofresh_weeks():
-    conn = get_connection()
-    query = """
+
+register_query(
+    "hellofresh_weeks",
+    """
         SELECT distinct hellofresh_week from hive_metastore.dimensions.date_dimension
         WHERE hellofresh_week between '2025-W01' ANd '2026-W52'
         ORDER BY hellofresh_week
-    """
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
+    """,
+)
+
 
+def fetch_hellofresh_weeks():
+    return run_query("hellofresh_weeks")
+
+
+def _blank_where(series, mask):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Stay categorical: just make '' a valid category.
+        if "" not in series.cat.categories:
+            series = series.cat.add_categories([""])
+        return series.mask(mask, "")
+    if not (series.dtype == object or pd.api.types.is_string_dtype(series)):
+        series = series.astype(object)
+    return series.mask(mask, "")
 
-def blank_repeats(df, cols):
-    df_copy = df.copy()
+
+def blank_repeats(df, cols, hierarchical=False):
+    """Blank out values that repeat the row above, for grouped table display.
+
+    With ``hierarchical=True`` a column is only blanked while every column before
+    it in ``cols`` is unchanged as well, so a child value shows again whenever its
+    parent changes.
+    """
+    df_copy = df.copy(deep=False)
+    changed = np.zeros(len(df), dtype=bool)
     for col in cols:
-        last_val = None
-        for i in df_copy.index:
-            if df_copy.at[i, col] == last_val:
-                df_copy.at[i, col] = ''
-            else:
-                last_val = df_copy.at[i, col]
+        values = df[col]
+        # The first row and NaNs never compare equal, same as the old row loop.
+        same = values.eq(values.shift()).to_numpy(dtype=bool, na_value=False)
+        if hierarchical:
+            changed |= ~same
+            repeat = ~changed
+        else:
+            repeat = same
+        df_copy[col] = _blank_where(values, repeat)
     return df_copy
     
 
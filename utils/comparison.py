@@ -0,0 +1,307 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Memoized aggregations and tables, shared by every session in the process
+MEMO_SIZE = 64
+
+
+class ComparisonSpec:
+    """Declarative layout of a version comparison table.
+
+    ``index``      row keys, e.g. ["primary_tag", "product_type"]
+    ``metrics``    (label, column) pairs summed per row / column / version, e.g. [("CPK", "cpk")]
+    ``column``     second column level (recipe size)
+    ``versions``   versions to compare, oldest first; None means every version present, sorted
+    ``variance``   metric labels that get a relative variance vs the first version
+    ``mix``        optional (label, column): share of the version's total of ``column``
+    """
+
+    def __init__(
+        self,
+        index,
+        metrics,
+        column="recipe_size",
+        version="version",
+        versions=None,
+        variance=(),
+        mix=None,
+        variance_label="variance",
+    ):
+        self.index = list(index)
+        self.metrics = list(metrics)
+        self.column = column
+        self.version = version
+        self.versions = list(versions) if versions else None
+        self.variance = tuple(variance)
+        self.mix = mix
+        self.variance_label = variance_label
+
+    @property
+    def value_columns(self):
+        columns = [column for _, column in self.metrics]
+        if self.mix and self.mix[1] not in columns:
+            columns.append(self.mix[1])
+        return columns
+
+    def key(self):
+        return (
+            tuple(self.index), tuple(self.metrics), self.column, self.version,
+            tuple(self.versions or ()), self.variance, self.mix, self.variance_label,
+        )
+
+
+# --- Memoization ---
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def fingerprint(df):
+    """Content identity of a frame. Cached loaders hand out a fresh copy on every rerun,
+    so ``id(df)`` would never match; equal data hashes the same."""
+    hashed = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return (tuple(df.columns), len(df), int(hashed.sum(dtype=np.uint64)))
+
+
+def _memoized(key, compute):
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+    value = compute()
+    with _memo_lock:
+        _memo[key] = value
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return value
+
+
+def _freeze(filters):
+    if not filters:
+        return ()
+    return tuple(sorted((col, tuple(sorted(map(str, values)))) for col, values in filters.items()))
+
+
+# --- Filter index ---
+class FilterIndex:
+    """Per-value bitmaps over the rows of one dataset, for multiselect-style filters.
+
+    Each column is factorized once. A selection becomes a bitmap over that column's
+    distinct values, and gathering it through the row codes is the OR of the selected
+    values' row bitmaps in a single O(rows) pass. Column masks are cached per selection
+    and ANDed together, so changing one multiselect only rebuilds that column's mask.
+    Missing values never match, like ``isin`` with a list of labels.
+    """
+
+    MASKS_PER_COLUMN = 8
+
+    def __init__(self, df, columns):
+        self.length = len(df)
+        self._codes = {}
+        self._values = {}
+        self._masks = {}
+        self._lock = threading.Lock()
+        for column in columns:
+            codes, uniques = pd.factorize(df[column])
+            self._codes[column] = codes
+            self._values[column] = pd.Index(uniques)
+            self._masks[column] = OrderedDict()
+
+    def values(self, column):
+        """Distinct non-missing values of ``column``, sorted (for multiselect options)."""
+        return sorted(self._values[column])
+
+    def bitmap(self, column, selected):
+        key = frozenset(selected)
+        masks = self._masks[column]
+        with self._lock:
+            if key in masks:
+                masks.move_to_end(key)
+                return masks[key]
+        positions = self._values[column].get_indexer(list(key))
+        # Trailing slot stays False: factorize codes missing values as -1.
+        chosen = np.zeros(len(self._values[column]) + 1, dtype=bool)
+        chosen[positions[positions >= 0]] = True
+        mask = chosen[self._codes[column]]
+        with self._lock:
+            masks[key] = mask
+            while len(masks) > self.MASKS_PER_COLUMN:
+                masks.popitem(last=False)
+        return mask
+
+    def mask(self, filters=None):
+        """Rows matching every ``{column: selected values}`` filter."""
+        mask = np.ones(self.length, dtype=bool)
+        for column, selected in (filters or {}).items():
+            mask &= self.bitmap(column, selected)
+        return mask
+
+
+def filter_index(df, columns, data_key=None):
+    """FilterIndex for ``df``, built once per dataset (memoized on its content)."""
+    data_key = data_key or fingerprint(df)
+    return _memoized(("filter_index", tuple(columns), data_key), lambda: FilterIndex(df, columns))
+
+
+# --- Summary tables (Metric / Recipe Size / Version columns) ---
+def aggregate(df, spec, data_key=None):
+    """Sum the spec's value columns at (index, column, version) grain in one groupby.
+
+    Rows with missing keys are kept (they still count towards version totals for
+    mix); the table itself drops them, like pivot_table.
+    """
+    data_key = data_key or fingerprint(df)
+
+    def compute():
+        keys = spec.index + [spec.column, spec.version]
+        cube = df.groupby(keys, dropna=False, observed=True, sort=False)[spec.value_columns].sum(min_count=1)
+        return cube.reset_index()
+
+    return _memoized(("aggregate", spec.key(), data_key), compute)
+
+
+class ComparisonCube:
+    """An aggregate() cube with its table layout worked out once.
+
+    Row keys, size and version codes and the metric arrays don't depend on the filters,
+    so table() only masks cube rows through the FilterIndex and scatters the survivors
+    into a dense rows x sizes x versions array; variance and mix are array maths on that.
+    """
+
+    def __init__(self, cube, spec):
+        self.spec = spec
+        self.index = FilterIndex(cube, spec.index + [spec.column])
+        self.versions = spec.versions or sorted(cube[spec.version].dropna().unique())
+        self.version_codes = pd.Index(self.versions).get_indexer(cube[spec.version])
+
+        # pivot_table drops rows whose keys are missing; mix totals still count them.
+        keyed = cube[spec.index + [spec.column]].notna().all(axis=1).to_numpy() & (self.version_codes >= 0)
+        groups = cube[keyed].groupby(spec.index, sort=True, observed=True)
+        self.row_codes = np.full(len(cube), -1)
+        self.row_codes[keyed] = groups.ngroup().to_numpy()
+        self.row_index = groups.size().index
+        self.size_codes, self.sizes = pd.factorize(cube[spec.column], sort=True)
+        self.keyed = keyed
+        self.values = {column: cube[column].fillna(0).to_numpy(dtype=float) for column in spec.value_columns}
+
+    def table(self, filters=None):
+        spec, versions, sizes = self.spec, self.versions, self.sizes
+        column_levels = ["Metric", "Recipe Size", "Version"]
+        selected = self.index.mask(filters) & (self.version_codes >= 0)
+        kept = selected & self.keyed
+        if not kept.any():
+            return pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=column_levels))
+
+        rows, size_codes, version_codes = self.row_codes[kept], self.size_codes[kept], self.version_codes[kept]
+        shape = (len(self.row_index), len(sizes), len(versions))
+        present = np.zeros(shape, dtype=bool)
+        present[rows, size_codes, version_codes] = True
+        kept_rows = present.any(axis=(1, 2))
+        # Only size/version pairs that occur in the selection become columns (pivot_table semantics).
+        pair_present = present.any(axis=0)
+        arrays = {}
+        for column, values in self.values.items():
+            dense = np.zeros(shape)
+            dense[rows, size_codes, version_codes] = values[kept]
+            arrays[column] = dense[kept_rows]
+        present = present[kept_rows]
+
+        labels, data = [], []
+
+        def add(metric, size, version, values):
+            labels.append((metric, size, version))
+            data.append(values)
+
+        for label, column in spec.metrics:
+            values = arrays[column]
+            for s, size in enumerate(sizes):
+                for v, version in enumerate(versions):
+                    if pair_present[s, v]:
+                        add(label, size, version, values[:, s, v])
+            if label not in spec.variance or len(versions) < 2:
+                continue
+            base = values[:, :, 0]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                variance = (values[:, :, 1:] - base[:, :, None]) / np.where(base == 0, np.nan, base)[:, :, None]
+            for s, size in enumerate(sizes):
+                for v, version in enumerate(versions[1:], start=1):
+                    if pair_present[s, 0] and pair_present[s, v]:
+                        name = spec.variance_label if len(versions) == 2 else f"{spec.variance_label} {version}"
+                        add(label, size, name, variance[:, s, v - 1])
+
+        if spec.mix:
+            label, column = spec.mix
+            totals = np.bincount(
+                self.version_codes[selected], weights=self.values[column][selected], minlength=len(versions)
+            )
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mix = arrays[column] / totals
+            # Rows with no rows at all for a version show no mix for it, rather than 0%.
+            has_version = present.any(axis=1)
+            mix = np.where(has_version[:, None, :], mix, np.nan)
+            for s, size in enumerate(sizes):
+                for v, version in enumerate(versions):
+                    if pair_present[s, v]:
+                        add(label, size, version, mix[:, s, v])
+
+        table = pd.DataFrame(
+            np.column_stack(data),
+            index=self.row_index[kept_rows],
+            columns=pd.MultiIndex.from_tuples(labels, names=column_levels),
+        )
+        return table.sort_index(axis=1).reset_index()
+
+
+def comparison_cube(df, spec, data_key=None):
+    """ComparisonCube for ``df``, built once per dataset (memoized on its content)."""
+    data_key = data_key or fingerprint(df)
+    cube = aggregate(df, spec, data_key)
+    return _memoized(("cube", spec.key(), data_key), lambda: ComparisonCube(cube, spec))
+
+
+def compare(df, spec, filters=None, data_key=None):
+    """Comparison table for ``df`` under ``filters`` ({column: selected values}).
+
+    The cube is built once per dataset; each filter combination's table is memoized
+    too, so flipping a multiselect back and forth is a lookup.
+    """
+    data_key = data_key or fingerprint(df)
+    cube = comparison_cube(df, spec, data_key)
+    return _memoized(
+        ("table", spec.key(), data_key, _freeze(filters)),
+        lambda: cube.table(filters),
+    ).copy()
+
+
+# --- Detail tables (Metric / Version columns) ---
+def version_table(df, index, metrics, versions=("v2", "v3"), version="version", variance_label="variance %"):
+    """Per-``index`` sums of each metric by version, plus variance of the last version vs the first.
+
+    ``metrics`` is a list of (label, column) pairs; returns columns ("", index...) then
+    (label, version) / (label, variance_label) per metric, in ``metrics`` order.
+    """
+    index = [index] if isinstance(index, str) else list(index)
+    versions = list(versions)
+    columns = [column for _, column in metrics]
+    sums = (
+        df[df[version].isin(versions)]
+        .groupby(index + [version], observed=True)[columns]
+        .sum()
+        .unstack(version, fill_value=0)
+    )
+    sums = sums.reindex(columns=pd.MultiIndex.from_product([columns, versions]), fill_value=0)
+
+    out = {("", name): sums.index.get_level_values(name) for name in index}
+    base = versions[0]
+    for label, column in metrics:
+        for v in versions:
+            out[(label, v)] = sums[(column, v)].to_numpy()
+        for v in versions[1:]:
+            name = variance_label if len(versions) == 2 else f"{variance_label} {v}"
+            base_values = sums[(column, base)].replace(0, np.nan)
+            out[(label, name)] = ((sums[(column, v)] - sums[(column, base)]) / base_values).to_numpy()
+    table = pd.DataFrame(out)
+    table.columns = pd.MultiIndex.from_tuples(table.columns)
+    return table
@@ -0,0 +1,77 @@
+import functools
+import os
+
+import streamlit as st
+
+DEFAULT_COOKIES_PASSWORD = "a_default_password_for_testing"
+
+
+class Config:
+    """Secrets the portal needs, read from ``st.secrets`` on first use.
+
+    Each value is looked up once per process, when the feature that needs it
+    first runs, so importing a page never touches the secrets store and the local
+    DuckDB backend runs without Databricks credentials at all.
+    """
+
+    # --- Databricks ---
+    @functools.cached_property
+    def databricks_host(self):
+        return st.secrets["databricks"]["host"]
+
+    @functools.cached_property
+    def http_path(self):
+        return st.secrets["databricks"]["http_path"]
+
+    @functools.cached_property
+    def access_token(self):
+        return st.secrets["databricks"]["token"]
+
+    @functools.cached_property
+    def cluster_id(self):
+        return st.secrets["databricks"]["anz_data_cluster_id"]
+
+    @property
+    def jobs_base_url(self):
+        return f"https://{self.databricks_host}"
+
+    # --- sessions ---
+    @functools.cached_property
+    def cookies_password(self):
+        return os.environ.get("COOKIES_PASSWORD", DEFAULT_COOKIES_PASSWORD)
+
+    @functools.cached_property
+    def session_secret(self):
+        # Signs session tokens (utils/auth.py); deployments without [auth] reuse a configured cookie password.
+        try:
+            return st.secrets["auth"]["session_secret"]
+        except (KeyError, FileNotFoundError):
+            pass
+        if "COOKIES_PASSWORD" in os.environ:
+            return os.environ["COOKIES_PASSWORD"]
+        if os.environ.get("PORTAL_DB_BACKEND") == "duckdb":
+            # Local runs only: anyone who knows the default could forge a session with it.
+            return DEFAULT_COOKIES_PASSWORD
+        raise RuntimeError(
+            "No session secret configured: set [auth] session_secret in secrets.toml or the COOKIES_PASSWORD "
+            "environment variable (the built-in default is only allowed with PORTAL_DB_BACKEND=duckdb)"
+        )
+
+    # --- other services ---
+    @functools.cached_property
+    def openai_api_key(self):
+        return st.secrets["openai"]["OPENAI_API_KEY"]
+
+    @functools.cached_property
+    def gmail_user(self):
+        return st.secrets["gmail"]["user"]
+
+    @functools.cached_property
+    def gmail_password(self):
+        return st.secrets["gmail"]["password"]
+
+
+@st.cache_resource(show_spinner=False)
+def get_config():
+    # One config per process, shared by every Streamlit session.
+    return Config()
@@ -1,24 +1,17 @@
 import streamlit as st
-from databricks import sql
 import pandas as pd
 import requests
 import os
 import time
 import datetime
-import bcrypt
 import uuid
 import datetime
-
-DATABRICKS_HOST = st.secrets['databricks']['host']
-HTTP_PATH = st.secrets['databricks']['http_path']
-ACCESS_TOKEN = st.secrets['databricks']['token']
-
-os.environ["DATABRICKS_HOST"] = f"https://{st.secrets['databricks']['host']}"
-os.environ["DATABRICKS_TOKEN"] = st.secrets['databricks']['token']
-
-# API endpoint
-apiurl = f"{os.environ['DATABRICKS_HOST']}/api/2.1/jobs/runs/submit"
-
+import pyarrow as pa
+import pyarrow.compute as pc
+from utils.pool import ConnectionPool
+from utils.config import get_config
+from utils.jobs import get_job_monitor, sync_jobs
+from utils import telemetry
 
 
 if "jobs" not in st.session_state:
@@ -38,19 +31,10 @@ def runtestnotebook(path, cluster):
         }]
     }
     try:
-        response = requests.post(
-            apiurl,
-            headers={"Authorization": f"Bearer {os.environ['DATABRICKS_TOKEN']}"},
-            json=payload
-        )
-        response.raise_for_status()  # Raise HTTP errors
-
-        run_id = response.json()["run_id"]
-        st.session_state.jobs[run_id] = {"status": "SUBMITTED", "result": None, "notified": False}
+        # The process-wide monitor polls the run from here on (see utils/jobs.py).
+        run_id = get_job_monitor().submit(payload)
+        st.session_state.jobs[run_id] = {"status": "SUBMITTED", "result": None, "notified": False, "dismissed": False}
         st.success(f"Job submitted! Run ID: {run_id}")
-
-        # Start polling in the background (or you can trigger via a button)
-        check_job_status(run_id)
     except requests.exceptions.RequestException as e:
         st.error(f"API request failed: {str(e)}")
     except KeyError as e:
@@ -58,47 +42,218 @@ def runtestnotebook(path, cluster):
 
 
 def check_job_status(run_id):
-    status_url = f"{os.environ['DATABRICKS_HOST']}/api/2.1/jobs/runs/get?run_id={run_id}"
-    try:
-        status_response = requests.get(
-            status_url,
-            headers={"Authorization": f"Bearer {os.environ['DATABRICKS_TOKEN']}"}
-        )
-        status_response.raise_for_status()
-        status = status_response.json()
-        life_cycle_state = status["state"]["life_cycle_state"]
-        result_state = status["state"].get("result_state", None)
-        st.session_state.jobs[run_id]["status"] = life_cycle_state
-        st.session_state.jobs[run_id]["result"] = result_state
-        # Set notified flag to False so notification is shown
-        st.session_state.jobs[run_id]["notified"] = False
-    except Exception as e:
-        st.error(f"Failed to check status for job {run_id}: {e}")
+    """Copy the monitor's latest state for ``run_id`` into session state; never calls the Jobs API itself."""
+    get_job_monitor().track(run_id)
+    sync_jobs({run_id: st.session_state.jobs[run_id]})
 
 
-def get_connection():
+# Connection pool sizing (override via environment on the app container)
+# PORTAL_DB_BACKEND=duckdb runs every query against local Parquet snapshots (see utils/localbackend.py)
+DB_BACKEND = os.environ.get("PORTAL_DB_BACKEND", "databricks")
+POOL_MAX_SIZE = int(os.environ.get("DATABRICKS_POOL_MAX_SIZE", 8))
+POOL_MAX_IDLE_SECONDS = int(os.environ.get("DATABRICKS_POOL_MAX_IDLE_SECONDS", 300))
+POOL_MAX_LIFETIME_SECONDS = int(os.environ.get("DATABRICKS_POOL_MAX_LIFETIME_SECONDS", 3600))
+# Rows per Arrow batch when a result is streamed instead of fetched whole (see stream_arrow)
+STREAM_BATCH_ROWS = int(os.environ.get("PORTAL_STREAM_BATCH_ROWS", 100000))
+
+
+def _open_connection():
+    # Imported here: the connector is only needed by the Databricks backend and is slow to load.
+    from databricks import sql
+    config = get_config()
     return sql.connect(
-        server_hostname= DATABRICKS_HOST,
-        http_path=HTTP_PATH,
-        access_token=ACCESS_TOKEN,
+        server_hostname=config.databricks_host,
+        http_path=config.http_path,
+        access_token=config.access_token,
         _verify_ssl="/Users/james.seo/Downloads/databricks_root.cer"
     )
 
-def validate_login(email, password):
-    conn= get_connection()
-    cursor = conn.cursor()
-    query = """
-        SELECT password_hash FROM hive_metastore.anz_finance_app.users 
-        WHERE email = ? AND line_del = false
+
+@st.cache_resource(show_spinner=False)
+def get_connection_pool():
+    # One pool per process, shared by every Streamlit session.
+    factory = _open_connection
+    if DB_BACKEND == "duckdb":
+        from utils.localbackend import open_connection as factory
+    return ConnectionPool(
+        factory,
+        max_size=POOL_MAX_SIZE,
+        max_idle_seconds=POOL_MAX_IDLE_SECONDS,
+        max_lifetime_seconds=POOL_MAX_LIFETIME_SECONDS,
+    )
+
+
+def get_connection():
+    """Check out a pooled connection. ``close()`` returns it to the pool."""
+    return get_connection_pool().checkout()
+
+
+def connection():
+    """Context manager around a pooled connection: ``with connection() as conn: ...``"""
+    return get_connection_pool().connection()
+
+
+def pool_stats():
+    return get_connection_pool().stats()
+
+
+# --- Arrow result fetching ---
+# Low-cardinality dimensions that are cheaper as pandas categoricals.
+# Opt-in per loader: categoricals change groupby/pivot semantics (unobserved combinations).
+CATEGORY_DTYPES = {
+    "bob_entity_code": "category",
+    "dc": "category",
+    "version": "category",
+}
+
+
+def _cast_arrow_column(column, dtype):
+    if dtype == "category":
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            return pc.dictionary_encode(column)
+        return column
+    if dtype == "float64":
+        return column.cast(pa.float64())
+    if dtype == "int32":
+        # Nullable ints would come back as float64 anyway; keep them as float.
+        if column.null_count:
+            return column.cast(pa.float64())
+        try:
+            return column.cast(pa.int32())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return column.cast(pa.float64())
+    if pa.types.is_decimal(column.type):
+        # SUM()/AVG() come back as DECIMAL; Python Decimal objects are what made read_sql slow.
+        return column.cast(pa.float64())
+    return column
+
+
+def arrow_to_pandas(table, dtypes=None):
+    """Convert an Arrow table to pandas, casting columns in Arrow first so the conversion stays zero-copy."""
+    dtypes = dtypes or {}
+    columns = [
+        _cast_arrow_column(column, dtypes.get(name))
+        for name, column in zip(table.column_names, table.columns)
+    ]
+    table = pa.Table.from_arrays(columns, names=table.column_names)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _fetch_arrow(cursor):
+    if hasattr(cursor, "fetchall_arrow"):
+        return cursor.fetchall_arrow()
+    # DBAPI cursors without an Arrow API
+    names = [col[0] for col in cursor.description or []]
+    rows = cursor.fetchall()
+    values = list(zip(*rows)) if rows else [[] for _ in names]
+    return pa.Table.from_arrays([pa.array(list(col)) for col in values], names=names)
+
+
+def fetch_df(query, params=None, dtypes=None):
+    """Run a query and return a DataFrame built from Arrow record batches instead of Python row tuples.
+
+    Every call is recorded in utils.telemetry with queue (pool checkout), execute
+    and fetch times, row count and Arrow bytes.
     """
-    cursor.execute(query, (email,))
-    result = cursor.fetchone()
-    conn.close()
+    timings = {"queue_seconds": None, "execute_seconds": None, "fetch_seconds": None}
+    size = {"rows": None, "bytes": None}
+    started = time.perf_counter()
+    error = None
+    try:
+        with connection() as conn:
+            checked_out = time.perf_counter()
+            timings["queue_seconds"] = checked_out - started
+            cursor = conn.cursor()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            executed = time.perf_counter()
+            timings["execute_seconds"] = executed - checked_out
+            table = _fetch_arrow(cursor)
+            timings["fetch_seconds"] = time.perf_counter() - executed
+        # Read sizes before the zero-copy conversion releases the Arrow buffers.
+        size = {"rows": table.num_rows, "bytes": table.nbytes}
+        return arrow_to_pandas(table, dtypes)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        telemetry.record(
+            "query",
+            total_seconds=time.perf_counter() - started,
+            error=error,
+            **timings,
+            **size,
+        )
 
-    if result:
-        stored_hash = result[0]
-        return bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8'))
-    return False
+def _iter_arrow(cursor, batch_rows):
+    if hasattr(cursor, "fetchmany_arrow"):
+        while True:
+            table = cursor.fetchmany_arrow(batch_rows)
+            if table.num_rows == 0:
+                return
+            yield table
+    # DBAPI cursors without an Arrow API
+    names = [col[0] for col in cursor.description or []]
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            return
+        yield pa.Table.from_arrays([pa.array(list(col)) for col in zip(*rows)], names=names)
+
+
+def stream_arrow(query, params=None, dtypes=None, batch_rows=STREAM_BATCH_ROWS, context=None):
+    """Run a query and yield its result as DataFrames of at most ``batch_rows`` rows.
+
+    Only one batch is materialized at a time, so callers that fold batches into
+    running aggregates or write them out (see utils/stream.py) hold memory bounded
+    by the batch size rather than by the whole result. The pooled connection stays
+    checked out until the generator is exhausted or closed. The execution is
+    recorded in utils.telemetry like fetch_df's, with ``context`` fields added,
+    once the stream ends.
+    """
+    timings = {"queue_seconds": None, "execute_seconds": None, "fetch_seconds": None}
+    size = {"rows": 0, "bytes": 0, "batches": 0}
+    started = time.perf_counter()
+    error = None
+    try:
+        with connection() as conn:
+            checked_out = time.perf_counter()
+            timings["queue_seconds"] = checked_out - started
+            cursor = conn.cursor()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            executed = time.perf_counter()
+            timings["execute_seconds"] = executed - checked_out
+            fetch_seconds = 0.0
+            batches = _iter_arrow(cursor, batch_rows)
+            while True:
+                fetch_started = time.perf_counter()
+                table = next(batches, None)
+                fetch_seconds += time.perf_counter() - fetch_started
+                timings["fetch_seconds"] = fetch_seconds
+                if table is None:
+                    break
+                size["rows"] += table.num_rows
+                size["bytes"] += table.nbytes
+                size["batches"] += 1
+                yield arrow_to_pandas(table, dtypes)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        telemetry.record(
+            "query",
+            total_seconds=time.perf_counter() - started,
+            error=error,
+            streamed=True,
+            **(context or {}),
+            **timings,
+            **size,
+        )
 
 
 # 데이터 쿼리 함수
@@ -211,127 +366,55 @@ def load_tables():
 
   
     """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = fetch_df(query)
     # Display the dataframe
     st.dataframe(df)
 
 def fetch_inventory_items():
-    conn = get_connection()
     query = """
     SELECT item_id, item_code
     FROM ibizlink.inventory_items
     WHERE status_id = 10 AND line_del = 0
     """
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = fetch_df(query)
     return df
 
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-def email_exists(email: str) -> bool:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT 1
-        FROM hive_metastore.anz_finance_app.users
-        WHERE email = ? AND line_del = false
-        LIMIT 1
-    """, (email,))
-    result = cursor.fetchone()
-    conn.close()
-    return result is not None
-
-def register_user(email: str, password: str, department: str, entity_code: str):
-    conn = get_connection()
-    cursor = conn.cursor()
-    hashed_pw = hash_password(password)
-    cursor.execute(
-        """
-        INSERT INTO hive_metastore.anz_finance_app.users 
-        (email, password_hash, department, default_bob_entity_code, line_del)
-        VALUES (?, ?, ?, ?, false)
-        """,
-        (email, hashed_pw, department, entity_code)
-    )
-    conn.commit()
-    conn.close()
-
-
-def validate_login_from_db(email: str, password: str) -> bool:
-    conn = get_connection()
-    cursor = conn.cursor()
-    query = """
-        SELECT password_hash FROM hive_metastore.anz_finance_app.users 
-        WHERE email = ? AND line_del = false
-    """
-    cursor.execute(query, (email,))
-    result = cursor.fetchone()
-    conn.close()
-
-    if result:
-        stored_hash = result[0]
-        return bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8'))
-    return False
-
-
 def create_reset_token(email: str, token: str) -> str:
     
     expires_at = datetime.datetime.now(datetime.timezone.utc)+ datetime.timedelta(minutes=30)
 
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO hive_metastore.anz_finance_app.password_reset_tokens (email, token, expires_at, is_used)
-        VALUES (?, ?, ?, false)
-    """, (email, token, expires_at))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO hive_metastore.anz_finance_app.password_reset_tokens (email, token, expires_at, is_used)
+            VALUES (?, ?, ?, false)
+        """, (email, token, expires_at))
+        conn.commit()
 
     return token
 
 def verify_reset_token(token: str) -> str | None:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT email
-        FROM hive_metastore.anz_finance_app.password_reset_tokens
-        WHERE token = ? AND expires_at > current_timestamp() AND is_used = false
-        LIMIT 1
-    """, (token,))
-    result = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT email
+            FROM hive_metastore.anz_finance_app.password_reset_tokens
+            WHERE token = ? AND expires_at > current_timestamp() AND is_used = false
+            LIMIT 1
+        """, (token,))
+        result = cursor.fetchone()
 
     if result:
         return result[0]  # email
     return None
 
 def mark_token_as_used(token: str):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE hive_metastore.anz_finance_app.password_reset_tokens
-        SET is_used = true
-        WHERE token = ?
-    """, (token,))
-    conn.commit()
-    conn.close()
-
-def reset_user_password(email: str, new_password: str, token: str):
-    hashed_pw = hash_password(new_password)
-
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE hive_metastore.anz_finance_app.users
-        SET password_hash = ?
-        WHERE email = ? AND line_del = false
-    """, (hashed_pw, email))
-    conn.commit()
-    conn.close()
-
-    # Mark token as used
-    mark_token_as_used(token)
\ No newline at end of file
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE hive_metastore.anz_finance_app.password_reset_tokens
+            SET is_used = true
+            WHERE token = ?
+        """, (token,))
+        conn.commit()
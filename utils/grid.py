@@ -0,0 +1,122 @@
+import math
+import os
+
+import pandas as pd
+import streamlit as st
+
+from utils.cache import cached
+from utils.queryregistry import query_columns, run_query_count, run_query_page
+
+# --- Defaults (override via environment on the app container) ---
+# Rows sent to the browser per grid page
+GRID_PAGE_SIZE = int(os.environ.get("PORTAL_GRID_PAGE_SIZE", 500))
+
+
+def _freeze(filters):
+    # Hashable, JSON-friendly and order-independent, so it can be a cache key field.
+    return tuple(sorted((filters or {}).items()))
+
+
+# --- Sources ---
+@cached("query_pages", persist=False)
+def load_query_page(query, sort=None, descending=False, filters=(), offset=0, limit=GRID_PAGE_SIZE, **params):
+    return run_query_page(query, sort, descending, dict(filters), offset, limit, **params)
+
+
+@cached("query_counts", persist=False)
+def load_query_count(query, filters=(), **params):
+    return run_query_count(query, dict(filters), **params)
+
+
+class QuerySource:
+    """Rows of a registered query, sorted, filtered and paged in the warehouse.
+
+    Pages and counts go through the result cache, so only the pages somebody looked
+    at are held in memory and ``invalidate`` can target them by week / version.
+    """
+
+    def __init__(self, query, **params):
+        self.query = query
+        self.params = params
+
+    def columns(self):
+        return query_columns(self.query, **self.params)
+
+    def count(self, filters=None):
+        return load_query_count(self.query, _freeze(filters), **self.params)
+
+    def page(self, sort=None, descending=False, filters=None, offset=0, limit=GRID_PAGE_SIZE):
+        return load_query_page(self.query, sort, descending, _freeze(filters), offset, limit, **self.params)
+
+    def first_page_tasks(self):
+        """Prefetch tasks (see utils/prefetch.py) for what the grid shows before any interaction."""
+        return [(load_query_count, (self.query,), self.params), (load_query_page, (self.query,), self.params)]
+
+
+class FrameSource:
+    """An already loaded DataFrame, paged locally so only one page is sent to the browser."""
+
+    def __init__(self, df):
+        self.df = df
+
+    def columns(self):
+        return [str(column) for column in self.df.columns]
+
+    def _filtered(self, filters):
+        mask = pd.Series(True, index=self.df.index)
+        for column, text in (filters or {}).items():
+            values = self.df[self._column(column)].astype(str).str.lower()
+            mask &= values.str.contains(str(text).lower(), regex=False)
+        return self.df[mask]
+
+    def _column(self, name):
+        # Pivoted frames can have non-string column labels (e.g. recipe sizes).
+        return next(column for column in self.df.columns if str(column) == name)
+
+    def count(self, filters=None):
+        return len(self._filtered(filters))
+
+    def page(self, sort=None, descending=False, filters=None, offset=0, limit=GRID_PAGE_SIZE):
+        df = self._filtered(filters)
+        if sort is not None:
+            df = df.sort_values(self._column(sort), ascending=not descending, kind="stable")
+        return df.iloc[offset:offset + limit]
+
+
+# --- Grid ---
+@st.fragment
+def paged_dataframe(source, key, page_size=GRID_PAGE_SIZE, height=650):
+    """``st.dataframe`` over one page of ``source`` with sort / filter / page controls.
+
+    Changing a control reruns only this grid; sort and filter are applied by the
+    source before paging, so they cover every row and not just the visible page.
+    """
+    columns = source.columns()
+    col1, col2, col3, col4, col5 = st.columns([2, 1, 2, 3, 1])
+    with col1:
+        sort = st.selectbox("Sort by", options=[None] + columns, format_func=lambda c: "—" if c is None else c, key=f"{key}_sort")
+    with col2:
+        descending = st.toggle("Descending", key=f"{key}_descending")
+    with col3:
+        filter_column = st.selectbox("Filter column", options=columns, key=f"{key}_filter_column")
+    with col4:
+        filter_text = st.text_input("Contains", key=f"{key}_filter_text").strip()
+
+    filters = {filter_column: filter_text} if filter_text else {}
+    total = source.count(filters)
+    pages = max(1, math.ceil(total / page_size))
+
+    # A new sort or filter starts again from the first page.
+    view = (sort, descending, filter_column, filter_text)
+    if st.session_state.get(f"{key}_view") != view:
+        st.session_state[f"{key}_view"] = view
+        st.session_state[f"{key}_page"] = 1
+    elif st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    with col5:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+
+    offset = (page - 1) * page_size
+    df = source.page(sort, descending, filters, offset, page_size)
+    st.dataframe(df, use_container_width=True, height=height, hide_index=True)
+    st.caption(f"Rows {offset + 1 if total else 0:,}–{offset + len(df):,} of {total:,} ({pages:,} pages)")
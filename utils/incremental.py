@@ -0,0 +1,161 @@
+import datetime
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from utils.stream import write_parquet
+
+# --- Defaults (override via environment on the app container) ---
+SERIES_DIR = os.environ.get("PORTAL_SERIES_DIR", os.path.join(".cache", "series"))
+# Weeks before the high-water mark that every refresh fetches again, for late corrections
+RECHECK_WEEKS = int(os.environ.get("PORTAL_SERIES_RECHECK_WEEKS", 2))
+# A full rebuild this often picks up anything older than the re-check window (e.g. a new entity's history)
+FULL_REFRESH_DAYS = int(os.environ.get("PORTAL_SERIES_FULL_REFRESH_DAYS", 7))
+
+
+def weeks_before(week, weeks):
+    """The "YYYY-Www" week ``weeks`` weeks before ``week``."""
+    year, number = week.split("-W")
+    monday = datetime.date.fromisocalendar(int(year), int(number), 1) - datetime.timedelta(weeks=weeks)
+    iso = monday.isocalendar()
+    return f"{iso.year}-W{iso.week:02d}"
+
+
+class IncrementalSeries:
+    """A weekly series kept on disk and refreshed from its newest weeks only.
+
+    The stored frame has one row per ``keys``. Its high-water mark is the latest
+    week seen per ``partition`` (version x entity). A refresh asks the warehouse
+    only for weeks from the lowest recent mark minus ``recheck_weeks``, drops the
+    stored rows in that range and appends the fetched ones, so its cost follows
+    the number of recent weeks rather than the length of history. A mark more
+    than ``recheck_weeks`` behind the newest one doesn't hold the start back;
+    the periodic full rebuild re-checks that partition instead. Weeks are
+    "YYYY-Www" strings, which order correctly as text.
+    """
+
+    def __init__(
+        self,
+        name,
+        keys,
+        partition=("version", "bob_entity_code"),
+        week="hellofresh_week",
+        recheck_weeks=RECHECK_WEEKS,
+        full_refresh_days=FULL_REFRESH_DAYS,
+        directory=SERIES_DIR,
+    ):
+        self.name = name
+        self.keys = list(keys)
+        self.partition = list(partition)
+        self.week = week
+        self.recheck_weeks = recheck_weeks
+        self.full_refresh_seconds = full_refresh_days * 24 * 60 * 60
+        self.data_path, self.meta_path = _paths(directory, name)
+        self._lock = threading.Lock()
+
+    # --- storage ---
+    def _read(self):
+        meta = _read_meta(self.meta_path)
+        if meta.get("full_refreshed_at") is None:
+            return None, meta
+        try:
+            return pd.read_parquet(self.data_path), meta
+        except Exception:
+            return None, {}
+
+    def _write(self, df, meta):
+        os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
+        write_parquet(iter([df]), self.data_path)
+        _write_meta(self.meta_path, meta)
+
+    def watermarks(self, df):
+        if df.empty:
+            return {}
+        latest = df.groupby(self.partition, observed=True)[self.week].max()
+        return {"|".join(map(str, key if isinstance(key, tuple) else (key,))): week for key, week in latest.items()}
+
+    # --- refresh ---
+    def since(self, stored, meta):
+        """First week to fetch, or None for a full rebuild."""
+        if stored is None or stored.empty:
+            return None
+        if time.time() - meta["full_refreshed_at"] >= self.full_refresh_seconds:
+            return None
+        try:
+            # Partitions that stopped getting weeks (a retired version, an idle entity) are left to the
+            # full rebuild; only those within ``recheck_weeks`` of the newest mark set the start.
+            marks = meta["watermarks"].values()
+            active_from = weeks_before(max(marks), self.recheck_weeks)
+            since = weeks_before(min(mark for mark in marks if mark >= active_from), self.recheck_weeks)
+        except ValueError:
+            # Not an ISO-style week; rebuild rather than guess.
+            return None
+        if meta.get("dirty_since"):
+            since = min(since, meta["dirty_since"])
+        return since
+
+    def refresh(self, fetch):
+        """Bring the series up to date with ``fetch(since)`` and return all of it.
+
+        ``fetch`` returns the series rows for weeks >= ``since`` (every week when
+        ``since`` is ""), one row per key.
+        """
+        with self._lock:
+            stored, meta = self._read()
+            since = self.since(stored, meta)
+            fetched = fetch(since or "")
+            if since is None:
+                merged = fetched
+                meta = {"full_refreshed_at": time.time()}
+            else:
+                kept = stored[stored[self.week] < since]
+                merged = pd.concat([kept, fetched], ignore_index=True) if len(kept) else fetched
+                meta = {"full_refreshed_at": meta["full_refreshed_at"]}
+            merged = merged.sort_values(self.keys, ignore_index=True)
+            meta |= {
+                "watermarks": self.watermarks(merged),
+                "refreshed_at": time.time(),
+                "last_since": since,
+                "rows_fetched": len(fetched),
+            }
+            self._write(merged, meta)
+            return merged
+
+
+def _paths(directory, name):
+    base = os.path.join(directory, name)
+    return base + ".parquet", base + ".json"
+
+
+def _read_meta(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(path, meta):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def invalidate(name, week=None, directory=SERIES_DIR):
+    """Make the next refresh of series ``name`` refetch from ``week`` (or everything when None).
+
+    Works on the stored files, so it needs no IncrementalSeries instance.
+    """
+    _, meta_path = _paths(directory, name)
+    meta = _read_meta(meta_path)
+    if not meta:
+        return
+    if week is None:
+        meta["full_refreshed_at"] = 0
+    else:
+        meta["dirty_since"] = min(week, meta.get("dirty_since") or week)
+    _write_meta(meta_path, meta)
@@ -0,0 +1,231 @@
+import logging
+import os
+import threading
+import time
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.config import get_config
+
+logger = logging.getLogger(__name__)
+
+# --- Defaults (override via environment on the app container) ---
+# Poll interval per run: starts at the minimum, doubles while the state doesn't change
+JOBS_POLL_MIN_SECONDS = float(os.environ.get("PORTAL_JOBS_POLL_MIN_SECONDS", 2))
+JOBS_POLL_MAX_SECONDS = float(os.environ.get("PORTAL_JOBS_POLL_MAX_SECONDS", 60))
+# At least this many runs due at once are refreshed through runs/list pages instead of one runs/get each
+JOBS_LIST_THRESHOLD = int(os.environ.get("PORTAL_JOBS_LIST_THRESHOLD", 3))
+JOBS_LIST_MAX_PAGES = 10
+JOBS_HTTP_POOL_SIZE = int(os.environ.get("PORTAL_JOBS_HTTP_POOL_SIZE", 4))
+JOBS_HTTP_TIMEOUT_SECONDS = 30
+# How often pages re-read run states from the monitor (no HTTP involved)
+JOBS_REFRESH_SECONDS = 5
+
+TERMINAL_STATES = {"TERMINATED", "SKIPPED", "INTERNAL_ERROR"}
+
+
+class _Run:
+    __slots__ = ("run_id", "submitted_at", "interval", "next_poll", "state")
+
+    def __init__(self, run_id, now):
+        self.run_id = run_id
+        self.submitted_at = time.time()
+        self.interval = JOBS_POLL_MIN_SECONDS
+        self.next_poll = now
+        self.state = {"status": "SUBMITTED", "result": None, "message": None, "error": None, "updated_at": time.time()}
+
+
+def _session(token, pool_size):
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bearer {token}"
+    # Transient warehouse-side errors are retried here; polling backoff covers the rest.
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class JobMonitor:
+    """Tracks Databricks Jobs 2.1 runs from one background thread per process.
+
+    Each run is polled on its own exponential backoff; when several runs are due
+    together they are refreshed from ``runs/list`` pages in one go, falling back to
+    ``runs/get`` for any not found there. Pages only read the latest states, so a
+    rerun never waits on the Jobs API. All requests share one pooled session.
+    """
+
+    def __init__(self, base_url, token, pool_size=JOBS_HTTP_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.session = _session(token, pool_size)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._runs = {}
+        self._states = {}
+        self.stats = {"submitted": 0, "list_calls": 0, "get_calls": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._loop, name="job-monitor", daemon=True)
+        self._thread.start()
+
+    # --- API ---
+    def _url(self, path):
+        return f"{self.base_url}/api/2.1/jobs/{path}"
+
+    def submit(self, payload):
+        """Submit a one-time run (``runs/submit``), start tracking it and return its run id."""
+        response = self.session.post(self._url("runs/submit"), json=payload, timeout=JOBS_HTTP_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        run_id = response.json()["run_id"]
+        with self._lock:
+            self.stats["submitted"] += 1
+        self.track(run_id)
+        return run_id
+
+    def _get_state(self, run_id):
+        with self._lock:
+            self.stats["get_calls"] += 1
+        response = self.session.get(self._url("runs/get"), params={"run_id": run_id}, timeout=JOBS_HTTP_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return response.json()["state"]
+
+    def _list_states(self, run_ids, since):
+        """States of ``run_ids`` found in the one-time runs started since ``since`` (epoch seconds)."""
+        found, offset = {}, 0
+        for _ in range(JOBS_LIST_MAX_PAGES):
+            with self._lock:
+                self.stats["list_calls"] += 1
+            response = self.session.get(
+                self._url("runs/list"),
+                params={"run_type": "SUBMIT_RUN", "start_time_from": int(since * 1000), "limit": 25, "offset": offset},
+                timeout=JOBS_HTTP_TIMEOUT_SECONDS,
+            )
+            response.raise_for_status()
+            body = response.json()
+            runs = body.get("runs", [])
+            for run in runs:
+                if run["run_id"] in run_ids:
+                    found[run["run_id"]] = run["state"]
+            if len(found) == len(run_ids) or not body.get("has_more"):
+                break
+            offset += len(runs)
+        return found
+
+    # --- tracking ---
+    def track(self, run_id):
+        with self._lock:
+            if run_id not in self._runs and self._states.get(run_id, {}).get("status") not in TERMINAL_STATES:
+                run = _Run(run_id, time.monotonic())
+                self._runs[run_id] = run
+                self._states[run_id] = dict(run.state)
+        self._wake.set()
+
+    def status(self, run_id):
+        """Latest known state of ``run_id`` (status, result, message, error, updated_at), or None."""
+        with self._lock:
+            state = self._states.get(run_id)
+            return dict(state) if state is not None else None
+
+    def refresh(self, run_ids=None):
+        """Poll ``run_ids`` (default: every tracked run) on the next loop turn instead of waiting for backoff."""
+        with self._lock:
+            for run in self._runs.values():
+                if run_ids is None or run.run_id in run_ids:
+                    run.next_poll = time.monotonic()
+        self._wake.set()
+
+    def _update(self, run, state=None, error=None):
+        with self._lock:
+            if error is not None:
+                self.stats["errors"] += 1
+                run.state = {**run.state, "error": error, "updated_at": time.time()}
+                changed = False
+            else:
+                new = {
+                    "status": state["life_cycle_state"],
+                    "result": state.get("result_state"),
+                    "message": state.get("state_message"),
+                    "error": None,
+                }
+                changed = any(run.state.get(k) != v for k, v in new.items())
+                run.state = {**new, "updated_at": time.time()}
+            self._states[run.run_id] = dict(run.state)
+            if run.state["status"] in TERMINAL_STATES:
+                del self._runs[run.run_id]
+                return
+            run.interval = JOBS_POLL_MIN_SECONDS if changed else min(run.interval * 2, JOBS_POLL_MAX_SECONDS)
+            run.next_poll = time.monotonic() + run.interval
+
+    def _poll(self, due):
+        states = {}
+        if len(due) >= JOBS_LIST_THRESHOLD:
+            try:
+                states = self._list_states({run.run_id for run in due}, min(run.submitted_at for run in due) - 60)
+            except requests.exceptions.RequestException as e:
+                logger.warning("runs/list failed, polling runs one by one: %s", e)
+        for run in due:
+            try:
+                state = states.get(run.run_id) or self._get_state(run.run_id)
+            except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+                self._update(run, error=f"{type(e).__name__}: {e}")
+                continue
+            self._update(run, state)
+
+    def _loop(self):
+        while True:
+            # Cleared before looking, so a track() that lands meanwhile still wakes the wait below.
+            self._wake.clear()
+            now = time.monotonic()
+            with self._lock:
+                # Runs coming due shortly ride along, so states are fetched in batches rather than one by one.
+                due = [run for run in self._runs.values() if run.next_poll <= now + JOBS_POLL_MIN_SECONDS / 2]
+                next_poll = min((run.next_poll for run in self._runs.values()), default=None)
+            if due:
+                try:
+                    self._poll(due)
+                except Exception:
+                    # A malformed response must not kill the thread; runs it didn't reach wait their interval.
+                    logger.exception("Polling %d job run(s) failed", len(due))
+                    with self._lock:
+                        self.stats["errors"] += 1
+                        retry_at = time.monotonic()
+                        for run in due:
+                            if run.next_poll <= now + JOBS_POLL_MIN_SECONDS / 2:
+                                run.next_poll = retry_at + run.interval
+                continue
+            self._wake.wait(None if next_poll is None else next_poll - now)
+
+    def summary(self):
+        with self._lock:
+            return {"tracked": len(self._runs), "known": len(self._states), **self.stats}
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_monitor():
+    # One monitor per process, shared by every Streamlit session.
+    if os.environ.get("PORTAL_DB_BACKEND") == "duckdb":
+        from utils.localjobs import start_server
+        return JobMonitor(start_server(), "local")
+    config = get_config()
+    return JobMonitor(config.jobs_base_url, config.access_token)
+
+
+def sync_jobs(jobs):
+    """Copy the monitor's states into a session's ``jobs`` dict ({run_id: {"status", "result", "notified", "dismissed"}}).
+
+    A job whose status or result changed is flagged for a fresh notification, shown until dismissed again.
+    """
+    monitor = get_job_monitor()
+    for run_id, job in jobs.items():
+        state = monitor.status(run_id)
+        if state is None:
+            # Tracked before this process started (e.g. after a redeploy)
+            if job["status"] not in TERMINAL_STATES:
+                monitor.track(run_id)
+            continue
+        if (state["status"], state["result"]) != (job["status"], job["result"]):
+            job["status"] = state["status"]
+            job["result"] = state["result"]
+            job["notified"] = False
+            job["dismissed"] = False
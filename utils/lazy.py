@@ -0,0 +1,36 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    ``echarts = lazy_import("streamlit_echarts")`` at the top of a page costs
+    nothing; ``echarts.st_echarts(...)`` imports the real module the first time a
+    chart is drawn. Heavy optional dependencies (openai, plotly, pyspark,
+    streamlit_echarts) thus load only on the code paths that use them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        # Only reached for names not set in __init__.
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
@@ -0,0 +1,168 @@
+import os
+import re
+import threading
+
+import duckdb
+import pyarrow as pa
+
+# Parquet snapshots live under <SNAPSHOT_DIR>/<schema>/<table>.parquet (or a directory of parquet files)
+SNAPSHOT_DIR = os.environ.get("PORTAL_SNAPSHOT_DIR", "snapshots")
+
+# Tables the app writes to (auth) are copied into memory instead of exposed as read-only views.
+WRITABLE_TABLES = {
+    "anz_finance_app.users",
+    "anz_finance_app.password_reset_tokens",
+}
+
+# --- Dialect shim: Databricks SQL -> DuckDB ---
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_DOUBLE_QUOTED_RE = re.compile(r'"((?:[^"]|"")*)"')
+_PARAM_RE = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+_CATALOG_RE = re.compile(r"\bhive_metastore\.", re.IGNORECASE)
+_CURRENT_TIMESTAMP_RE = re.compile(r"\bcurrent_timestamp\(\)", re.IGNORECASE)
+# Spark accepts "WITH name (SELECT ...)"; DuckDB needs the AS.
+_CTE_WITHOUT_AS_RE = re.compile(r"(\bWITH|\)\s*,)(\s+\w+)\s*\(\s*(?=(?:SELECT|WITH)\b)", re.IGNORECASE)
+
+
+def _translate_segment(segment):
+    # Spark treats "P" as a string literal, DuckDB as an identifier.
+    segment = _DOUBLE_QUOTED_RE.sub(lambda m: "'" + m.group(1).replace('""', '"').replace("'", "''") + "'", segment)
+    segment = _CATALOG_RE.sub("", segment)
+    segment = _CURRENT_TIMESTAMP_RE.sub("current_timestamp", segment)
+    segment = _CTE_WITHOUT_AS_RE.sub(r"\1\2 AS (", segment)
+    return _PARAM_RE.sub(r"$\1", segment)
+
+
+def translate_sql(query):
+    """Rewrite the Databricks SQL used by the query modules so DuckDB can run it unchanged otherwise.
+
+    String literals are left untouched; only the text between them is rewritten.
+    """
+    parts = []
+    last = 0
+    for match in _STRING_LITERAL_RE.finditer(query):
+        parts.append(_translate_segment(query[last:match.start()]))
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(_translate_segment(query[last:]))
+    return "".join(parts)
+
+
+# --- DBAPI surface used by utils.db ---
+class LocalCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._batches = None
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, query, params=None):
+        query = translate_sql(query)
+        self._batches = None
+        if params:
+            self._cursor.execute(query, params)
+        else:
+            self._cursor.execute(query)
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchall_arrow(self):
+        return self._cursor.fetch_arrow_table()
+
+    def fetchmany_arrow(self, size):
+        # The first call fixes the batch size for the rest of the result.
+        if self._batches is None:
+            self._batches = self._cursor.fetch_record_batch(size)
+        try:
+            return pa.Table.from_batches([self._batches.read_next_batch()])
+        except StopIteration:
+            return self._batches.schema.empty_table()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    def close(self):
+        self._cursor.close()
+
+
+class LocalConnection:
+    def __init__(self, database):
+        self._conn = database.cursor()
+
+    def cursor(self):
+        return LocalCursor(self._conn.cursor())
+
+    def commit(self):
+        # DuckDB runs in autocommit mode unless a transaction was opened explicitly.
+        pass
+
+    def close(self):
+        self._conn.close()
+
+
+def _snapshot_tables(directory):
+    """Yield (schema, table, parquet glob) for every snapshot under ``directory``."""
+    if not os.path.isdir(directory):
+        return
+    for schema in sorted(os.listdir(directory)):
+        schema_dir = os.path.join(directory, schema)
+        if not os.path.isdir(schema_dir):
+            continue
+        for name in sorted(os.listdir(schema_dir)):
+            path = os.path.join(schema_dir, name)
+            if name.endswith(".parquet") and os.path.isfile(path):
+                yield schema, name[: -len(".parquet")], path
+            elif os.path.isdir(path):
+                yield schema, name, os.path.join(path, "*.parquet")
+
+
+def open_database(directory=SNAPSHOT_DIR):
+    """In-memory DuckDB database with one view per Parquet snapshot, named ``<schema>.<table>``."""
+    database = duckdb.connect(":memory:")
+    for schema, table, path in _snapshot_tables(directory):
+        source = f"read_parquet('{path.replace(chr(39), chr(39) * 2)}')"
+        kind = "TABLE" if f"{schema}.{table}" in WRITABLE_TABLES else "VIEW"
+        database.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+        database.execute(f'CREATE OR REPLACE {kind} "{schema}"."{table}" AS SELECT * FROM {source}')
+    return database
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_database():
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = open_database()
+        return _database
+
+
+def open_connection():
+    """Connection factory for utils.db's pool; every connection shares the same snapshot database."""
+    return LocalConnection(get_database())
+
+
+def write_snapshot(table, df, directory=SNAPSHOT_DIR, partition=None):
+    """Save ``df`` as the snapshot for ``schema.table`` (e.g. ``anz_finance_app.anz_orders_recipes``).
+
+    With ``partition`` (e.g. a week) the frame becomes one file of a multi-file
+    snapshot, ``<schema>/<table>/<partition>.parquet``, so large tables can be
+    written a week at a time.
+    """
+    schema, name = table.split(".")[-2:]
+    if partition is None:
+        path = os.path.join(directory, schema, f"{name}.parquet")
+    else:
+        path = os.path.join(directory, schema, name, f"{partition}.parquet")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path, index=False)
+    return path
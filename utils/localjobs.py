@@ -0,0 +1,88 @@
+"""Local stand-in for the Databricks Jobs 2.1 runs API, for PORTAL_DB_BACKEND=duckdb.
+
+Serves runs/submit, runs/get and runs/list on 127.0.0.1. A submitted run goes
+PENDING -> RUNNING -> TERMINATED (SUCCESS) on a timer; a notebook path containing
+"fail" ends FAILED instead.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Seconds a local run spends pending, then running
+PENDING_SECONDS = float(os.environ.get("PORTAL_LOCAL_JOB_PENDING_SECONDS", 2))
+RUNNING_SECONDS = float(os.environ.get("PORTAL_LOCAL_JOB_RUNNING_SECONDS", 10))
+
+_runs = {}
+_run_ids = itertools.count(1000)
+_lock = threading.Lock()
+
+
+def _state(run):
+    elapsed = time.time() - run["start_time"] / 1000
+    if elapsed < PENDING_SECONDS:
+        return {"life_cycle_state": "PENDING", "state_message": "Waiting for cluster"}
+    if elapsed < PENDING_SECONDS + RUNNING_SECONDS:
+        return {"life_cycle_state": "RUNNING", "state_message": ""}
+    return {"life_cycle_state": "TERMINATED", "result_state": "FAILED" if run["fail"] else "SUCCESS", "state_message": ""}
+
+
+def _run_json(run):
+    return {"run_id": run["run_id"], "run_name": run["run_name"], "start_time": run["start_time"], "state": _state(run)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _send(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/api/2.1/jobs/runs/submit":
+            return self._send(404, {"error_code": "ENDPOINT_NOT_FOUND"})
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        paths = [task.get("notebook_task", {}).get("notebook_path", "") for task in payload.get("tasks", [])]
+        with _lock:
+            run_id = next(_run_ids)
+            _runs[run_id] = {
+                "run_id": run_id,
+                "run_name": payload.get("run_name"),
+                "start_time": int(time.time() * 1000),
+                "fail": any("fail" in path for path in paths),
+            }
+        self._send(200, {"run_id": run_id})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with _lock:
+            runs = dict(_runs)
+        if url.path == "/api/2.1/jobs/runs/get":
+            run = runs.get(int(query.get("run_id", -1)))
+            if run is None:
+                return self._send(400, {"error_code": "INVALID_PARAMETER_VALUE"})
+            return self._send(200, _run_json(run))
+        if url.path == "/api/2.1/jobs/runs/list":
+            since = int(query.get("start_time_from", 0))
+            offset, limit = int(query.get("offset", 0)), int(query.get("limit", 25))
+            # Newest first, like the real API
+            matching = sorted((r for r in runs.values() if r["start_time"] >= since), key=lambda r: -r["run_id"])
+            page = matching[offset:offset + limit]
+            return self._send(200, {"runs": [_run_json(r) for r in page], "has_more": offset + limit < len(matching)})
+        self._send(404, {"error_code": "ENDPOINT_NOT_FOUND"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0):
+    """Serve the mock API from a daemon thread and return its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    threading.Thread(target=server.serve_forever, name="local-jobs-api", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
@@ -1,25 +1,14 @@
 import streamlit as st
-from databricks import sql
 import pandas as pd
-import requests
-import os
-import time
-from utils.db import (
-    get_connection
+from utils.queryregistry import (
+    register_query,
+    run_query
 )
 
-DATABRICKS_HOST = st.secrets['databricks']['host']
-HTTP_PATH = st.secrets['databricks']['http_path']
-ACCESS_TOKEN = st.secrets['databricks']['token']
 
-os.environ["DATABRICKS_HOST"] = f"https://{st.secrets['databricks']['host']}"
-os.environ["DATABRICKS_TOKEN"] = st.secrets['databricks']['token']
-
-# API endpoint
-apiurl = f"{os.environ['DATABRICKS_HOST']}/api/2.1/jobs/runs/submit"
-
-def run_sales_cogs_by_slot_raw(version, week):
-    query = f"""
+register_query(
+    "sales_cogs_by_slot",
+    """
         select 
             M.hellofresh_week,
             M.version,
@@ -47,17 +36,18 @@ def run_sales_cogs_by_slot_raw(version, week):
             M.adj_cost_per_box,
             M.adj_cogs_per_box
         FROM  anz_finance_app.sales_cogs_by_slots M
-        WHERE M.version = '{version}' AND M.hellofresh_week ='{week}'
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+        WHERE M.version = :version AND M.hellofresh_week =:week
+    """,
+)
 
 
-def run_recipes_raw_data(version, week):
-    query = f"""
+def run_sales_cogs_by_slot_raw(version, week):
+    return run_query("sales_cogs_by_slot", version=version, week=week)
+
+
+register_query(
+    "recipes_raw",
+    """
         
             SELECT 
             v.bob_entity_code,
@@ -74,25 +64,27 @@ def run_recipes_raw_data(version, week):
             forecast_sku_quantity,
             forecast_total_cost
             FROM  anz_operations.anz_kraken_operations_historical v
-            WHERE v.hellofresh_week = '{week}'
-            AND v.version = '{version}'
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+            WHERE v.hellofresh_week = :week
+            AND v.version = :version
+    """,
+)
 
 
-def fetch_hellofresh_weeks():
-    conn = get_connection()
-    query = """
+def run_recipes_raw_data(version, week):
+    return run_query("recipes_raw", version=version, week=week)
+
+
+register_query(
+    "hellofresh_weeks_unordered",
+    """
         SELECT distinct hellofresh_week from hive_metastore.dimensions.date_dimension
         WHERE hellofresh_week between '2025-W01' ANd '2026-W52'
-    """
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
+    """,
+)
+
+
+def fetch_hellofresh_weeks():
+    return run_query("hellofresh_weeks_unordered")
 
 
 def process_sales_cogs_data(df, option, country):
@@ -1,45 +1,40 @@
 import streamlit as st
-from databricks import sql
 import pandas as pd
-import requests
-import os
-import time
-from utils.db import (
-    get_connection
+from utils.queryregistry import (
+    register_query,
+    run_query,
+    stream_query
 )
+from utils.stream import running_sum
 
-DATABRICKS_HOST = st.secrets['databricks']['host']
-HTTP_PATH = st.secrets['databricks']['http_path']
-ACCESS_TOKEN = st.secrets['databricks']['token']
 
-os.environ["DATABRICKS_HOST"] = f"https://{st.secrets['databricks']['host']}"
-os.environ["DATABRICKS_TOKEN"] = st.secrets['databricks']['token']
-
-# API endpoint
-apiurl = f"{os.environ['DATABRICKS_HOST']}/api/2.1/jobs/runs/submit"
-
-def run_order_recipe_margin_raw(hellofresh_week_option,entity_option):
-    query = f"""
+register_query(
+    "order_recipe_margin_raw",
+    """
           SELECT 
           bob_entity_code, hellofresh_week, composite_order_id, order_item_type, order_line_items_id, primary_tag, product_type, box_size,serves, number_of_recipes, kit_count,box_count, total_gross_revenue_excl_sales_tax, shipping_revenue_excl_tax, core_gross_revenue_excl_sales_tax, non_core_gross_revenue_excl_sales_tax, total_direct_costs, total_net_revenue_excl_sales_tax, net_p1c_margin
           FROM anz_finance_app.anz_orders_recipes
-          WHERE hellofresh_week = '{hellofresh_week_option}' AND bob_entity_code= '{entity_option}'
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+          WHERE hellofresh_week = :week AND bob_entity_code= :entity
+    """,
+    dtypes={"bob_entity_code": "category", "box_size": "int32", "serves": "int32", "number_of_recipes": "int32", "kit_count": "int32", "box_count": "int32"},
+)
 
-def run_incremental_revenue_raw():
-    query = f"""
+
+def run_order_recipe_margin_raw(hellofresh_week_option,entity_option):
+    return run_query("order_recipe_margin_raw", week=hellofresh_week_option, entity=entity_option)
+
+
+register_query(
+    "incremental_revenue",
+    """
           SELECT 
         country,
         hellofresh_week,
         product_type,
         recipe_slot,
         box_size,
-        SUM(non_core_gross_revenue_excl_sales_tax) / SUM(box_size) as incremental_rev
+        SUM(non_core_gross_revenue_excl_sales_tax) as non_core_revenue,
+        SUM(box_size) as box_size_total
         FROM anz_finance_app.anz_orders_recipes_slots
         WHERE product_type in ('Modularity', 'Surcharge')
         AND non_core_gross_revenue_excl_sales_tax > 0
@@ -48,10 +43,17 @@ def run_incremental_revenue_raw():
         1,2,3,4,5
         ORDER BY
         1,2,3,4,5
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+    """,
+)
+
+
+def run_incremental_revenue_raw():
+    # Streamed and summed batch by batch; the ratio is only taken once every batch is in.
+    df = running_sum(
+        stream_query("incremental_revenue"),
+        ["country", "hellofresh_week", "product_type", "recipe_slot", "box_size"],
+        ["non_core_revenue", "box_size_total"],
+    )
+    df["incremental_rev"] = df["non_core_revenue"] / df["box_size_total"]
+    return df.drop(columns=["non_core_revenue", "box_size_total"])
 
@@ -0,0 +1,40 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+import streamlit as st
+
+# --- Defaults (override via environment on the app container) ---
+# bcrypt cost (log2 rounds) for new hashes; existing hashes keep the cost they were made with
+BCRYPT_ROUNDS = int(os.environ.get("PORTAL_BCRYPT_ROUNDS", 12))
+# Password hashes / checks running at once across all sessions; the rest wait their turn
+PASSWORD_WORKERS = int(os.environ.get("PORTAL_PASSWORD_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+@st.cache_resource(show_spinner=False)
+def get_password_executor():
+    # bcrypt releases the GIL, so threads are enough; the pool size is what keeps a burst of
+    # logins from taking every core away from other sessions' reruns.
+    return ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _checkpw(password, password_hash):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # Not a bcrypt hash (e.g. a corrupted row): treat as a wrong password.
+        return False
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    """bcrypt hash of ``password``, computed on the password pool."""
+    return get_password_executor().submit(_hashpw, password, rounds).result()
+
+
+def check_password(password: str, password_hash: str) -> bool:
+    """Whether ``password`` matches ``password_hash``, checked on the password pool."""
+    return get_password_executor().submit(_checkpw, password, password_hash).result()
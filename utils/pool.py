@@ -0,0 +1,270 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class _PoolEntry:
+    __slots__ = ("raw", "created_at", "last_used_at", "needs_check")
+
+    def __init__(self, raw):
+        now = time.monotonic()
+        self.raw = raw
+        self.created_at = now
+        self.last_used_at = now
+        self.needs_check = False
+
+
+class PooledConnection:
+    """Thin proxy around a DBAPI connection. ``close()`` hands it back to the pool."""
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+        self._cursors = []
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._raw().cursor(*args, **kwargs)
+        self._cursors.append(cursor)
+        return cursor
+
+    def _raw(self):
+        if self._entry is None:
+            raise RuntimeError("connection already returned to pool")
+        return self._entry.raw
+
+    def _close_cursors(self):
+        cursors, self._cursors = self._cursors, []
+        for cursor in cursors:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    def __getattr__(self, name):
+        entry = self.__dict__.get("_entry")
+        if entry is None:
+            raise AttributeError(f"connection already returned to pool ({name})")
+        return getattr(entry.raw, name)
+
+    def close(self):
+        self._close_cursors()
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool.release(entry)
+
+    def invalidate(self):
+        """Drop the underlying session instead of returning it to the pool."""
+        self._close_cursors()
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool.release(entry, discard=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self._entry is not None:
+            self._entry.needs_check = True
+        self.close()
+
+
+def _default_health_check(raw):
+    cursor = raw.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of DBAPI connections shared by every session in the process.
+
+    Idle connections are evicted after ``max_idle_seconds``, recycled after
+    ``max_lifetime_seconds`` and health-checked on checkout when they have sat
+    idle for longer than ``check_after_seconds`` (or were released after an error).
+    """
+
+    def __init__(
+        self,
+        factory,
+        max_size=8,
+        max_idle_seconds=300,
+        max_lifetime_seconds=3600,
+        check_after_seconds=30,
+        checkout_timeout=60,
+        health_check=_default_health_check,
+    ):
+        self._factory = factory
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.check_after_seconds = check_after_seconds
+        self.checkout_timeout = checkout_timeout
+        self._health_check = health_check
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._size = 0  # open connections, idle + checked out
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+            "opens": 0,
+            "closes": 0,
+            "idle_evictions": 0,
+            "recycled": 0,
+            "failed_health_checks": 0,
+        }
+
+    # --- internals ---
+    def _expired(self, entry, now):
+        if now - entry.created_at >= self.max_lifetime_seconds:
+            return "recycled"
+        if now - entry.last_used_at >= self.max_idle_seconds:
+            return "idle_evictions"
+        return None
+
+    def _close_raw(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _evict_expired_locked(self, now):
+        """Pop expired idle entries; the caller closes them outside the lock."""
+        expired = []
+        kept = deque()
+        while self._idle:
+            entry = self._idle.popleft()
+            reason = self._expired(entry, now)
+            if reason:
+                self._stats[reason] += 1
+                self._stats["closes"] += 1
+                self._size -= 1
+                expired.append(entry)
+            else:
+                kept.append(entry)
+        self._idle = kept
+        return expired
+
+    def _is_healthy(self, entry, now):
+        if not entry.needs_check and now - entry.last_used_at < self.check_after_seconds:
+            return True
+        try:
+            self._health_check(entry.raw)
+            entry.needs_check = False
+            return True
+        except Exception:
+            with self._cond:
+                self._stats["failed_health_checks"] += 1
+            return False
+
+    # --- public API ---
+    def checkout(self, timeout=None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited_from = None
+
+        while True:
+            entry = None
+            open_new = False
+            with self._cond:
+                now = time.monotonic()
+                stale = self._evict_expired_locked(now)
+                if stale:
+                    self._cond.notify(len(stale))
+                if self._idle:
+                    # LIFO keeps the warmest sessions in rotation and lets the rest age out.
+                    entry = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    open_new = True
+                else:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"No connection available after {timeout}s (pool size {self.max_size})"
+                        )
+                    if waited_from is None:
+                        waited_from = now
+                        self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+
+            for old in stale:
+                self._close_raw(old.raw)
+
+            if open_new:
+                try:
+                    entry = _PoolEntry(self._factory())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats["opens"] += 1
+            elif entry is None:
+                continue
+            elif not self._is_healthy(entry, time.monotonic()):
+                self._discard(entry)
+                continue
+
+            with self._cond:
+                self._stats["checkouts"] += 1
+                if waited_from is not None:
+                    self._stats["wait_seconds"] += time.monotonic() - waited_from
+            return PooledConnection(self, entry)
+
+    def _discard(self, entry):
+        self._close_raw(entry.raw)
+        with self._cond:
+            self._size -= 1
+            self._stats["closes"] += 1
+            self._cond.notify()
+
+    def release(self, entry, discard=False):
+        now = time.monotonic()
+        # Only lifetime matters here; a long-running query is not an idle session.
+        too_old = now - entry.created_at >= self.max_lifetime_seconds
+        if discard or too_old:
+            if too_old:
+                with self._cond:
+                    self._stats["recycled"] += 1
+            self._discard(entry)
+            return
+        entry.last_used_at = now
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.checkout(timeout)
+        with conn:
+            yield conn
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._size - len(self._idle)
+            stats["max_size"] = self.max_size
+        return stats
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._stats["closes"] += len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_raw(entry.raw)
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils import telemetry
+
+# --- Defaults (override via environment on the app container) ---
+PREFETCH_ENABLED = os.environ.get("PORTAL_PREFETCH", "1") != "0"
+# Background loads running at once across all sessions
+PREFETCH_WORKERS = int(os.environ.get("PORTAL_PREFETCH_WORKERS", 2))
+# Cold loader calls one session may trigger per window; results already cached don't count.
+PREFETCH_BUDGET = int(os.environ.get("PORTAL_PREFETCH_BUDGET", 20))
+PREFETCH_BUDGET_WINDOW_SECONDS = int(os.environ.get("PORTAL_PREFETCH_BUDGET_WINDOW", 300))
+# Slot drill-downs warmed after the CPK summary renders
+PREFETCH_TOP_SLOTS = int(os.environ.get("PORTAL_PREFETCH_TOP_SLOTS", 5))
+
+
+class _Job:
+    def __init__(self, user, view, tasks, ctx):
+        self.user = user
+        self.view = view
+        self.tasks = tasks
+        self.ctx = ctx
+        # The page the session was on when the job was scheduled
+        self.page_hash = ctx.page_script_hash if ctx is not None else None
+        self.page = telemetry.current_page()
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.future = None
+
+
+class Prefetcher:
+    """Warms the result cache in the background with what a session is likely to open next.
+
+    Each session has at most one job: a list of ``(cached loader, args[, kwargs])`` tasks run in
+    order on a shared, capped thread pool. Scheduling a different view, moving to
+    another page or closing the session cancels the job before its next task (a load
+    already running finishes and stays cached). Cold loads count against a per-session
+    budget per time window.
+    """
+
+    def __init__(self, workers=PREFETCH_WORKERS, budget=PREFETCH_BUDGET, window_seconds=PREFETCH_BUDGET_WINDOW_SECONDS):
+        self.budget = budget
+        self.window_seconds = window_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._spent = {}
+        self.stats = {"scheduled": 0, "loaded": 0, "already_cached": 0, "cancelled": 0, "over_budget": 0, "errors": 0}
+
+    def schedule(self, view, tasks, user=None):
+        """Replace this session's job with ``tasks`` for ``view`` (any hashable naming what is on screen).
+
+        Rerunning the same view while its job is still going leaves the job alone.
+        """
+        ctx = get_script_run_ctx(suppress_warning=True)
+        user = user or (ctx.session_id if ctx is not None else "local")
+        with self._lock:
+            current = self._jobs.get(user)
+            if current is not None and current.view == view and not current.done.is_set():
+                return current
+            if current is not None:
+                self._cancel(current)
+            job = _Job(user, view, list(tasks), ctx)
+            self._jobs[user] = job
+            self.stats["scheduled"] += 1
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def cancel(self, user=None):
+        ctx = get_script_run_ctx(suppress_warning=True)
+        user = user or (ctx.session_id if ctx is not None else "local")
+        with self._lock:
+            job = self._jobs.pop(user, None)
+            if job is not None:
+                self._cancel(job)
+
+    def _cancel(self, job):
+        if not job.done.is_set():
+            job.cancelled.set()
+            if job.future is not None:
+                job.future.cancel()
+            self.stats["cancelled"] += 1
+
+    def _wanted(self, job):
+        if job.cancelled.is_set():
+            return False
+        if job.ctx is None:
+            return True
+        if job.ctx.page_script_hash != job.page_hash:
+            return False
+        return not Runtime.exists() or Runtime.instance().is_active_session(job.ctx.session_id)
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _take_budget(self, user):
+        now = time.time()
+        with self._lock:
+            spent = self._spent.setdefault(user, deque())
+            while spent and spent[0] <= now - self.window_seconds:
+                spent.popleft()
+            if len(spent) >= self.budget:
+                return False
+            spent.append(now)
+            return True
+
+    def _run(self, job):
+        try:
+            with telemetry.query_context(prefetch=True, page=job.page):
+                for task in job.tasks:
+                    loader, args, kwargs = task if len(task) == 3 else (*task, {})
+                    if not self._wanted(job):
+                        return
+                    if loader.is_cached(*args, **kwargs):
+                        self._count("already_cached")
+                        continue
+                    if not self._take_budget(job.user):
+                        self._count("over_budget")
+                        return
+                    try:
+                        loader(*args, **kwargs)
+                        self._count("loaded")
+                    except Exception:
+                        # A failed prefetch only means the page loads it cold later.
+                        self._count("errors")
+        finally:
+            job.done.set()
+            with self._lock:
+                if self._jobs.get(job.user) is job:
+                    del self._jobs[job.user]
+                if not self._spent.get(job.user, True):
+                    del self._spent[job.user]
+
+    def status(self):
+        with self._lock:
+            return {"sessions": len(self._jobs), **self.stats}
+
+
+@st.cache_resource(show_spinner=False)
+def get_prefetcher():
+    return Prefetcher()
+
+
+def schedule(view, tasks):
+    """Warm ``tasks`` for the current session once the view has rendered (no-op when disabled)."""
+    if PREFETCH_ENABLED:
+        return get_prefetcher().schedule(view, tasks)
+
+
+def cancel():
+    if PREFETCH_ENABLED:
+        get_prefetcher().cancel()
+
+
+def adjacent(options, value):
+    """The options right after and right before ``value`` (next first), for week-by-week stepping."""
+    if value not in options:
+        return []
+    i = options.index(value)
+    return options[i + 1:i + 2] + options[max(i - 1, 0):i]
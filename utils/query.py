@@ -1,42 +1,41 @@
 import streamlit as st
-from databricks import sql
 import pandas as pd
-import requests
-import os
-import time
+import numpy as np
 from utils.db import (
-    get_connection
+    CATEGORY_DTYPES
 )
+from utils.queryregistry import (
+    register_query,
+    run_query,
+    stream_query
+)
+from utils.stream import running_sum
+from utils.incremental import IncrementalSeries
 
-DATABRICKS_HOST = st.secrets['databricks']['host']
-HTTP_PATH = st.secrets['databricks']['http_path']
-ACCESS_TOKEN = st.secrets['databricks']['token']
-
-os.environ["DATABRICKS_HOST"] = f"https://{st.secrets['databricks']['host']}"
-os.environ["DATABRICKS_TOKEN"] = st.secrets['databricks']['token']
-
-# API endpoint
-apiurl = f"{os.environ['DATABRICKS_HOST']}/api/2.1/jobs/runs/submit"
 
-def run_kraken_raw_data(hellofresh_week_option, entity, version):
-    query = f"""
+register_query(
+    "kraken_raw",
+    """
           SELECT 
           slot, recipe_title, recipe_size, octopus_recipe_id, sku_code, sku_name, 
           sku_picks_per_recipe, sku_unit_cost, supplier_name, supplier_code, supplier_split, 
           recipe_forecast_quantity, forecast_sku_quantity, forecast_total_cost, forecast_kitcount, dc, version, bob_entity_code, hellofresh_week
           FROM anz_finance_app.anz_kraken_operations_historical
-          WHERE hellofresh_week = '{hellofresh_week_option}'
-          AND version = '{version}'
-          AND bob_entity_code = '{entity}'
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+          WHERE hellofresh_week = :week
+          AND version = :version
+          AND bob_entity_code = :entity
+    """,
+    dtypes=CATEGORY_DTYPES,
+)
+
+
+def run_kraken_raw_data(hellofresh_week_option, entity, version):
+    return run_query("kraken_raw", week=hellofresh_week_option, entity=entity, version=version)
 
-def run_kit_count_to_production_data(hellofresh_week_option,entity):
-    query = f"""
+
+register_query(
+    "kit_count_to_production",
+    """
 
         SELECT 
         hellofresh_week,
@@ -49,8 +48,8 @@ def run_kit_count_to_production_data(hellofresh_week_option,entity):
         sum(kit_count) as kit_count
         FROM anz_finance_app.anz_orders_slot_details 
         WHERE 
-        hellofresh_week = '{hellofresh_week_option}'
-        AND country = '{entity}'
+        hellofresh_week = :week
+        AND country = :entity
         AND box_size in (1,2,5,6)
         GROUP BY 1,2,3,4,5,6
 
@@ -67,8 +66,8 @@ def run_kit_count_to_production_data(hellofresh_week_option,entity):
         sum(kit_count) as kit_count
         FROM anz_finance_app.anz_orders_slot_details 
         WHERE 
-        hellofresh_week = '{hellofresh_week_option}'AND 
-        country = '{entity}' AND
+        hellofresh_week = :week AND 
+        country = :entity AND
         country in ('AU','AO') AND
         box_size in (3,5)
         GROUP BY 1,2,3,4,5,6
@@ -87,8 +86,8 @@ def run_kit_count_to_production_data(hellofresh_week_option,entity):
         sum(kit_count) as kit_count
         FROM anz_finance_app.anz_orders_slot_details 
         WHERE 
-        hellofresh_week = '{hellofresh_week_option}' AND
-        country = '{entity}' AND
+        hellofresh_week = :week AND
+        country = :entity AND
         ((country in ('NZ') AND box_size in (3,4,6)) OR
         (country in ('AU','AO') AND box_size in (4,6)))
         GROUP BY 1,2,3,4,5,6
@@ -107,316 +106,320 @@ def run_kit_count_to_production_data(hellofresh_week_option,entity):
         sum(kit_count) as kit_count
         FROM anz_finance_app.anz_orders_slot_details 
         WHERE 
-        hellofresh_week = '{hellofresh_week_option}'
+        hellofresh_week = :week
         AND box_size = 0 AND
-        country = '{entity}' 
+        country = :entity 
         GROUP BY 1,2,3,4,5,6
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+    """,
+    dtypes={"recipe_size": "int32", "kit_count": "int32"},
+)
+
+
+def run_kit_count_to_production_data(hellofresh_week_option,entity):
+    return run_query("kit_count_to_production", week=hellofresh_week_option, entity=entity)
 
 
-def run_kraken_trend_total_cost():
-    query = f"""
+register_query(
+    "kraken_trend_total_cost",
+    """
           SELECT 
           version, bob_entity_code, hellofresh_week , SUM(forecast_total_cost) as forecast_total_cost
           FROM anz_finance_app.anz_kraken_operations_historical
+          WHERE hellofresh_week >= :since
           GROUP BY 1,2,3
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+    """,
+)
+
 
-def run_kraken_trend_supplier_split_error():
-    query = f"""
+# All-history trends grow every week; stream them and keep only the running totals.
+# ``since`` (a week, "" for all) limits them to the weeks an incremental refresh needs.
+def run_kraken_trend_total_cost(since=""):
+    return running_sum(
+        stream_query("kraken_trend_total_cost", since=since),
+        ["version", "bob_entity_code", "hellofresh_week"],
+        ["forecast_total_cost"],
+    )
+
+
+register_query(
+    "kraken_supplier_split_errors",
+    """
           SELECT 
           version, bob_entity_code, hellofresh_week , count_error
           FROM anz_finance_app.anz_kraken_operations_historical_supplier_split_errors 
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+          WHERE hellofresh_week >= :since
+    """,
+)
 
 
-def run_kraken_null_price_error(version, week):
-    query = f"""
+def run_kraken_trend_supplier_split_error(since=""):
+    # The page only ever sums errors per version / entity / week.
+    return running_sum(
+        stream_query("kraken_supplier_split_errors", since=since),
+        ["version", "bob_entity_code", "hellofresh_week"],
+        ["count_error"],
+    )
+
+
+# Trend series kept on disk and refreshed from their newest weeks (see utils/incremental.py)
+KRAKEN_TREND_TOTAL_COST = IncrementalSeries("kraken_trend_total_cost", ["version", "bob_entity_code", "hellofresh_week"])
+KRAKEN_SUPPLIER_SPLIT_ERRORS = IncrementalSeries("kraken_supplier_split_errors", ["version", "bob_entity_code", "hellofresh_week"])
+
+
+def refresh_kraken_trend_total_cost():
+    return KRAKEN_TREND_TOTAL_COST.refresh(run_kraken_trend_total_cost)
+
+
+def refresh_kraken_trend_supplier_split_error():
+    return KRAKEN_SUPPLIER_SPLIT_ERRORS.refresh(run_kraken_trend_supplier_split_error)
+
+
+register_query(
+    "null_price_errors",
+    """
         SELECT 
         version, hellofresh_week, bob_entity_code, sku_code, sku_name, supplier_code, supplier_name, dc, dc_price, nation_price, period_avg_price, applied_price, line_count, forecast_sku_quantity, total_costs
         FROM anz_finance_app.anz_null_price_errors
-        WHERE version = '{version}'
-        AND hellofresh_week = '{week}'
+        WHERE version = :version
+        AND hellofresh_week = :week
         ORDER BY
         1,2,3,4,5,6,7,8
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+    """,
+    dtypes=CATEGORY_DTYPES | {"line_count": "int32"},
+)
 
 
+def run_kraken_null_price_error(version, week):
+    return run_query("null_price_errors", version=version, week=week)
 
-def run_kraken_null_price_error_trends(version):
-    query = f"""
+
+register_query(
+    "null_price_error_summary",
+    """
         SELECT 
-        hellofresh_week, 
         bob_entity_code,
         SUM(total_costs) as total_costs
         FROM anz_finance_app.anz_null_price_errors
-        WHERE version = '{version}'
-        GROUP BY 1,2
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
-
-def run_kraken_cpk(week, entity):
-    query = f"""
-        WITH KITCOUNT_DC (
-            SELECT 
-            slot,
-            hellofresh_week,
-            recipe_size,
-            dc,
-            version,
-            bob_entity_code,
-            AVG(forecast_kitcount) as kitcount
-            FROM anz_finance_app.anz_kraken_operations_historical_cpk 
-            WHERE hellofresh_week = '{week}'
-            AND bob_entity_code = '{entity}'
-            GROUP BY
-            1,2,3,4,5,6
-        ),
-        KITCOUNT (
-            SELECT 
-            slot,
-            hellofresh_week,
-            recipe_size,
-            version,
-            bob_entity_code,
-            SUM(kitcount) as kitcount
-            FROM KITCOUNT_DC
-            GROUP BY
-            1,2,3,4,5
-        )
-
-        SELECT
-        R.slot, 
-        R.recipe_title, 
-        concat(R.recipe_size,"P") as recipe_size, 
-        R.version, 
-        R.bob_entity_code, 
-        R.hellofresh_week, 
-        K.kitcount,
-        R.primary_tag,
-        R.product_type,
-        SUM(cpk) as cpk
-        FROM anz_finance_app.anz_kraken_operations_historical_cpk R
-        LEFT JOIN KITCOUNT K ON R.slot = K.slot AND R.recipe_size = K.recipe_size AND R.version = K.version AND R.bob_entity_code = K.bob_entity_code
-        AND R.hellofresh_week = K.hellofresh_week
-        WHERE R.hellofresh_week = '{week}'
-        AND R.bob_entity_code = '{entity}'
-        GROUP BY 1,2,3,4,5,6,7,8,9
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+        WHERE version = :version
+        AND hellofresh_week = :week
+        GROUP BY 1
+    """,
+)
 
 
+def run_kraken_null_price_error_summary(version, week):
+    return run_query("null_price_error_summary", version=version, week=week)
 
 
-def run_kraken_cpk_primary_tag(week, entity):
-    query = f"""
-        WITH KITCOUNT_DC (
-            SELECT 
-            slot,
-            hellofresh_week,
-            recipe_size,
-            dc,
-            version,
-            bob_entity_code,
-            AVG(forecast_kitcount) as kitcount
-            FROM anz_finance_app.anz_kraken_operations_historical_cpk 
-            WHERE hellofresh_week = '{week}'
-            AND bob_entity_code = '{entity}'
-            GROUP BY
-            1,2,3,4,5,6
-        ),
-        KITCOUNT (
-            SELECT 
-            slot,
-            hellofresh_week,
-            recipe_size,
-            version,
-            bob_entity_code,
-            SUM(kitcount) as kitcount
-            FROM KITCOUNT_DC
-            GROUP BY
-            1,2,3,4,5
-        ),
-        KITCOUNT_PT (
-            SELECT
-            L.hellofresh_week,
-            L.bob_entity_code,
-            P.primary_tag,
-            L.recipe_size,
-            L.version,
-            SUM(L.kitcount) as kitcount
-            FROM KITCOUNT L
-            LEFT JOIN (SELECT DISTINCT country, hellofresh_week, recipe_slot, primary_tag, product_type FROM anz_product_anon.staging_primary_tags WHERE primary_tag <> 'not mapped') P
-                        ON P.country            = L.bob_entity_code
-                            AND P.hellofresh_week = L.hellofresh_week
-                            AND P.recipe_slot     = L.slot
-            GROUP BY 1,2,3,4,5
-        )
 
-        SELECT
-        R.primary_tag, 
-        concat(R.recipe_size,"P") as recipe_size, 
-        R.version, 
-        R.bob_entity_code, 
-        R.hellofresh_week, 
-        K.kitcount,
-        R.product_type,
-        SUM(cpk_primary_tag) as cpk
-        FROM anz_finance_app.anz_kraken_operations_historical_cpk R
-        LEFT JOIN KITCOUNT_PT K ON R.primary_tag = K.primary_tag AND R.recipe_size = K.recipe_size AND R.version = K.version AND R.bob_entity_code = K.bob_entity_code
-        AND R.hellofresh_week = K.hellofresh_week
-        WHERE R.hellofresh_week = '{week}'
-        AND R.bob_entity_code = '{entity}'
-        GROUP BY 1,2,3,4,5,6,7
+register_query(
+    "null_price_error_trends",
     """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+        SELECT 
+        hellofresh_week, 
+        bob_entity_code,
+        SUM(total_costs) as total_costs
+        FROM anz_finance_app.anz_null_price_errors
+        WHERE version = :version
+        GROUP BY 1,2
+    """,
+)
 
 
-def run_kraken_cpk_product_type(week, entity):
-    query = f"""
-        WITH KITCOUNT_DC (
-            SELECT 
-            slot,
-            hellofresh_week,
-            recipe_size,
-            dc,
-            version,
-            bob_entity_code,
-            AVG(forecast_kitcount) as kitcount
-            FROM anz_finance_app.anz_kraken_operations_historical_cpk 
-            WHERE hellofresh_week = '{week}'
-            AND bob_entity_code = '{entity}'
-            GROUP BY
-            1,2,3,4,5,6
-        ),
-        KITCOUNT (
-            SELECT 
-            slot,
-            hellofresh_week,
-            recipe_size,
-            version,
-            bob_entity_code,
-            SUM(kitcount) as kitcount
-            FROM KITCOUNT_DC
-            GROUP BY
-            1,2,3,4,5
-        ),
-        KITCOUNT_TYPE (
-            SELECT
-            L.hellofresh_week,
-            L.bob_entity_code,
-            P.product_type,
-            L.recipe_size,
-            L.version,
-            SUM(L.kitcount) as kitcount
-            FROM KITCOUNT L
-            LEFT JOIN (SELECT DISTINCT country, hellofresh_week, recipe_slot, primary_tag, product_type FROM anz_product_anon.staging_primary_tags WHERE primary_tag <> 'not mapped') P
-                        ON P.country            = L.bob_entity_code
-                            AND P.hellofresh_week = L.hellofresh_week
-                            AND P.recipe_slot     = L.slot
-            GROUP BY 1,2,3,4,5
-        )
+def run_kraken_null_price_error_trends(version):
+    return run_query("null_price_error_trends", version=version)
 
-        SELECT
-        R.product_type, 
-        concat(R.recipe_size,"P") as recipe_size, 
-        R.version, 
-        R.bob_entity_code, 
-        R.hellofresh_week, 
-        K.kitcount,
-        SUM(cpk_product_type) as cpk
-        FROM anz_finance_app.anz_kraken_operations_historical_cpk R
-        LEFT JOIN KITCOUNT_TYPE K ON R.product_type = K.product_type AND R.recipe_size = K.recipe_size AND R.version = K.version AND R.bob_entity_code = K.bob_entity_code
-        AND R.hellofresh_week = K.hellofresh_week
-        WHERE R.hellofresh_week = '{week}'
-        AND R.bob_entity_code = '{entity}'
-        GROUP BY 1,2,3,4,5,6
+
+register_query(
+    "kraken_cpk_all",
     """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+        SELECT
+        'cpk' as row_type,
+        slot,
+        recipe_title,
+        concat(recipe_size,"P") as recipe_size,
+        dc,
+        version,
+        bob_entity_code,
+        hellofresh_week,
+        primary_tag,
+        product_type,
+        SUM(forecast_kitcount) as kitcount_sum,
+        COUNT(forecast_kitcount) as kitcount_n,
+        SUM(cpk) as cpk,
+        SUM(cpk_primary_tag) as cpk_primary_tag,
+        SUM(cpk_product_type) as cpk_product_type
+        FROM anz_finance_app.anz_kraken_operations_historical_cpk
+        WHERE hellofresh_week = :week
+        AND bob_entity_code = :entity
+        GROUP BY 1,2,3,4,5,6,7,8,9,10
 
+        UNION ALL
 
-def run_kraken_slot_details(week, entity, slot):
-    query = f"""
-        SELECT 
+        SELECT DISTINCT
+        'tag_map' as row_type,
+        recipe_slot as slot,
+        CAST(NULL AS STRING) as recipe_title,
+        CAST(NULL AS STRING) as recipe_size,
+        CAST(NULL AS STRING) as dc,
+        CAST(NULL AS STRING) as version,
+        country as bob_entity_code,
+        hellofresh_week,
+        primary_tag,
+        product_type,
+        NULL as kitcount_sum,
+        NULL as kitcount_n,
+        NULL as cpk,
+        NULL as cpk_primary_tag,
+        NULL as cpk_product_type
+        FROM anz_product_anon.staging_primary_tags
+        WHERE country = :entity
+        AND hellofresh_week = :week
+        AND primary_tag <> 'not mapped'
+    """,
+)
+
+
+def run_kraken_cpk_all(week, entity):
+    # One statement for all three CPK views: a single pass over the week's CPK rows at
+    # (slot, title, size, dc, version, tag, type) grain, plus the staging tag map for the
+    # same week. process_kraken_cpk() derives the slot / primary tag / product type views.
+    return run_query("kraken_cpk_all", week=week, entity=entity)
+
+
+def kraken_tag_map(df_all):
+    """Slot -> primary tag / product type rows of run_kraken_cpk_all() (staging_primary_tags, 'not mapped' excluded)."""
+    return df_all.loc[df_all["row_type"] == "tag_map", ["slot", "primary_tag", "product_type"]].drop_duplicates()
+
+
+def _kraken_cpk_rollup(base, kitcount, tag_map, dim, cpk_col, extra_cols):
+    keys = [dim, "recipe_size", "version"]
+    # KITCOUNT_PT / KITCOUNT_TYPE: slot kitcounts summed through the staging tag map
+    kit = (
+        kitcount.merge(tag_map, on="slot", how="inner")
+        .groupby(keys, as_index=False)["kitcount"]
+        .sum(min_count=1)
+    )
+    rollup = (
+        base.groupby(keys + ["bob_entity_code", "hellofresh_week"] + extra_cols, as_index=False, dropna=False)[cpk_col]
+        .sum(min_count=1)
+        .rename(columns={cpk_col: "cpk"})
+    )
+    # NULL tags never join in SQL; pandas would happily match NaN to NaN
+    rollup = rollup.merge(kit.dropna(subset=[dim]), on=keys, how="left")
+    return rollup
+
+
+def process_kraken_cpk(df_all):
+    """Split run_kraken_cpk_all() into the by-slot, by-primary-tag and by-product-type CPK frames."""
+    base = df_all[df_all["row_type"] == "cpk"]
+    tag_map = kraken_tag_map(df_all)
+    slot_keys = ["slot", "recipe_size", "version"]
+
+    # KITCOUNT_DC -> KITCOUNT: average kitcount per DC, summed across DCs
+    kit_dc = base.groupby(slot_keys + ["dc"], as_index=False, dropna=False)[["kitcount_sum", "kitcount_n"]].sum()
+    kit_dc["kitcount"] = kit_dc["kitcount_sum"] / kit_dc["kitcount_n"].replace(0, np.nan)
+    kitcount = kit_dc.groupby(slot_keys, as_index=False, dropna=False)["kitcount"].sum(min_count=1)
+
+    by_slot = (
+        base.groupby(
+            ["slot", "recipe_title", "recipe_size", "version", "bob_entity_code", "hellofresh_week", "primary_tag", "product_type"],
+            as_index=False,
+            dropna=False,
+        )["cpk"]
+        .sum(min_count=1)
+        .merge(kitcount, on=slot_keys, how="left")
+    )
+    by_slot = by_slot[["slot", "recipe_title", "recipe_size", "version", "bob_entity_code", "hellofresh_week", "kitcount", "primary_tag", "product_type", "cpk"]]
+
+    by_primary_tag = _kraken_cpk_rollup(base, kitcount, tag_map[["slot", "primary_tag"]], "primary_tag", "cpk_primary_tag", ["product_type"])
+    by_primary_tag = by_primary_tag[["primary_tag", "recipe_size", "version", "bob_entity_code", "hellofresh_week", "kitcount", "product_type", "cpk"]]
+
+    by_product_type = _kraken_cpk_rollup(base, kitcount, tag_map[["slot", "product_type"]], "product_type", "cpk_product_type", [])
+    by_product_type = by_product_type[["product_type", "recipe_size", "version", "bob_entity_code", "hellofresh_week", "kitcount", "cpk"]]
+
+    return by_slot, by_primary_tag, by_product_type
+
+
+# --- Kraken weekly cube ---
+# Dimensions the drill-downs slice and roll up by; measures are additive, so any
+# coarser grain is a plain sum over the cube.
+KRAKEN_CUBE_DIMENSIONS = ["version", "slot", "recipe_size", "dc", "sku_code", "sku_name", "supplier_code", "supplier_name"]
+KRAKEN_CUBE_MEASURES = ["forecast_sku_quantity", "forecast_total_cost", "sku_unit_cost", "forecast_kitcount", "line_count"]
+
+register_query(
+    "kraken_cube",
+    """
+        SELECT
         version,
+        CAST(slot AS STRING) as slot,
+        concat(recipe_size,"P") as recipe_size,
+        dc,
         sku_code,
         sku_name,
-        concat(recipe_size,"P") as recipe_size, 
+        supplier_code,
+        supplier_name,
         SUM(forecast_sku_quantity) as forecast_sku_quantity,
         SUM(forecast_total_cost) as forecast_total_cost,
-        SUM(forecast_total_cost/forecast_sku_quantity) as sku_unit_cost
+        SUM(forecast_total_cost/forecast_sku_quantity) as sku_unit_cost,
+        SUM(forecast_kitcount) as forecast_kitcount,
+        COUNT(*) as line_count
         FROM anz_finance_app.anz_kraken_operations_historical
-        WHERE hellofresh_week = '{week}'
-        AND bob_entity_code = '{entity}'
-        AND slot = '{slot}'
-        GROUP BY 1,2,3,4
-    """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
+        WHERE hellofresh_week = :week
+        AND bob_entity_code = :entity
+        GROUP BY 1,2,3,4,5,6,7,8
+    """,
+    dtypes={column: "category" for column in KRAKEN_CUBE_DIMENSIONS} | {"line_count": "int32"},
+)
+
+
+def run_kraken_cube(week, entity):
+    # One pass over the week's Kraken rows, every version, at the finest grain any
+    # drill-down needs. sku_unit_cost holds SUM(cost / qty) so slices can re-sum it.
+    df = run_query("kraken_cube", week=week, entity=entity)
+    df["sku_group"] = df["sku_code"].str[:3].astype("category")
     return df
 
 
+def kraken_cube_rollup(cube, by, measures=None, **filters):
+    """Sum the cube's measures by ``by`` after keeping rows where each ``column=value`` filter matches.
 
-def run_kraken_slot_details_primary_tag(week, entity, tag):
-    query = f"""
-        SELECT 
-        R.version,
-        R.sku_code,
-        R.sku_name,
-        concat(recipe_size,"P") as recipe_size, 
-        SUM(R.forecast_sku_quantity) as forecast_sku_quantity,
-        SUM(R.forecast_total_cost) as forecast_total_cost,
-        SUM(R.forecast_total_cost/R.forecast_sku_quantity) as sku_unit_cost
-        FROM anz_finance_app.anz_kraken_operations_historical R
-        LEFT JOIN (SELECT DISTINCT country, hellofresh_week, recipe_slot, primary_tag, product_type FROM anz_product_anon.staging_primary_tags WHERE primary_tag <> 'not mapped') P
-            ON P.country            = R.bob_entity_code
-                AND P.hellofresh_week = R.hellofresh_week
-                AND P.recipe_slot     = R.slot
-        WHERE R.hellofresh_week = '{week}'
-        AND R.bob_entity_code = '{entity}'
-        AND P.primary_tag = '{tag}'
-        GROUP BY 1,2,3,4
+    A filter value may be a scalar or a list of values.
     """
-    conn = get_connection()
-    df = pd.read_sql(query, conn)
-    conn.close()
-    # Display the dataframe
-    return df
+    mask = np.ones(len(cube), dtype=bool)
+    for column, value in filters.items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        mask &= cube[column].isin(values).to_numpy()
+    measures = measures or KRAKEN_CUBE_MEASURES
+    return (
+        cube[mask]
+        .groupby(by, observed=True, dropna=False, as_index=False)[measures]
+        .sum(min_count=1)
+    )
+
+
+_DETAIL_COLUMNS = ["version", "sku_code", "sku_name", "recipe_size", "forecast_sku_quantity", "forecast_total_cost", "sku_unit_cost"]
+
+
+def kraken_slot_details(cube, slot):
+    """SKU lines of one slot by version and recipe size, sliced from run_kraken_cube()."""
+    return kraken_cube_rollup(
+        cube, ["version", "sku_code", "sku_name", "recipe_size"], _DETAIL_COLUMNS[4:], slot=str(slot)
+    )[_DETAIL_COLUMNS]
+
+
+def kraken_primary_tag_details(cube, tag_map, tag):
+    """SKU lines of every slot mapped to ``tag``, sliced from run_kraken_cube().
+
+    Like the staging join it replaces, a slot mapped to the tag under several
+    product types counts once per mapping.
+    """
+    slots = tag_map.loc[tag_map["primary_tag"] == tag, "slot"].astype(str)
+    weights = slots.value_counts()
+    lines = cube[cube["slot"].isin(weights.index).to_numpy()]
+    # Repeat each line once per mapping before summing, as the join did
+    lines = lines.loc[lines.index.repeat(weights.reindex(lines["slot"].astype(str)).to_numpy())]
+    return (
+        lines.groupby(["version", "sku_code", "sku_name", "recipe_size"], observed=True, dropna=False, as_index=False)[_DETAIL_COLUMNS[4:]]
+        .sum(min_count=1)
+    )[_DETAIL_COLUMNS]
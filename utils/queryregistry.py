@@ -0,0 +1,130 @@
+import hashlib
+import logging
+import re
+import textwrap
+import time
+
+from utils import telemetry
+from utils.db import STREAM_BATCH_ROWS, fetch_df, stream_arrow
+
+logger = logging.getLogger(__name__)
+
+# ":week" style named parameters; skips "::" casts
+_PARAM_RE = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+# Column names spliced into paging SQL (sort / filter) must be plain identifiers of the query's own result.
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_]\w*$")
+
+
+class RegisteredQuery:
+    """A named SQL statement with bind parameters. The text never changes between
+    executions, so the warehouse result cache (and ours) can key on it."""
+
+    def __init__(self, name, sql, dtypes=None):
+        self.name = name
+        self.sql = textwrap.dedent(sql).strip()
+        self.dtypes = dtypes
+        self.params = tuple(dict.fromkeys(_PARAM_RE.findall(self.sql)))
+        self.statement_id = hashlib.sha1(self.sql.encode("utf-8")).hexdigest()[:12]
+
+    def bind(self, **params):
+        missing = [p for p in self.params if p not in params]
+        unknown = [p for p in params if p not in self.params]
+        if missing or unknown:
+            raise ValueError(f"Query '{self.name}': missing params {missing}, unknown params {unknown}")
+        return {p: params[p] for p in self.params}
+
+
+QUERIES = {}
+
+
+def register_query(name, sql, dtypes=None):
+    query = RegisteredQuery(name, sql, dtypes)
+    QUERIES[name] = query
+    return query
+
+
+def get_query(name):
+    try:
+        return QUERIES[name]
+    except KeyError:
+        raise KeyError(f"Unknown query '{name}'") from None
+
+
+def _execute(name, sql, params, dtypes):
+    started = time.perf_counter()
+    statement_id = hashlib.sha1(sql.encode("utf-8")).hexdigest()[:12]
+    # fetch_df records the execution (timings, rows, bytes) under this name in utils.telemetry.
+    with telemetry.query_context(query=name, statement_id=statement_id, params=params):
+        df = fetch_df(sql, params or None, dtypes)
+    elapsed = time.perf_counter() - started
+    logger.info("query %s (%s) %s rows in %.3fs", name, statement_id, len(df), elapsed)
+    return df
+
+
+def run_query(name, **params):
+    query = get_query(name)
+    return _execute(name, query.sql, query.bind(**params), query.dtypes)
+
+
+def stream_query(name, batch_rows=STREAM_BATCH_ROWS, **params):
+    """Yield a registered query's result as DataFrames of at most ``batch_rows`` rows (see utils.db.stream_arrow)."""
+    query = get_query(name)
+    bound = query.bind(**params)
+    # Passed through rather than set with query_context, which would leak into the caller between batches.
+    context = {"query": name, "statement_id": query.statement_id, "params": bound}
+    return stream_arrow(query.sql, bound or None, query.dtypes, batch_rows, context)
+
+
+# --- Paging (server-side sort / filter / LIMIT-OFFSET over a registered query) ---
+_columns = {}
+
+
+def query_columns(name, **params):
+    """Result column names of a registered query, from a LIMIT 0 run (once per process)."""
+    if name not in _columns:
+        query = get_query(name)
+        sql = f"SELECT * FROM (\n{query.sql}\n) AS base LIMIT 0"
+        _columns[name] = list(_execute(f"{name}:columns", sql, query.bind(**params), None).columns)
+    return _columns[name]
+
+
+def _paged_where(name, columns, filters):
+    """WHERE clause and bind params for {column: text} case-insensitive "contains" filters."""
+    clauses, bound = [], {}
+    for i, (column, text) in enumerate(sorted((filters or {}).items())):
+        if column not in columns or not _IDENTIFIER_RE.match(column):
+            raise ValueError(f"Query '{name}': cannot filter on unknown column {column!r}")
+        clauses.append(f"lower(CAST({column} AS STRING)) LIKE :_filter_{i}")
+        bound[f"_filter_{i}"] = f"%{str(text).lower()}%"
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), bound
+
+
+def run_query_count(name, filters=None, **params):
+    """Row count of a registered query under ``filters`` (see run_query_page)."""
+    query = get_query(name)
+    columns = query_columns(name, **params)
+    where, filter_params = _paged_where(name, columns, filters)
+    sql = f"SELECT COUNT(*) AS row_count FROM (\n{query.sql}\n) AS base{where}"
+    df = _execute(f"{name}:count", sql, query.bind(**params) | filter_params, None)
+    return int(df["row_count"].iloc[0])
+
+
+def run_query_page(name, sort=None, descending=False, filters=None, offset=0, limit=500, **params):
+    """One page of a registered query, sorted and filtered in the warehouse.
+
+    ``filters`` maps column -> text and keeps rows whose value contains it
+    (case-insensitive; ``%`` and ``_`` act as LIKE wildcards). Rows are ordered by
+    ``sort`` and then by every column, so OFFSET paging is stable between pages.
+    """
+    query = get_query(name)
+    columns = query_columns(name, **params)
+    if sort is not None and (sort not in columns or not _IDENTIFIER_RE.match(sort)):
+        raise ValueError(f"Query '{name}': cannot sort on unknown column {sort!r}")
+    where, filter_params = _paged_where(name, columns, filters)
+    order = [f"{sort} {'DESC' if descending else 'ASC'}"] if sort else []
+    order += [column for column in columns if column != sort and _IDENTIFIER_RE.match(column)]
+    sql = (
+        f"SELECT * FROM (\n{query.sql}\n) AS base{where}"
+        f" ORDER BY {', '.join(order)} LIMIT {int(limit)} OFFSET {int(offset)}"
+    )
+    return _execute(f"{name}:page", sql, query.bind(**params) | filter_params, query.dtypes)
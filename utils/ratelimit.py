@@ -0,0 +1,193 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import streamlit as st
+
+# --- Defaults (override via environment on the app container) ---
+RATE_LIMIT_DB_PATH = os.environ.get("PORTAL_RATE_LIMIT_DB_PATH", os.path.join(".cache", "ratelimit.sqlite3"))
+# Token buckets: attempts allowed back to back, and seconds to earn one more back
+LOGIN_EMAIL_BURST = int(os.environ.get("PORTAL_LOGIN_EMAIL_BURST", 5))
+LOGIN_CLIENT_BURST = int(os.environ.get("PORTAL_LOGIN_CLIENT_BURST", 20))
+LOGIN_REFILL_SECONDS = float(os.environ.get("PORTAL_LOGIN_REFILL_SECONDS", 30))
+# Lockout: after this many failures in a row an email is locked, for twice as long after each further failure
+LOCKOUT_AFTER_FAILURES = int(os.environ.get("PORTAL_LOCKOUT_AFTER_FAILURES", 5))
+LOCKOUT_SECONDS = float(os.environ.get("PORTAL_LOCKOUT_SECONDS", 60))
+LOCKOUT_MAX_SECONDS = float(os.environ.get("PORTAL_LOCKOUT_MAX_SECONDS", 60 * 60))
+# Reverse proxies in front of the app that append to X-Forwarded-For; hops further left are client-supplied
+TRUSTED_PROXY_HOPS = int(os.environ.get("PORTAL_TRUSTED_PROXY_HOPS", 1))
+# Failures older than this are forgotten, and idle rows pruned
+FAILURE_MEMORY_SECONDS = 24 * 60 * 60
+PRUNE_EVERY = 1000
+
+
+class LoginLimiter:
+    """Token buckets plus progressive lockout for login attempts, kept in SQLite.
+
+    Every attempt takes a token from each of its keys' buckets (e.g. the email
+    and the client); when any bucket is empty, or a key is locked out, the
+    attempt is refused with the seconds until it could succeed, and nothing is
+    taken. Consecutive failures on a key lock it for ``lockout_seconds``, doubling
+    per further failure up to ``lockout_max_seconds``; a success clears them.
+    The state lives in one SQLite file, so every worker process on the host
+    shares it and a restart doesn't reset a lockout.
+    """
+
+    def __init__(
+        self,
+        path=RATE_LIMIT_DB_PATH,
+        refill_seconds=LOGIN_REFILL_SECONDS,
+        lockout_after=LOCKOUT_AFTER_FAILURES,
+        lockout_seconds=LOCKOUT_SECONDS,
+        lockout_max_seconds=LOCKOUT_MAX_SECONDS,
+    ):
+        self.path = path
+        self.refill_seconds = refill_seconds
+        self.lockout_after = lockout_after
+        self.lockout_seconds = lockout_seconds
+        self.lockout_max_seconds = lockout_max_seconds
+        self._lock = threading.Lock()
+        self._calls = 0
+        self.stats = {"allowed": 0, "throttled": 0, "locked": 0, "failures": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS failures (
+                    key TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    locked_until REAL NOT NULL,
+                    last_failure_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        # Autocommit mode, so each method's BEGIN IMMEDIATE ... COMMIT is one atomic step across processes.
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def _transaction(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    # --- attempts ---
+    def acquire(self, keys):
+        """Take a token for an attempt on every ``{key: burst}``; returns 0.0, or the seconds to wait if refused."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            self._transaction(conn)
+            try:
+                wait, locked, updates = 0.0, False, []
+                for key, burst in keys.items():
+                    row = conn.execute("SELECT locked_until FROM failures WHERE key = ?", (key,)).fetchone()
+                    if row and row[0] > now:
+                        wait, locked = max(wait, row[0] - now), True
+                    row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+                    tokens = burst if row is None else min(burst, row[0] + (now - row[1]) / self.refill_seconds)
+                    if tokens < 1:
+                        wait = max(wait, (1 - tokens) * self.refill_seconds)
+                    updates.append((key, tokens - 1))
+                if not wait:
+                    conn.executemany("INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)", [(k, t, now) for k, t in updates])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._count("locked" if locked else "throttled" if wait else "allowed")
+        return wait
+
+    def record_failure(self, keys):
+        """Count a failed attempt against ``keys``; returns the lockout it triggered (seconds), or 0.0."""
+        now = time.time()
+        lockout = 0.0
+        with closing(self._connect()) as conn:
+            self._transaction(conn)
+            try:
+                for key in keys:
+                    row = conn.execute("SELECT count, last_failure_at FROM failures WHERE key = ?", (key,)).fetchone()
+                    count = 1 if row is None or now - row[1] > FAILURE_MEMORY_SECONDS else row[0] + 1
+                    locked_for = 0.0
+                    if count >= self.lockout_after:
+                        # Exponent capped so the float can't overflow on a long-running attack.
+                        doublings = min(count - self.lockout_after, 32)
+                        locked_for = min(self.lockout_seconds * 2 ** doublings, self.lockout_max_seconds)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO failures (key, count, locked_until, last_failure_at) VALUES (?, ?, ?, ?)",
+                        (key, count, now + locked_for, now),
+                    )
+                    lockout = max(lockout, locked_for)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._count("failures")
+        return lockout
+
+    def record_success(self, keys):
+        with closing(self._connect()) as conn:
+            conn.execute(f"DELETE FROM failures WHERE key IN ({','.join('?' * len(keys))})", list(keys))
+
+    # --- housekeeping ---
+    def _count(self, outcome):
+        with self._lock:
+            self.stats[outcome] += 1
+            self._calls += 1
+            prune = self._calls % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self, now=None):
+        """Drop buckets that have long since refilled and failures that are forgotten."""
+        now = time.time() if now is None else now
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM buckets WHERE updated_at < ?", (now - FAILURE_MEMORY_SECONDS,))
+            conn.execute("DELETE FROM failures WHERE last_failure_at < ? AND locked_until < ?", (now - FAILURE_MEMORY_SECONDS, now))
+
+    def summary(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+@st.cache_resource(show_spinner=False)
+def get_login_limiter():
+    # One limiter per process; processes on the same host share its SQLite file.
+    return LoginLimiter()
+
+
+def client_id(trusted_hops=TRUSTED_PROXY_HOPS):
+    """Best identifier of the browser's client, else None.
+
+    That is the X-Forwarded-For hop appended by the outermost of our
+    ``trusted_hops`` proxies, never one the browser could have sent itself, or
+    the peer address when there are no trusted proxies or the header is short.
+    """
+    try:
+        hops = [hop.strip() for hop in (st.context.headers.get("X-Forwarded-For") or "").split(",") if hop.strip()]
+        if trusted_hops > 0 and len(hops) >= trusted_hops:
+            return hops[-trusted_hops]
+        return st.context.ip_address
+    except Exception:
+        # Outside a browser session (e.g. AppTest) there are no request details.
+        return None
+
+
+def email_key(email):
+    return f"email:{email.strip().lower()}"
+
+
+def login_keys(email, client=None):
+    """Bucket keys and sizes for a login attempt; an unknown client is only limited per email."""
+    keys = {email_key(email): LOGIN_EMAIL_BURST}
+    if client:
+        keys[f"client:{client}"] = LOGIN_CLIENT_BURST
+    return keys
+
+
+def format_wait(seconds):
+    seconds = math.ceil(seconds)
+    if seconds < 60:
+        return f"{seconds} s"
+    return f"{math.ceil(seconds / 60)} min"
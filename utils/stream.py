@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# --- Reducers for utils.queryregistry.stream_query batches ---
+def running_sum(chunks, by, measures):
+    """Fold DataFrame chunks into per-``by`` sums of ``measures``.
+
+    Each chunk is summed on its own and merged into the running totals, so memory
+    holds one chunk plus one row per group however long the stream is. Partial sums
+    of the same group merge exactly, so the result matches a single groupby().sum().
+    """
+    total = None
+    for chunk in chunks:
+        part = chunk.groupby(by, observed=True, dropna=False)[measures].sum()
+        total = part if total is None else pd.concat([total, part]).groupby(level=by, dropna=False).sum()
+    if total is None:
+        return pd.DataFrame(columns=by + measures)
+    return total.reset_index()
+
+
+def write_parquet(chunks, path):
+    """Write DataFrame chunks to one Parquet file as they arrive and return the row count.
+
+    The file is written under a temporary name and moved into place at the end, so
+    readers never see a half-written dataset. An empty stream writes nothing.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            # Later chunks may infer e.g. null-only columns differently; the first chunk's schema wins.
+            writer.write_table(table.cast(writer.schema))
+            rows += len(chunk)
+        if writer is None:
+            return 0
+        writer.close()
+        writer = None
+        os.replace(tmp_path, path)
+        return rows
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,516 @@
+"""Synthetic Parquet snapshots for the local DuckDB backend.
+
+Writes every source table the query modules read, with the cardinalities that
+drive the portal's hot paths (slots x recipe sizes x DCs x versions x SKUs for
+Kraken, one row per order line for anz_orders_recipes). ``scale`` multiplies a
+real week's volume; weekly fact tables are written one file per week.
+
+    python -m utils.syntheticdata --scale 10 --weeks 2025-W20:2025-W28 --out snapshots
+"""
+import argparse
+import datetime
+import os
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from utils.localbackend import SNAPSHOT_DIR, write_snapshot
+
+# --- Shape of a real week (scale=1) ---
+ENTITIES = ["AU", "AO", "NZ"]
+ENTITY_DCS = {"AU": ["Sydney", "Perth"], "AO": ["Sydney", "Perth"], "NZ": ["Auckland"]}
+SLOTS_PER_ENTITY = {"AU": 120, "AO": 60, "NZ": 80}
+BOXES_PER_ENTITY = {"AU": 60_000, "AO": 15_000, "NZ": 25_000}
+KRAKEN_VERSIONS = ["v2", "v3"]
+RECIPE_SIZES = [1, 2, 4]
+BOX_SIZES = [0, 1, 2, 3, 4, 5, 6]
+NUMBER_OF_RECIPES = [2, 3, 4, 5]
+SKUS_PER_RECIPE = (8, 15)
+SKU_CATALOG_SIZE = 2500
+SKU_CATEGORIES = ["PTN", "PHF", "PRO", "DAI", "BAK", "DRY", "SPI", "CON"]
+PRIMARY_TAGS = ["Beef", "Chicken", "Pork", "Fish", "Veggie", "Lamb", "Premium", "Quick", "Family", "Calorie Smart"]
+PRODUCT_TYPES = ["Core", "Premium", "Modularity", "Surcharge", "Addon"]
+RECIPE_FAMILIES = ["classic-box", "veggie-box", "family-box", "addons"]
+SOURCES = ["EDW", "FACT", "ANZ"]
+BUDGET_VERSION = "H2 2025"
+BUDGET_WEEKS = ("2025-W27", "2025-W52")
+FIRST_WEEK, LAST_WEEK = "2025-W01", "2026-W52"
+
+# --- Weeks ---
+def week_range(first=FIRST_WEEK, last=LAST_WEEK):
+    """HelloFresh weeks from ``first`` to ``last`` inclusive, e.g. 2025-W01..2026-W52."""
+    year, week = int(first[:4]), int(first[-2:])
+    end = (int(last[:4]), int(last[-2:]))
+    weeks = []
+    while (year, week) <= end:
+        weeks.append(f"{year}-W{week:02d}")
+        week += 1
+        if week > 52:
+            year, week = year + 1, 1
+    return weeks
+
+
+def _week_monday(week):
+    return datetime.date.fromisocalendar(int(week[:4]), int(week[-2:]), 1)
+
+
+# --- Catalog: stable across weeks for a given seed ---
+class Catalog:
+    def __init__(self, scale, seed):
+        rng = np.random.default_rng(seed)
+        self.scale = scale
+        self.seed = seed
+
+        n_sku = max(int(SKU_CATALOG_SIZE * max(scale, 1) ** 0.5), 50)
+        categories = rng.choice(SKU_CATEGORIES, n_sku)
+        self.skus = pd.DataFrame({
+            "sku_code": [f"{c}-{i:05d}" for i, c in enumerate(categories)],
+            "sku_name": [f"{c} ingredient {i}" for i, c in enumerate(categories)],
+            "sku_category": categories,
+            "base_cost": np.round(rng.lognormal(0.0, 0.8, n_sku), 4),
+            "supplier_code": [f"SUP-{i:03d}" for i in rng.integers(0, 120, n_sku)],
+        })
+        self.skus["supplier_name"] = "Supplier " + self.skus["supplier_code"].str[-3:]
+
+        self.slots = {}
+        for entity in ENTITIES:
+            n_slots = max(int(SLOTS_PER_ENTITY[entity] * scale), 1)
+            self.slots[entity] = pd.DataFrame({
+                "slot": np.arange(1, n_slots + 1),
+                "primary_tag": rng.choice(PRIMARY_TAGS, n_slots),
+                "product_type": rng.choice(PRODUCT_TYPES, n_slots, p=[0.6, 0.15, 0.1, 0.1, 0.05]),
+                "recipe_family": rng.choice(RECIPE_FAMILIES, n_slots, p=[0.55, 0.2, 0.15, 0.1]),
+                "demand": rng.lognormal(0.0, 0.6, n_slots),
+            })
+
+    def rng(self, *parts):
+        # Independent, reproducible stream per (week, table, ...) so partial regeneration matches a full run.
+        return np.random.default_rng([self.seed] + [zlib.crc32(str(p).encode()) for p in parts])
+
+
+# --- Kraken ---
+def _kraken_week(catalog, week):
+    rng = catalog.rng(week, "kraken")
+    frames = []
+    for entity in ENTITIES:
+        slots = catalog.slots[entity]
+        grid = pd.MultiIndex.from_product(
+            [slots.index, RECIPE_SIZES, ENTITY_DCS[entity]], names=["slot_idx", "recipe_size", "dc"]
+        ).to_frame(index=False)
+        grid["slot"] = slots["slot"].to_numpy()[grid["slot_idx"]].astype(str)
+        grid["recipe_title"] = [f"{entity} recipe {s} ({week})" for s in grid["slot"]]
+        grid["octopus_recipe_id"] = rng.integers(10_000, 99_999, len(grid))
+        base_kits = 400 * slots["demand"].to_numpy()[grid["slot_idx"]] * (grid["recipe_size"] / 2)
+        base_kits = base_kits * rng.lognormal(0.0, 0.25, len(grid))
+
+        counts = rng.integers(*SKUS_PER_RECIPE, len(grid))
+        lines = grid.loc[grid.index.repeat(counts)].reset_index(drop=True)
+        lines["sku_idx"] = rng.integers(0, len(catalog.skus), len(lines))
+        lines["sku_picks_per_recipe"] = rng.integers(1, 3, len(lines)) * lines["recipe_size"]
+
+        # ~20% of SKU lines are split across two suppliers
+        split = rng.random(len(lines)) < 0.2
+        second = lines[split].copy()
+        lines["supplier_split"] = np.where(split, 0.6, 1.0)
+        second["supplier_split"] = 0.4
+        second["supplier_offset"] = 1
+        lines = pd.concat([lines, second], ignore_index=True)
+        lines["supplier_offset"] = lines["supplier_offset"].fillna(0).astype(int)
+
+        skus = catalog.skus.iloc[lines["sku_idx"]].reset_index(drop=True)
+        positions = _grid_positions(grid, lines)
+        for version in KRAKEN_VERSIONS:
+            noise = rng.lognormal(0.0, 0.05, len(grid)) if version != KRAKEN_VERSIONS[0] else np.ones(len(grid))
+            kits = np.round(base_kits.to_numpy() * noise)
+            recipe_kits = kits[positions]
+            unit_cost = np.round(skus["base_cost"].to_numpy() * rng.lognormal(0.0, 0.03, len(lines)), 4)
+            qty = np.round(recipe_kits * lines["sku_picks_per_recipe"].to_numpy() * lines["supplier_split"].to_numpy())
+            supplier_code = np.where(
+                lines["supplier_offset"].to_numpy() == 1,
+                "SUP-" + ((skus["supplier_code"].str[-3:].astype(int) + 1) % 120).astype(str).str.zfill(3),
+                skus["supplier_code"].to_numpy(),
+            )
+            frames.append(pd.DataFrame({
+                "slot": lines["slot"].to_numpy(),
+                "recipe_title": lines["recipe_title"].to_numpy(),
+                "recipe_size": lines["recipe_size"].to_numpy(),
+                "octopus_recipe_id": lines["octopus_recipe_id"].to_numpy(),
+                "sku_code": skus["sku_code"].to_numpy(),
+                "sku_name": skus["sku_name"].to_numpy(),
+                "sku_category": skus["sku_category"].to_numpy(),
+                "sku_picks_per_recipe": lines["sku_picks_per_recipe"].to_numpy(),
+                "sku_unit_cost": unit_cost,
+                "supplier_name": "Supplier " + pd.Series(supplier_code).str[-3:],
+                "supplier_code": supplier_code,
+                "supplier_split": lines["supplier_split"].to_numpy(),
+                "recipe_forecast_quantity": recipe_kits,
+                "forecast_sku_quantity": qty,
+                "forecast_total_cost": np.round(qty * unit_cost, 2),
+                "forecast_kitcount": recipe_kits,
+                "dc": lines["dc"].to_numpy(),
+                "version": version,
+                "bob_entity_code": entity,
+                "hellofresh_week": week,
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _grid_positions(grid, lines):
+    # Row of ``grid`` each SKU line belongs to
+    keys = pd.MultiIndex.from_frame(grid[["slot_idx", "recipe_size", "dc"]])
+    return keys.get_indexer(pd.MultiIndex.from_frame(lines[["slot_idx", "recipe_size", "dc"]]))
+
+
+def _staging_primary_tags(catalog, week):
+    rng = catalog.rng(week, "primary_tags")
+    frames = []
+    for entity in ENTITIES:
+        slots = catalog.slots[entity]
+        tags = slots["primary_tag"].to_numpy().copy()
+        tags[rng.random(len(slots)) < 0.03] = "not mapped"
+        frames.append(pd.DataFrame({
+            "country": entity,
+            "hellofresh_week": week,
+            "recipe_slot": slots["slot"].astype(str).to_numpy(),
+            "primary_tag": tags,
+            "product_type": slots["product_type"].to_numpy(),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _kraken_cpk(kraken, tags):
+    keys = ["slot", "recipe_title", "recipe_size", "dc", "version", "bob_entity_code", "hellofresh_week"]
+    cpk = kraken.groupby(keys, as_index=False).agg(
+        forecast_kitcount=("forecast_kitcount", "first"),
+        forecast_total_cost=("forecast_total_cost", "sum"),
+    )
+    cpk["cpk"] = np.round(cpk["forecast_total_cost"] / cpk["forecast_kitcount"].replace(0, np.nan), 4)
+    mapping = tags.rename(columns={"country": "bob_entity_code", "recipe_slot": "slot"})
+    cpk = cpk.merge(mapping, on=["bob_entity_code", "hellofresh_week", "slot"], how="left")
+    cpk["cpk_primary_tag"] = cpk["cpk"]
+    cpk["cpk_product_type"] = cpk["cpk"]
+    return cpk.drop(columns=["forecast_total_cost"])
+
+
+def _supplier_split_errors(catalog, week):
+    rng = catalog.rng(week, "split_errors")
+    grid = pd.MultiIndex.from_product([KRAKEN_VERSIONS, ENTITIES], names=["version", "bob_entity_code"]).to_frame(index=False)
+    grid["hellofresh_week"] = week
+    grid["count_error"] = rng.poisson(12 * catalog.scale, len(grid))
+    return grid
+
+
+def _null_price_errors(catalog, kraken, week):
+    rng = catalog.rng(week, "null_price")
+    rows = kraken[rng.random(len(kraken)) < 0.005]
+    errors = rows.groupby(
+        ["version", "hellofresh_week", "bob_entity_code", "sku_code", "sku_name", "supplier_code", "supplier_name", "dc"],
+        as_index=False,
+    ).agg(line_count=("slot", "size"), forecast_sku_quantity=("forecast_sku_quantity", "sum"), period_avg_price=("sku_unit_cost", "mean"))
+    n = len(errors)
+    errors["dc_price"] = np.where(rng.random(n) < 0.7, np.nan, errors["period_avg_price"])
+    errors["nation_price"] = np.where(rng.random(n) < 0.5, np.nan, errors["period_avg_price"] * 1.02)
+    errors["applied_price"] = errors["dc_price"].fillna(errors["nation_price"]).fillna(errors["period_avg_price"])
+    errors["total_costs"] = np.round(errors["forecast_sku_quantity"] * errors["applied_price"], 2)
+    return errors[[
+        "version", "hellofresh_week", "bob_entity_code", "sku_code", "sku_name", "supplier_code", "supplier_name", "dc",
+        "dc_price", "nation_price", "period_avg_price", "applied_price", "line_count", "forecast_sku_quantity", "total_costs",
+    ]]
+
+
+def _sales_cogs_by_slots(catalog, cpk, week):
+    rng = catalog.rng(week, "sales_cogs")
+    df = cpk.rename(columns={"bob_entity_code": "country", "slot": "recipe_slot", "recipe_title": "title"}).copy()
+    families = pd.concat(
+        [catalog.slots[e].assign(country=e, recipe_slot=catalog.slots[e]["slot"].astype(str)) for e in ENTITIES]
+    )[["country", "recipe_slot", "recipe_family"]]
+    df = df.merge(families, on=["country", "recipe_slot"], how="left")
+    n = len(df)
+    df["box_type"] = np.where(df["recipe_family"] == "addons", "addon", "meal")
+    df["sales_count_kit"] = df["forecast_kitcount"] * rng.uniform(0.95, 1.05, n)
+    df["cost_per_kit"] = df["cpk"].fillna(0)
+    df["cogs_per_kit"] = df["cost_per_kit"] * rng.uniform(1.0, 1.1, n)
+    df["cost"] = df["sales_count_kit"] * df["cost_per_kit"]
+    df["cogs"] = df["sales_count_kit"] * df["cogs_per_kit"]
+    df["box_count"] = np.round(df["sales_count_kit"] / rng.integers(3, 5, n))
+    df["core_sales"] = df["sales_count_kit"] * rng.uniform(9, 14, n)
+    df["non_core_sales"] = np.where(df["product_type"].isin(["Modularity", "Surcharge", "Addon"]), df["sales_count_kit"] * rng.uniform(1, 4, n), 0.0)
+    df["residual_cost"] = df["cost"] * rng.uniform(0.0, 0.05, n)
+    df["residual_cogs"] = df["cogs"] * rng.uniform(0.0, 0.05, n)
+    kits = df["sales_count_kit"].replace(0, np.nan)
+    boxes = df["box_count"].replace(0, np.nan)
+    df["adj_cost_per_kit"] = (df["cost"] + df["residual_cost"]) / kits
+    df["adj_cogs_per_kit"] = (df["cogs"] + df["residual_cogs"]) / kits
+    df["adj_cost_per_box"] = (df["cost"] + df["residual_cost"]) / boxes
+    df["adj_cogs_per_box"] = (df["cogs"] + df["residual_cogs"]) / boxes
+    return df[[
+        "hellofresh_week", "version", "country", "recipe_slot", "title", "box_type", "product_type", "recipe_family",
+        "primary_tag", "recipe_size", "dc", "sales_count_kit", "cost_per_kit", "cogs_per_kit", "cost", "cogs", "box_count",
+        "core_sales", "non_core_sales", "residual_cost", "residual_cogs", "adj_cost_per_kit", "adj_cogs_per_kit",
+        "adj_cost_per_box", "adj_cogs_per_box",
+    ]]
+
+
+def kraken_tables(catalog, week):
+    kraken = _kraken_week(catalog, week)
+    tags = _staging_primary_tags(catalog, week)
+    cpk = _kraken_cpk(kraken, tags)
+    return {
+        "anz_finance_app.anz_kraken_operations_historical": kraken,
+        "anz_operations.anz_kraken_operations_historical": kraken,
+        "anz_finance_app.anz_kraken_operations_historical_cpk": cpk,
+        "anz_finance_app.anz_kraken_operations_historical_supplier_split_errors": _supplier_split_errors(catalog, week),
+        "anz_finance_app.anz_null_price_errors": _null_price_errors(catalog, kraken, week),
+        "anz_product_anon.staging_primary_tags": tags,
+        "anz_finance_app.sales_cogs_by_slots": _sales_cogs_by_slots(catalog, cpk, week),
+    }
+
+
+# --- Orders ---
+def _orders_recipes(catalog, week):
+    """One row per order line: recipe kits plus add-ons, millions of rows per week at scale >= 10."""
+    rng = catalog.rng(week, "orders")
+    frames = []
+    for entity in ENTITIES:
+        slots = catalog.slots[entity]
+        n_boxes = max(int(BOXES_PER_ENTITY[entity] * catalog.scale), 1)
+        box_size = rng.choice([2, 4, 6] if entity != "NZ" else [2, 3, 4], n_boxes, p=[0.55, 0.35, 0.10])
+        n_recipes = rng.choice(NUMBER_OF_RECIPES, n_boxes, p=[0.2, 0.45, 0.25, 0.1])
+        n_addons = rng.poisson(0.6, n_boxes)
+        lines_per_box = n_recipes + n_addons
+
+        box = np.repeat(np.arange(n_boxes), lines_per_box)
+        position = np.arange(len(box)) - np.repeat(np.cumsum(lines_per_box) - lines_per_box, lines_per_box)
+        is_addon = position >= n_recipes[box]
+        weights = slots["demand"].to_numpy() / slots["demand"].sum()
+        slot_idx = rng.choice(len(slots), len(box), p=weights)
+        product_type = np.where(is_addon, "Addon", slots["product_type"].to_numpy()[slot_idx])
+        product_type = np.where(~is_addon & (product_type == "Addon"), "Core", product_type)
+
+        kit_revenue = np.where(is_addon, rng.uniform(4, 12, len(box)), rng.uniform(8, 13, len(box)) * box_size[box] / 2)
+        non_core = np.where(np.isin(product_type, ["Modularity", "Surcharge", "Addon"]), kit_revenue * rng.uniform(0.2, 1.0, len(box)), 0.0)
+        core = kit_revenue - non_core
+        first_line = position == 0
+        shipping = np.where(first_line, rng.choice([0.0, 9.99, 11.99], len(box)), 0.0)
+        direct_costs = kit_revenue * rng.uniform(0.3, 0.5, len(box))
+        net_revenue = (kit_revenue + shipping) * rng.uniform(0.8, 0.95, len(box))
+
+        box_ids = np.arange(n_boxes) + int(rng.integers(10**9, 2 * 10**9))
+        frames.append(pd.DataFrame({
+            "bob_entity_code": entity,
+            "hellofresh_week": week,
+            "composite_order_id": np.char.add(f"{entity}-", box_ids[box].astype(str)),
+            "order_item_type": np.where(is_addon, "addon", "recipe"),
+            "order_line_items_id": box_ids[box],
+            "recipe_slot": slots["slot"].to_numpy()[slot_idx],
+            "primary_tag": slots["primary_tag"].to_numpy()[slot_idx],
+            "product_type": product_type,
+            "box_size": box_size[box],
+            "serves": np.where(is_addon, 0, box_size[box]),
+            "number_of_recipes": n_recipes[box],
+            "kit_count": 1,
+            "box_count": first_line.astype(int),
+            "total_gross_revenue_excl_sales_tax": np.round(kit_revenue + shipping, 2),
+            "shipping_revenue_excl_tax": np.round(shipping, 2),
+            "core_gross_revenue_excl_sales_tax": np.round(core, 2),
+            "non_core_gross_revenue_excl_sales_tax": np.round(non_core, 2),
+            "total_direct_costs": np.round(direct_costs, 2),
+            "total_net_revenue_excl_sales_tax": np.round(net_revenue, 2),
+            "net_p1c_margin": np.round(1 - direct_costs / net_revenue, 4),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _orders_slot_details(catalog, week):
+    rng = catalog.rng(week, "slot_details")
+    frames = []
+    for entity in ENTITIES:
+        slots = catalog.slots[entity]
+        grid = pd.MultiIndex.from_product(
+            [slots.index, BOX_SIZES, NUMBER_OF_RECIPES, ENTITY_DCS[entity]],
+            names=["slot_idx", "box_size", "number_of_recipes", "dc"],
+        ).to_frame(index=False)
+        kits = rng.poisson(60 * slots["demand"].to_numpy()[grid["slot_idx"]])
+        grid = grid[kits > 0].assign(kit_count=kits[kits > 0])
+        frames.append(pd.DataFrame({
+            "hellofresh_week": week,
+            "country": entity,
+            "recipe_index": slots["slot"].to_numpy()[grid["slot_idx"]],
+            "recipe_family": slots["recipe_family"].to_numpy()[grid["slot_idx"]],
+            "box_plan": grid["number_of_recipes"].astype(str).to_numpy() + "x" + grid["box_size"].astype(str).to_numpy(),
+            "number_of_recipes": grid["number_of_recipes"].to_numpy(),
+            "box_size": grid["box_size"].to_numpy(),
+            "dc": grid["dc"].to_numpy(),
+            "kit_count": grid["kit_count"].to_numpy(),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _orders_box_count(catalog, slot_details, week):
+    rng = catalog.rng(week, "box_count")
+    keys = ["hellofresh_week", "country", "recipe_family", "box_plan", "number_of_recipes", "box_size", "dc"]
+    base = slot_details.groupby(keys, as_index=False)["kit_count"].sum()
+    base["box_count"] = np.maximum(base["kit_count"] // base["number_of_recipes"], 0)
+    frames = []
+    for source in SOURCES:
+        # Sources disagree slightly; the box count page charts the gaps.
+        drift = rng.uniform(0.97, 1.03, len(base))
+        frames.append(base.assign(
+            source=source,
+            kit_count=np.round(base["kit_count"] * drift).astype(int),
+            box_count=np.round(base["box_count"] * drift).astype(int),
+        ))
+    return pd.concat(frames, ignore_index=True)[["source"] + keys + ["kit_count", "box_count"]]
+
+
+def order_tables(catalog, week):
+    orders = _orders_recipes(catalog, week)
+    slots = (
+        orders.rename(columns={"bob_entity_code": "country"})
+        .groupby(["country", "hellofresh_week", "product_type", "recipe_slot", "box_size"], as_index=False)
+        ["non_core_gross_revenue_excl_sales_tax"].sum()
+    )
+    slot_details = _orders_slot_details(catalog, week)
+    return {
+        "anz_finance_app.anz_orders_recipes": orders.drop(columns=["recipe_slot"]),
+        "anz_finance_app.anz_orders_recipes_slots": slots,
+        "anz_finance_app.anz_orders_slot_details": slot_details,
+        "anz_finance_app.anz_orders_box_count": _orders_box_count(catalog, slot_details, week),
+    }
+
+
+# --- Budget ---
+def budget_tables(catalog, week):
+    if not BUDGET_WEEKS[0] <= week <= BUDGET_WEEKS[1]:
+        return {}
+    rng = catalog.rng(week, "budget")
+    kit_frames, composition_frames = [], []
+    for entity in ENTITIES:
+        cities = ENTITY_DCS[entity]
+        kits = pd.MultiIndex.from_product([PRIMARY_TAGS, cities, [2, 4]], names=["recipe_type", "city", "recipe_size"]).to_frame(index=False)
+        kits["kits"] = rng.poisson(2000 * catalog.scale, len(kits))
+        kits["box_count"] = kits["kits"] // 3
+        kit_frames.append(kits.assign(
+            version=BUDGET_VERSION, delivery_week_name=week, country=entity,
+            # The budget extract calls Auckland "NZ"; the composition query maps it back.
+            city=kits["city"].replace({"Auckland": "NZ"}),
+        ))
+
+        skus = catalog.skus.sample(n=min(300, len(catalog.skus)), random_state=int(rng.integers(2**31)))
+        comp = pd.MultiIndex.from_product(
+            [range(len(skus)), cities, [2, 4]], names=["sku_idx", "dc", "box_size"]
+        ).to_frame(index=False)
+        sku_rows = skus.iloc[comp["sku_idx"]].reset_index(drop=True)
+        composition_frames.append(pd.DataFrame({
+            "version": BUDGET_VERSION,
+            "hellofresh_week": week,
+            "country": entity,
+            "sku_code": sku_rows["sku_code"],
+            "sku_name": sku_rows["sku_name"],
+            "dc": comp["dc"],
+            "primary_tag": rng.choice(PRIMARY_TAGS, len(comp)),
+            "box_size": comp["box_size"],
+            "sku_uptake": np.round(rng.uniform(0, 0.2, len(comp)), 4),
+            "static_price": sku_rows["base_cost"],
+            "cpk": np.round(sku_rows["base_cost"] * rng.uniform(0.5, 2, len(comp)), 4),
+        }))
+    return {
+        "anz_finance_stakeholders.anz_budget_recipe_composition_v3": pd.concat(composition_frames, ignore_index=True),
+        "anz_finance_stakeholders.anz_budget_kit_counts": pd.concat(kit_frames, ignore_index=True),
+    }
+
+
+# --- Static tables ---
+def date_dimension(weeks):
+    rows = []
+    for week in weeks:
+        monday = _week_monday(week)
+        for offset in range(7):
+            day = monday + datetime.timedelta(days=offset)
+            rows.append((day, week, int(week[:4]), (monday + datetime.timedelta(days=3)).month))
+    return pd.DataFrame(rows, columns=["date", "hellofresh_week", "hellofresh_year", "hellofresh_month"])
+
+
+def auth_tables():
+    # Empty but typed, so sign-up / login / password reset work against the local backend.
+    users = pd.DataFrame({
+        "email": pd.Series(dtype="string"),
+        "password_hash": pd.Series(dtype="string"),
+        "department": pd.Series(dtype="string"),
+        "default_bob_entity_code": pd.Series(dtype="string"),
+        "line_del": pd.Series(dtype="bool"),
+    })
+    tokens = pd.DataFrame({
+        "email": pd.Series(dtype="string"),
+        "token": pd.Series(dtype="string"),
+        "expires_at": pd.Series(dtype="datetime64[us, UTC]"),
+        "is_used": pd.Series(dtype="bool"),
+    })
+    return {"anz_finance_app.users": users, "anz_finance_app.password_reset_tokens": tokens}
+
+
+TABLE_GROUPS = {
+    "kraken": kraken_tables,
+    "orders": order_tables,
+    "budget": budget_tables,
+}
+
+
+def generate(directory=SNAPSHOT_DIR, scale=1.0, weeks=None, groups=None, seed=7, log=print):
+    """Write synthetic snapshots for ``weeks`` (default 2025-W01..2026-W52). Returns rows written per table."""
+    weeks = weeks or week_range()
+    groups = groups or list(TABLE_GROUPS)
+    catalog = Catalog(scale, seed)
+    rows = {}
+
+    # Only the generated weeks, so the pages' week pickers open on a week that has data.
+    static = {"dimensions.date_dimension": date_dimension(weeks)}
+    static.update(auth_tables())
+    for table, df in static.items():
+        write_snapshot(table, df, directory)
+        rows[table] = len(df)
+
+    for week in weeks:
+        started = time.perf_counter()
+        written = 0
+        for group in groups:
+            for table, df in TABLE_GROUPS[group](catalog, week).items():
+                write_snapshot(table, df, directory, partition=week)
+                rows[table] = rows.get(table, 0) + len(df)
+                written += len(df)
+        if log:
+            log(f"{week}: {written:,} rows in {time.perf_counter() - started:.1f}s")
+    return rows
+
+
+def _parse_weeks(value):
+    if ":" in value:
+        first, last = value.split(":")
+        return week_range(first, last)
+    return [w.strip() for w in value.split(",") if w.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic Parquet snapshots for PORTAL_DB_BACKEND=duckdb")
+    parser.add_argument("--out", default=SNAPSHOT_DIR, help="snapshot directory (default: %(default)s)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiple of a real week's volume, e.g. 1, 10, 100")
+    parser.add_argument("--weeks", default=f"{FIRST_WEEK}:{LAST_WEEK}", help="FIRST:LAST range or comma-separated weeks")
+    parser.add_argument("--tables", default=",".join(TABLE_GROUPS), help="table groups: " + ", ".join(TABLE_GROUPS))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    rows = generate(
+        directory=args.out,
+        scale=args.scale,
+        weeks=_parse_weeks(args.weeks),
+        groups=[g.strip() for g in args.tables.split(",") if g.strip()],
+        seed=args.seed,
+    )
+    for table, count in sorted(rows.items()):
+        print(f"{table:<75} {count:>12,}")
+
+
+if __name__ == "__main__":
+    main()
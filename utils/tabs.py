@@ -0,0 +1,17 @@
+import streamlit as st
+
+
+def lazy_tabs(labels, key, keep=()):
+    """``st.tabs`` where only the open tab's body needs to run.
+
+    Switching tabs reruns the script, and each returned tab's ``.open`` says whether
+    it is the one on screen, so guard expensive bodies with ``if tab.open:``. Widgets
+    in a tab that is skipped would normally lose their values; the session state of
+    every key in ``keep`` is carried over so filters are still set when the user
+    comes back. Give those widgets no explicit default, the carried value is it.
+    """
+    for name in keep:
+        if name in st.session_state:
+            # Re-assigning turns the widget value into session state that outlives the widget.
+            st.session_state[name] = st.session_state[name]
+    return st.tabs(labels, key=key, on_change="rerun")
@@ -0,0 +1,197 @@
+import contextvars
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+# --- Defaults (override via environment on the app container) ---
+TELEMETRY_BUFFER_SIZE = int(os.environ.get("PORTAL_TELEMETRY_BUFFER_SIZE", 5000))
+# "", "jsonl:/path/queries.jsonl" or "sqlite:/path/queries.db"
+TELEMETRY_SINK = os.environ.get("PORTAL_TELEMETRY_SINK", "")
+
+_PAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pages")
+
+# Set by run_query / cached() so fetch_df knows what it is executing on whose behalf
+_query_context = contextvars.ContextVar("portal_query_context", default={})
+
+
+class RingBuffer:
+    """Bounded, thread-safe buffer of the most recent telemetry records (oldest dropped first)."""
+
+    def __init__(self, size=TELEMETRY_BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=size)
+
+    def append(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def __len__(self):
+        return len(self._records)
+
+
+class JsonlSink:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class SqliteSink:
+    COLUMNS = [
+        "kind", "query", "statement_id", "params", "queue_seconds", "execute_seconds", "fetch_seconds",
+        "total_seconds", "rows", "bytes", "cache", "namespace", "page", "error", "finished_at",
+    ]
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS query_telemetry ({', '.join(self.COLUMNS)})")
+        self._conn.commit()
+
+    def write(self, record):
+        values = [
+            json.dumps(record.get(c), default=str) if c == "params" else record.get(c)
+            for c in self.COLUMNS
+        ]
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO query_telemetry VALUES ({', '.join('?' * len(self.COLUMNS))})", values
+            )
+            self._conn.commit()
+
+
+def _make_sink(spec):
+    if not spec:
+        return None
+    kind, _, path = spec.partition(":")
+    if kind == "jsonl":
+        return JsonlSink(path)
+    if kind == "sqlite":
+        return SqliteSink(path)
+    raise ValueError(f"Unknown PORTAL_TELEMETRY_SINK '{spec}' (expected jsonl:<path> or sqlite:<path>)")
+
+
+BUFFER = RingBuffer()
+# Increasing id per record, so readers can ask for what came after a record that may since have been evicted
+_sequence = itertools.count(1)
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    global _sink
+    with _sink_lock:
+        if _sink is None and TELEMETRY_SINK:
+            _sink = _make_sink(TELEMETRY_SINK)
+        return _sink
+
+
+def current_page():
+    """Name of the page script on the calling stack (e.g. ``krakenops``), or None outside a page run."""
+    frame = sys._getframe(1)
+    page = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if os.path.dirname(filename) == _PAGES_DIR or os.path.basename(filename) == "home.py":
+            # Keep walking: the outermost page frame is the one the user is on.
+            page = os.path.splitext(os.path.basename(filename))[0]
+        frame = frame.f_back
+    return page
+
+
+@contextmanager
+def query_context(**fields):
+    """Attach fields (query name, params, cache namespace, ...) to queries executed inside the block."""
+    token = _query_context.set({**_query_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _query_context.reset(token)
+
+
+def record(kind, **fields):
+    entry = {"kind": kind, **_query_context.get(), **fields}
+    entry.setdefault("page", current_page())
+    entry.setdefault("finished_at", time.time())
+    entry["seq"] = next(_sequence)
+    BUFFER.append(entry)
+    sink = get_sink()
+    if sink is not None:
+        try:
+            sink.write(entry)
+        except Exception:
+            # Diagnostics must never take a page down.
+            pass
+    return entry
+
+
+def records(kind=None, after=0):
+    """Buffered records, optionally only those of ``kind`` and newer than sequence number ``after``."""
+    return [r for r in BUFFER.snapshot() if (kind is None or r["kind"] == kind) and r["seq"] > after]
+
+
+def last_seq():
+    """Sequence number of the newest record so far (0 before any)."""
+    snapshot = BUFFER.snapshot()
+    return snapshot[-1]["seq"] if snapshot else 0
+
+
+# --- Summaries for the diagnostics page ---
+def query_summary(entries=None):
+    """p50 / p95 / max per query, slowest first."""
+    df = pd.DataFrame(entries if entries is not None else records("query"))
+    if df.empty:
+        return df
+    df["query"] = df["query"].fillna("(unregistered)")
+    summary = df.groupby("query").agg(
+        calls=("total_seconds", "size"),
+        p50_seconds=("total_seconds", "median"),
+        p95_seconds=("total_seconds", lambda s: s.quantile(0.95)),
+        max_seconds=("total_seconds", "max"),
+        avg_queue_seconds=("queue_seconds", "mean"),
+        avg_execute_seconds=("execute_seconds", "mean"),
+        avg_fetch_seconds=("fetch_seconds", "mean"),
+        avg_rows=("rows", "mean"),
+        avg_bytes=("bytes", "mean"),
+        errors=("error", "count"),
+    )
+    summary["total_seconds"] = df.groupby("query")["total_seconds"].sum()
+    return summary.sort_values("total_seconds", ascending=False).reset_index()
+
+
+def cache_summary(entries=None):
+    """Hit ratio per cached loader namespace."""
+    df = pd.DataFrame(entries if entries is not None else records("cache"))
+    if df.empty:
+        return df
+    df["hit"] = df["cache"] != "miss"
+    summary = df.groupby("namespace").agg(
+        lookups=("hit", "size"),
+        hits=("hit", "sum"),
+        memory_hits=("cache", lambda s: (s == "memory").sum()),
+        disk_hits=("cache", lambda s: (s == "disk").sum()),
+        avg_seconds=("total_seconds", "mean"),
+    )
+    summary["hit_ratio"] = summary["hits"] / summary["lookups"]
+    return summary.sort_values("lookups", ascending=False).reset_index()